@@ -0,0 +1,330 @@
+#benchmarks/run_benchmarks.py
+# 파이프라인 처리량 벤치마크 (Ollama 호환 stub 서버 + NAB 형태 합성 시계열) — GPU 모델 없이 Python 쪽 회귀를 잡는 용도
+#   python benchmarks/run_benchmarks.py --sizes 1000,10000,100000 --concurrency 1,4,8
+#   python benchmarks/run_benchmarks.py --save baseline                               → benchmarks/baselines/baseline.json
+#   python benchmarks/run_benchmarks.py --compare benchmarks/baselines/baseline.json  → 회귀가 있으면 종료 코드 1
+# 측정 하나(case × 행 수 × concurrency)마다 별도 프로세스로 실행해서 peak RSS를 따로 잰다 (--case는 내부용).
+import argparse
+import io
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import synthetic  # noqa: E402
+from stub_server import start_stub  # noqa: E402
+
+CASES = ("predict", "main2", "label", "evaluate")
+DEFAULT_SIZES = "1000,10000,100000,1000000"
+WORK_DIR = BENCH_DIR / "work"
+BASELINE_DIR = BENCH_DIR / "baselines"
+RESULT_MARKER = "BENCH_RESULT "
+# 비교할 지표 → 높을수록 좋은지
+COMPARE_METRICS = {
+    "windows_per_sec": True,
+    "rows_per_sec": True,
+    "overhead_ms_per_window": False,
+    "wall_sec": False,
+    "peak_rss_mb": False,
+}
+REGRESSION_TOLERANCE = 0.2
+
+
+def configure_paths(work: Path):
+    """저장소 모듈의 경로 상수를 벤치마크 작업 디렉터리로 바꿈 (원본 NAB/캐시/run store를 건드리지 않게)"""
+    import main2
+    import run_model_predict as rmp
+    import utils.predict as predict
+
+    rmp.PROJECT_ROOT = work
+    rmp.BASE_DIR = work / "NAB" / "data"
+    rmp.LABEL_JSON_PATH = work / "NAB" / "labels" / "combined_windows.json"
+    rmp.SERIES_CACHE_DIR = work / ".cache" / "series"
+    rmp.CACHE_PATH = work / ".cache" / "llm_responses.sqlite"
+    rmp.RUN_STORE_PATH = work / "runs" / "runs.sqlite"
+    predict.SCENARIO_DIR = str(work / "prompts" / "scenarios")
+    predict.PROMPT_PATH = str(REPO_ROOT / "prompts" / "base_prompt.txt")
+    predict.JSON_PROMPT_PATH = str(REPO_ROOT / "prompts" / "base_prompt_json.txt")
+    main2.BASE_DIR = str(rmp.BASE_DIR)
+    main2.SCENARIO_DIR = predict.SCENARIO_DIR
+    main2.PROMPT_PATH = predict.PROMPT_PATH
+    main2.JSON_PROMPT_PATH = predict.JSON_PROMPT_PATH
+
+
+def peak_rss_mb() -> float:
+    """
+    이 프로세스의 최대 RSS (MB). Linux는 /proc/self/status의 VmHWM
+    (ru_maxrss는 exec 이전 부모 프로세스의 최대값까지 물려받음), 그 밖에는 ru_maxrss (macOS byte 단위).
+    """
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def reset_peak_rss():
+    """측정 전 준비 작업의 최대 RSS를 지움 (Linux만 — 다른 플랫폼에서는 준비 작업도 peak에 포함)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def run_case(
+    case: str,
+    rows: int,
+    concurrency: int,
+    work: Path,
+    url: str,
+    num_rows: int,
+    chunk_rows: Optional[int] = None,
+) -> dict:
+    """측정 하나 실행 (자식 프로세스) → 결과 dict. 파이프라인 출력은 버린다."""
+    import main2
+    import run_model_predict as rmp
+    from models.model_client import OllamaClient
+    from utils.chunked import iter_timestamp_chunks
+    from utils.dataset import load_timestamps
+    from utils.predict import PredictOptions
+    from utils.runstore import RunStore
+    from utils.telemetry import Telemetry, summarize
+
+    configure_paths(work)
+    folder, file = synthetic.folder_name(rows), synthetic.file_name(rows)
+    client = OllamaClient(base_url=url, pool_size=max(16, concurrency))
+    # 청크 처리는 시계열 캐시 없이 CSV를 직접 흘려 읽음 (run_model_predict CLI와 같음)
+    series_cache = None if chunk_rows else rmp.SERIES_CACHE_DIR
+    result = {"case": case, "rows": rows, "concurrency": concurrency, "chunk_rows": chunk_rows}
+    log = io.StringIO()
+
+    if case == "predict":
+        telemetry_path = work / "runs" / f"telemetry_{rows}_c{concurrency}.jsonl"
+        telemetry_path.unlink(missing_ok=True)
+        telemetry = Telemetry(telemetry_path)
+        store = RunStore(rmp.RUN_STORE_PATH)
+        options = PredictOptions(model_name="stub", temperature=0.0, num_rows=num_rows, concurrency=concurrency)
+        started = time.perf_counter()
+        with redirect_stdout(log):
+            if chunk_rows:
+                rmp.run_predict_chunked(folder, file, options, client, chunk_rows, telemetry=telemetry, store=store)
+            else:
+                rmp.run_predict_mode(folder, file, options, client, series_cache=series_cache, telemetry=telemetry, store=store)
+        wall = time.perf_counter() - started
+        summary = summarize(telemetry.load())
+        stages = summary["stages"]
+        windows = summary["windows"]
+        # 윈도우당 Python 쪽 시간 = 직렬화 + 프롬프트 조립 + 응답 파싱 + (왕복 시간 - 서버 처리 시간)
+        overhead = sum(stages[s]["sum"] for s in ("serialize", "prompt", "parse", "client_overhead") if s in stages)
+        result.update(
+            windows=windows,
+            failed=summary["failed"],
+            windows_per_sec=windows / wall if wall else None,
+            overhead_ms_per_window=overhead / windows if windows else None,
+        )
+    elif case == "main2":
+        started = time.perf_counter()
+        with redirect_stdout(log):
+            main2.main(folder, "stub", 0.0, num_rows, client=client)
+        wall = time.perf_counter() - started
+        # main2는 파일 앞부분 num_rows행만 한 번에 보낸다
+        rows = min(rows, num_rows)
+        result.update(windows=1, windows_per_sec=1 / wall if wall else None)
+    elif case == "label":
+        started = time.perf_counter()
+        with redirect_stdout(log):
+            rmp.run_label_mode(folder, file, series_cache, chunk_rows=chunk_rows)
+        wall = time.perf_counter() - started
+    elif case == "evaluate":
+        # 라벨 CSV와 run store 실행 하나를 미리 만들어 두고 평가만 잰다
+        store = RunStore(work / "runs" / f"evaluate_{rows}.sqlite")
+        with redirect_stdout(log):
+            # 청크 모드는 준비도 청크로 — 전체 로드가 남긴 메모리가 평가의 peak에 섞이지 않게
+            rmp.run_label_mode(folder, file, series_cache, chunk_rows=chunk_rows)
+            if not store.has_runs(f"{folder}/{file}"):
+                csv_path = rmp.BASE_DIR / folder / file
+                if chunk_rows:
+                    picked = np.concatenate([ts[::100] for ts in iter_timestamp_chunks(csv_path, chunk_rows)])
+                else:
+                    picked = load_timestamps(csv_path, rmp.SERIES_CACHE_DIR)[::100]
+                store.add_run(f"{folder}/{file}", picked, {"model_name": "stub", "temperature": 0.0})
+                del picked
+        reset_peak_rss()
+        started = time.perf_counter()
+        with redirect_stdout(log):
+            rmp.run_evaluate_mode(folder, file, chunksize=chunk_rows, series_cache=series_cache, store=store)
+        wall = time.perf_counter() - started
+    else:
+        raise ValueError(f"알 수 없는 case: {case}")
+
+    result.update(wall_sec=wall, rows_per_sec=rows / wall if wall else None, peak_rss_mb=peak_rss_mb())
+    return result
+
+
+def run_child(case: str, rows: int, concurrency: int, args, url: str) -> Optional[dict]:
+    """측정 하나를 자식 프로세스로 실행 → 결과 (실패하면 None)"""
+    command = [
+        sys.executable, str(Path(__file__).resolve()), "--case", case, "--rows", str(rows),
+        "--concurrency", str(concurrency), "--workdir", str(args.workdir), "--url", url, "--num_rows", str(args.num_rows),
+    ] + (["--chunk_rows", str(args.chunk_rows)] if args.chunk_rows else [])
+    completed = subprocess.run(command, capture_output=True, text=True)
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    print(f"❌ {case} {rows:,}행 c={concurrency} 실패 (종료 코드 {completed.returncode})")
+    print(completed.stderr[-2000:])
+    return None
+
+
+def add_scaling(table: pd.DataFrame) -> pd.DataFrame:
+    """predict: 같은 행 수에서 가장 낮은 concurrency 대비 windows/sec 배율"""
+    table = table.copy()
+    table["scaling"] = np.nan
+    predict = table["case"] == "predict"
+    for rows, group in table[predict].groupby("rows"):
+        base = group.sort_values("concurrency")["windows_per_sec"].iloc[0]
+        if base:
+            table.loc[group.index, "scaling"] = group["windows_per_sec"] / base
+    return table
+
+
+def compare(table: pd.DataFrame, baseline_path: Path, tolerance: float) -> List[str]:
+    """baseline과 비교 → 회귀 설명 목록 (tolerance보다 나빠진 지표)"""
+    baseline = pd.DataFrame(json.loads(baseline_path.read_text(encoding="utf-8"))["results"])
+    # 청크 처리 여부가 다른 측정끼리는 비교하지 않음 (chunk_rows가 없던 baseline은 전체 로드로 간주)
+    for frame in (table, baseline):
+        frame["chunk_rows"] = frame["chunk_rows"].fillna(0) if "chunk_rows" in frame else 0
+    merged = table.merge(baseline, on=["case", "rows", "concurrency", "chunk_rows"], suffixes=("", "_base"))
+    regressions = []
+    lines = []
+    for _, row in merged.iterrows():
+        for metric, higher_is_better in COMPARE_METRICS.items():
+            current, base = row.get(metric), row.get(f"{metric}_base")
+            if current is None or base is None or pd.isna(current) or pd.isna(base) or not base:
+                continue
+            change = (current - base) / base
+            worse = -change if higher_is_better else change
+            flag = "❗" if worse > tolerance else "  "
+            lines.append(f"{flag} {row['case']:<8} {row['rows']:>10,}행 c={row['concurrency']:<3} {metric:<22} {base:>12.3f} → {current:>12.3f} ({change:+.1%})")
+            if worse > tolerance:
+                regressions.append(f"{row['case']} {row['rows']}행 c={row['concurrency']} {metric} {change:+.1%}")
+    print(f"\n📐 baseline 비교: {baseline_path} (허용 {tolerance:.0%})")
+    print("\n".join(lines) if lines else "(겹치는 측정 없음)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="stub 서버 기반 파이프라인 처리량 벤치마크")
+    parser.add_argument("--sizes", type=str, default=DEFAULT_SIZES, help="합성 시계열 행 수 목록 (쉼표 구분, 예: 1000,10000000)")
+    parser.add_argument("--cases", type=str, default=",".join(CASES), help=f"측정 대상 ({', '.join(CASES)})")
+    parser.add_argument("--concurrency", type=str, default="1,4,8", help="[predict] 윈도우 동시 처리 수 목록")
+    parser.add_argument("--num_rows", type=int, default=1000, help="윈도우 행 수 (main2는 앞부분 행 수)")
+    parser.add_argument("--chunk_rows", type=int, default=None, help="predict/label/evaluate를 청크 처리로 측정 (행 수, 시계열 캐시 없이)")
+    parser.add_argument("--prefill_ms_per_token", type=float, default=0.0, help="stub 프롬프트 토큰당 지연 (ms)")
+    parser.add_argument("--gen_ms_per_token", type=float, default=0.0, help="stub 생성 토큰당 지연 (ms)")
+    parser.add_argument("--max_parallel", type=int, default=8, help="stub 동시 처리 요청 수")
+    parser.add_argument("--workdir", type=Path, default=WORK_DIR, help="합성 데이터/캐시/run store 위치")
+    parser.add_argument("--save", type=str, default=None, help="결과를 benchmarks/baselines/<이름>.json으로 저장")
+    parser.add_argument("--compare", type=Path, default=None, help="baseline JSON과 비교 (회귀가 있으면 종료 코드 1)")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE, help="회귀로 볼 변화 비율")
+    # 내부용: 측정 하나를 이 프로세스에서 실행
+    parser.add_argument("--case", type=str, choices=CASES, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--rows", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--url", type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        result = run_case(args.case, args.rows, int(args.concurrency), args.workdir, args.url, args.num_rows, args.chunk_rows)
+        print(RESULT_MARKER + json.dumps(result))
+        return
+
+    from utils.dataset import load_series
+
+    sizes = [int(v) for v in args.sizes.split(",") if v.strip()]
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    concurrencies = [int(v) for v in args.concurrency.split(",") if v.strip()]
+    unknown = [c for c in cases if c not in CASES]
+    if unknown:
+        parser.error(f"알 수 없는 case: {', '.join(unknown)}")
+
+    # 데이터/시계열 캐시는 측정 전에 한 번만 준비 (캐시 생성 시간이 측정에 섞이지 않게)
+    paths = synthetic.write_dataset(args.workdir, sizes)
+    if not args.chunk_rows:
+        for path in paths.values():
+            load_series(path, args.workdir / ".cache" / "series")
+
+    server, state, url = start_stub(
+        prefill_ms_per_token=args.prefill_ms_per_token,
+        gen_ms_per_token=args.gen_ms_per_token,
+        max_parallel=args.max_parallel,
+    )
+    print(f"🧪 stub 서버: {url} (prefill {args.prefill_ms_per_token}ms/tok, 생성 {args.gen_ms_per_token}ms/tok, 동시 {args.max_parallel})")
+
+    results = []
+    try:
+        for case in cases:
+            for rows in sizes:
+                for concurrency in concurrencies if case == "predict" else [1]:
+                    state.reset()
+                    result = run_child(case, rows, concurrency, args, url)
+                    if result is None:
+                        continue
+                    result["stub_requests"] = state.stats()["requests"]
+                    results.append(result)
+                    print(
+                        f"⏱️ {case:<8} {rows:>10,}행 c={concurrency:<3} {result['wall_sec']:8.2f}s "
+                        f"RSS {result['peak_rss_mb']:7.1f}MB"
+                        + (f" {result['windows_per_sec']:8.1f} win/s" if result.get("windows_per_sec") else "")
+                    )
+    finally:
+        server.shutdown()
+
+    if not results:
+        print("❌ 측정 결과가 없습니다.")
+        sys.exit(1)
+    table = add_scaling(pd.DataFrame(results))
+    columns = [c for c in ("case", "rows", "concurrency", "wall_sec", "windows", "windows_per_sec", "overhead_ms_per_window",
+                           "rows_per_sec", "peak_rss_mb", "scaling") if c in table.columns]
+    print("\n📊 벤치마크 결과:")
+    print(table[columns].to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+
+    if args.save:
+        BASELINE_DIR.mkdir(parents=True, exist_ok=True)
+        path = BASELINE_DIR / f"{args.save}.json"
+        payload = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "machine": {"python": platform.python_version(), "platform": platform.platform(), "processor": platform.processor()},
+            "settings": {k: str(v) for k, v in vars(args).items() if k not in ("case", "rows", "url", "save", "compare")},
+            "results": json.loads(table.to_json(orient="records")),
+        }
+        path.write_text(json.dumps(payload, ensure_ascii=False, indent=1), encoding="utf-8")
+        print(f"💾 baseline 저장: {path}")
+
+    if args.compare:
+        regressions = compare(table, args.compare, args.tolerance)
+        if regressions:
+            print(f"\n❗ 회귀 {len(regressions)}건:\n" + "\n".join(regressions))
+            sys.exit(1)
+        print("✅ 회귀 없음")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#benchmarks/stub_server.py
+# Ollama 호환 stub 서버 — GPU 모델 없이 파이프라인(Python 쪽) 처리량을 재기 위한 것
+#   python benchmarks/stub_server.py --port 11434 --prefill_ms_per_token 0.02 --gen_ms_per_token 2 --max_parallel 4
+#   POST /api/generate, /api/chat (stream true/false, format 지원), GET /api/tags, GET /stats
+# 응답은 models.fake_backend.FakeBackend와 같은 규칙으로 프롬프트에서 결정적으로 만든다.
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models.fake_backend import FakeBackend  # noqa: E402
+
+# 스트리밍 청크 하나에 담는 생성 토큰 수
+STREAM_TOKENS_PER_CHUNK = 4
+CHARS_PER_TOKEN = 4
+
+
+class StubState:
+    """stub 설정 + 누적 통계 (요청 수, 서버 처리 시간)"""
+
+    def __init__(
+        self,
+        prefill_ms_per_token: float = 0.0,
+        gen_ms_per_token: float = 0.0,
+        max_parallel: int = 4,
+        anomaly_rate: float = 0.01,
+    ):
+        self.prefill_ms_per_token = prefill_ms_per_token
+        self.gen_ms_per_token = gen_ms_per_token
+        self.max_parallel = max_parallel
+        self.backend = FakeBackend(anomaly_rate=anomaly_rate)
+        self.slots = threading.Semaphore(max(max_parallel, 1))
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.busy_ms = 0.0
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"requests": self.requests, "busy_ms": round(self.busy_ms, 3), "max_parallel": self.max_parallel}
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.busy_ms = 0.0
+
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # keep-alive 소켓에서 헤더/본문을 따로 쓰면 Nagle + delayed ACK로 요청마다 ~40ms가 멈춘다
+        disable_nagle_algorithm = True
+
+        def _send_json(self, status: int, payload: dict):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _chunk(self, payload: dict):
+            data = (json.dumps(payload) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path == "/api/tags":
+                self._send_json(200, {"models": []})
+            elif self.path == "/stats":
+                self._send_json(200, state.stats())
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._send_json(400, {"error": "invalid json"})
+                return
+            if self.path == "/stats/reset":
+                state.reset()
+                self._send_json(200, state.stats())
+                return
+            if self.path not in ("/api/generate", "/api/chat"):
+                self._send_json(404, {"error": "not found"})
+                return
+
+            chat = self.path == "/api/chat"
+            model = body.get("model", "")
+            if not chat and "prompt" not in body:
+                # keep_alive=0 언로드 요청 등
+                self._send_json(200, {"model": model, "response": "", "done": True, "done_reason": "unload"})
+                return
+            prompt = "\n".join(m.get("content", "") for m in body.get("messages", [])) if chat else body["prompt"]
+
+            with state.slots:
+                started = time.perf_counter()
+                result = state.backend.generate_result(prompt, model, 0.0, body.get("options"), body.get("format"))
+                prompt_tokens = result.prompt_eval_count or 0
+                prefill_ms = prompt_tokens * state.prefill_ms_per_token
+                time.sleep(prefill_ms / 1000)
+                if body.get("stream", True):
+                    self._stream(chat, model, result.text, prompt_tokens, prefill_ms, started)
+                else:
+                    eval_tokens = max(len(result.text) // CHARS_PER_TOKEN, 1)
+                    eval_ms = eval_tokens * state.gen_ms_per_token
+                    time.sleep(eval_ms / 1000)
+                    total_ms = (time.perf_counter() - started) * 1000
+                    payload = self._final(chat, model, result.text, prompt_tokens, eval_tokens, prefill_ms, eval_ms, total_ms)
+                    self._send_json(200, payload)
+                with state.lock:
+                    state.requests += 1
+                    state.busy_ms += (time.perf_counter() - started) * 1000
+
+        def _final(self, chat, model, text, prompt_tokens, eval_tokens, prefill_ms, eval_ms, total_ms) -> dict:
+            content = {"message": {"role": "assistant", "content": text}} if chat else {"response": text}
+            return {
+                "model": model,
+                **content,
+                "done": True,
+                "prompt_eval_count": prompt_tokens,
+                "eval_count": eval_tokens,
+                "load_duration": 0,
+                "prompt_eval_duration": int(prefill_ms * 1e6),
+                "eval_duration": int(eval_ms * 1e6),
+                "total_duration": int(total_ms * 1e6),
+            }
+
+        def _stream(self, chat, model, text, prompt_tokens, prefill_ms, started):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            step = STREAM_TOKENS_PER_CHUNK * CHARS_PER_TOKEN
+            eval_tokens = 0
+            try:
+                for i in range(0, len(text), step):
+                    piece = text[i:i + step]
+                    tokens = max(len(piece) // CHARS_PER_TOKEN, 1)
+                    time.sleep(tokens * state.gen_ms_per_token / 1000)
+                    eval_tokens += tokens
+                    content = {"message": {"role": "assistant", "content": piece}} if chat else {"response": piece}
+                    self._chunk({"model": model, **content, "done": False})
+                total_ms = (time.perf_counter() - started) * 1000
+                eval_ms = eval_tokens * state.gen_ms_per_token
+                final = self._final(chat, model, "", prompt_tokens, eval_tokens, prefill_ms, eval_ms, total_ms)
+                self._chunk(final)
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # 클라이언트가 조기 중단(스트림 close)한 경우
+                self.close_connection = True
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_stub(host: str = "127.0.0.1", port: int = 0, **settings) -> tuple:
+    """stub 서버를 백그라운드 스레드로 시작 → (server, state, base_url). port=0이면 빈 포트 사용"""
+    state = StubState(**settings)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, state, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ollama 호환 stub 서버 (벤치마크용)")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--prefill_ms_per_token", type=float, default=0.0, help="프롬프트 토큰당 prefill 지연 (ms)")
+    parser.add_argument("--gen_ms_per_token", type=float, default=0.0, help="생성 토큰당 지연 (ms)")
+    parser.add_argument("--max_parallel", type=int, default=4, help="동시에 처리할 요청 수 (OLLAMA_NUM_PARALLEL처럼 나머지는 대기)")
+    parser.add_argument("--anomaly_rate", type=float, default=0.01, help="이상으로 답할 timestamp 비율")
+    args = parser.parse_args()
+
+    server, state, url = start_stub(
+        args.host, args.port,
+        prefill_ms_per_token=args.prefill_ms_per_token,
+        gen_ms_per_token=args.gen_ms_per_token,
+        max_parallel=args.max_parallel,
+        anomaly_rate=args.anomaly_rate,
+    )
+    print(f"🧪 stub 서버 시작: {url} (prefill {args.prefill_ms_per_token}ms/tok, 생성 {args.gen_ms_per_token}ms/tok, 동시 {args.max_parallel})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print(f"\n⏹️ stub 서버 종료: {state.stats()}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#benchmarks/synthetic.py
+import json
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+# NAB 형태의 합성 시계열 (timestamp,value — 5분 간격, 일 주기 + 잡음 + 이상 구간)
+# 크기별로 폴더를 나눠 main2.main(폴더 단위 실행)도 크기별로 잴 수 있게 한다.
+START = pd.Timestamp("2014-04-01 00:00:00")
+STEP = pd.Timedelta(minutes=5)
+ROWS_PER_DAY = 288
+# 이상 구간 수 = 행 수 / 이 값 (최소 1개), 구간 길이는 ANOMALY_ROWS행
+ROWS_PER_ANOMALY = 5000
+ANOMALY_ROWS = 12
+# CSV를 이만큼씩 나눠 써서 1000만 행도 메모리를 적게 쓰게
+WRITE_CHUNK_ROWS = 1_000_000
+
+SCENARIO_TEXT = """The series is a synthetic daily-periodic metric sampled every 5 minutes.
+Normal behaviour: a smooth daily cycle between roughly 20 and 80 with small noise.
+Anomalies: sudden spikes or drops far outside the daily cycle that last up to an hour.
+"""
+
+
+def folder_name(rows: int) -> str:
+    return f"synthetic_{rows}"
+
+
+def file_name(rows: int) -> str:
+    return f"synth_{rows}.csv"
+
+
+def anomaly_starts(rows: int, seed: int = 0) -> np.ndarray:
+    """이상 구간 시작 행 (정렬, 서로 겹치지 않음)"""
+    count = max(rows // ROWS_PER_ANOMALY, 1)
+    slots = np.linspace(0, max(rows - ANOMALY_ROWS, 0), count + 2, dtype="int64")[1:-1]
+    jitter = np.random.default_rng(seed).integers(0, ANOMALY_ROWS, size=len(slots))
+    return np.clip(slots + jitter, 0, max(rows - ANOMALY_ROWS, 0))
+
+
+def make_chunk(start_row: int, rows: int, starts: np.ndarray, seed: int = 0) -> pd.DataFrame:
+    """[start_row, start_row + rows) 구간의 DataFrame"""
+    index = np.arange(start_row, start_row + rows)
+    rng = np.random.default_rng(seed + start_row)
+    values = 50 + 30 * np.sin(2 * np.pi * index / ROWS_PER_DAY) + rng.normal(0, 2, rows)
+    for s in starts[(starts + ANOMALY_ROWS > start_row) & (starts < start_row + rows)]:
+        lo, hi = max(s - start_row, 0), min(s + ANOMALY_ROWS - start_row, rows)
+        values[lo:hi] += 60 if s % 2 == 0 else -60
+    timestamps = START + pd.to_timedelta(index * STEP.value, unit="ns")
+    return pd.DataFrame({"timestamp": timestamps.strftime("%Y-%m-%d %H:%M:%S"), "value": np.round(values, 3)})
+
+
+def label_windows(starts: np.ndarray) -> List[List[str]]:
+    """combined_windows.json 형식의 이상 구간 [[시작, 끝], ...]"""
+    fmt = "%Y-%m-%d %H:%M:%S.%f"
+    return [
+        [(START + STEP * int(s)).strftime(fmt), (START + STEP * int(s + ANOMALY_ROWS - 1)).strftime(fmt)]
+        for s in starts
+    ]
+
+
+def write_dataset(root: Path, sizes: List[int], seed: int = 0) -> Dict[int, Path]:
+    """
+    root 아래에 NAB 구조로 합성 데이터셋 작성 (이미 있는 크기는 건너뜀) → {행 수: CSV 경로}
+      root/NAB/data/synthetic_<N>/synth_<N>.csv
+      root/NAB/labels/combined_windows.json
+      root/prompts/scenarios/synth_<N>.txt
+    """
+    scenario_dir = root / "prompts" / "scenarios"
+    label_path = root / "NAB" / "labels" / "combined_windows.json"
+    for path in (scenario_dir, label_path.parent):
+        path.mkdir(parents=True, exist_ok=True)
+    labels = json.loads(label_path.read_text(encoding="utf-8")) if label_path.exists() else {}
+
+    paths = {}
+    for rows in sizes:
+        csv_path = root / "NAB" / "data" / folder_name(rows) / file_name(rows)
+        csv_path.parent.mkdir(parents=True, exist_ok=True)
+        starts = anomaly_starts(rows, seed)
+        if not csv_path.exists():
+            print(f"🧪 합성 시계열 생성: {csv_path.name} ({rows:,}행)")
+            tmp_path = csv_path.with_suffix(".tmp")
+            for offset in range(0, rows, WRITE_CHUNK_ROWS):
+                chunk = make_chunk(offset, min(WRITE_CHUNK_ROWS, rows - offset), starts, seed)
+                chunk.to_csv(tmp_path, mode="w" if offset == 0 else "a", header=offset == 0, index=False)
+            tmp_path.replace(csv_path)
+        (scenario_dir / file_name(rows).replace(".csv", ".txt")).write_text(SCENARIO_TEXT, encoding="utf-8")
+        labels[f"{folder_name(rows)}/{file_name(rows)}"] = label_windows(starts)
+        paths[rows] = csv_path
+
+    label_path.write_text(json.dumps(labels, indent=1), encoding="utf-8")
+    return paths
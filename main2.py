@@ -6,23 +6,18 @@ import re
 from glob import glob
 from utils.file import read_csv_file
 from utils.prompt import load_template, build_prompt
-from models.model_client import query_ollama
+from utils.serialize import serialize_df, DATA_FORMATS
+from utils.output import OUTPUT_FORMATS, VERDICT_SCHEMA, json_num_predict, parse_verdict_json
+from models.backend import BackendError
+from models.model_client import query_ollama, add_client_arguments, client_from_args
+from models.cache import add_cache_arguments, open_response_cache
 
 BASE_DIR = "/Users/seongha/Documents/ollama_anomaly/NAB/data"
 SCENARIO_DIR = "/Users/seongha/Documents/ollama_anomaly/prompts/scenarios"  
 #SCENARIO_PATH = "prompts/scenario.txt"
 PROMPT_PATH = "prompts/base_prompt.txt"
-
-def convert_csv_to_text(df) -> str:
-    """DataFrame (여러 row) → 텍스트 덩어리로 변환"""
-    lines = []
-    for _, row in df.iterrows():
-        lines.append(f"Time: {row['timestamp']}")
-        for col in row.index:
-            if col != 'timestamp':
-                lines.append(f"{col}: {row[col]}")
-        lines.append("")  # 행 사이에 공백
-    return "\n".join(lines)
+JSON_PROMPT_PATH = "prompts/base_prompt_json.txt"
+CACHE_PATH = "/Users/seongha/Documents/ollama_anomaly/.cache/llm_responses.sqlite"
 
 def load_scenario_by_filename(file_path):
     filename = os.path.basename(file_path)
@@ -34,7 +29,7 @@ def load_scenario_by_filename(file_path):
     with open(scenario_path, "r") as f:
         return f.read()
 
-def run_single_file(file_path, model_name, temperature, num_rows):
+def run_single_file(file_path, model_name, temperature, num_rows, data_format="verbose", precision=None, client=None, output_format="text"):
     print(f"\n📄 파일 처리 중: {file_path}")
 
     # 1. CSV 로드
@@ -48,7 +43,7 @@ def run_single_file(file_path, model_name, temperature, num_rows):
     if scenario is None:
         return (os.path.basename(file_path), "Error", "Scenario load failed")
 
-    prompt_template = load_template(PROMPT_PATH)
+    prompt_template = load_template(JSON_PROMPT_PATH if output_format == "json" else PROMPT_PATH)
 
     # # 2. 시나리오/프롬프트 불러오기
     # scenario = load_template(SCENARIO_PATH)
@@ -56,12 +51,20 @@ def run_single_file(file_path, model_name, temperature, num_rows):
 
     # 3. 텍스트 변환
     sliced_df = df.head(num_rows)
-    text_block = convert_csv_to_text(sliced_df)
+    text_block = serialize_df(sliced_df, data_format, precision)
     prompt = build_prompt(prompt_template, scenario, text_block)
 
     # 4. Ollama 호출
     print(f"🧠 모델 '{model_name}' 호출 중 (temperature={temperature})...")
-    response = query_ollama(prompt, model=model_name, temperature=temperature)
+    # json: 판정 구조를 schema로 강제하고 생성 길이를 행 수 기준으로 제한
+    json_args = {}
+    if output_format == "json":
+        json_args = {"extra_options": {"num_predict": json_num_predict(len(sliced_df))}, "response_format": VERDICT_SCHEMA}
+    try:
+        response = query_ollama(prompt, model=model_name, temperature=temperature, client=client, **json_args)
+    except BackendError as e:
+        print(f"❌ {e}")
+        return (os.path.basename(file_path), "Error", str(e))
 
     # 5. 출력
     print("\n📤 Ollama 응답:\n")
@@ -69,15 +72,18 @@ def run_single_file(file_path, model_name, temperature, num_rows):
     print("-" * 80)
     
     # 결과 판단
-    match = re.search(r'final result:\s*\*\*(normal|abnormal)\*\*', response.lower())
-    if match:
-        decision = match.group(1).capitalize()            
+    if output_format == "json":
+        decision = parse_verdict_json(response)
     else:
-        decision = "Unknown"
+        match = re.search(r'final result:\s*\*\*(normal|abnormal)\*\*', response.lower())
+        if match:
+            decision = match.group(1).capitalize()            
+        else:
+            decision = "Unknown"
 
     return (os.path.basename(file_path), decision, response.strip())
 
-def main(folder_name, model_name, temperature, num_rows):
+def main(folder_name, model_name, temperature, num_rows, data_format="verbose", precision=None, client=None, output_format="text"):
     folder_path = os.path.join(BASE_DIR, folder_name)
     csv_files = glob(os.path.join(folder_path, "*.csv"))
 
@@ -90,7 +96,7 @@ def main(folder_name, model_name, temperature, num_rows):
     results = []
 
     for file_path in csv_files:
-        file_name, decision, _ = run_single_file(file_path, model_name, temperature, num_rows)
+        file_name, decision, _ = run_single_file(file_path, model_name, temperature, num_rows, data_format, precision, client, output_format)
         results.append({"File": file_name, "Result": decision})
 
     # 결과 출력 (종합 요약)
@@ -105,7 +111,15 @@ if __name__ == "__main__":
     parser.add_argument('--model', type=str, default="llama3.1:8b")
     parser.add_argument('--temp', type=float, default=0.0)
     parser.add_argument('--rows', type=int, default=10, help="실험할 CSV 행 개수 (기본: 10)")
+    parser.add_argument('--data_format', type=str, choices=DATA_FORMATS, default="verbose", help="프롬프트 데이터 포맷")
+    parser.add_argument('--precision', type=int, default=None, help="값의 소수점 자리수 (기본: 원본 그대로)")
+    parser.add_argument('--output_format', type=str, choices=OUTPUT_FORMATS, default="text", help="json: 판정을 JSON schema로 강제 (Unknown 방지)")
+    add_cache_arguments(parser)
+    add_client_arguments(parser)
     args = parser.parse_args()
 
     #main(args.folder, args.file, args.model, args.temp, args.rows)
-    main(args.folder, args.model, args.temp, args.rows)
+    cache = open_response_cache(args.cache_path or CACHE_PATH, args.cache, args.cache_max_mb, args.cache_max_age_days)
+    client = client_from_args(args, cache)
+
+    main(args.folder, args.model, args.temp, args.rows, args.data_format, args.precision, client, args.output_format)
@@ -0,0 +1,275 @@
+#models/backend.py
+import json
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# 모델 백엔드 인터페이스 — 파이프라인(utils/predict.py, main2.py 등)은 이 메서드만 사용한다.
+#   ollama : Ollama /api/generate, /api/chat (models/model_client.py)
+#   openai : OpenAI 호환 /v1/completions, /v1/chat/completions — llama.cpp server, vLLM 등 (models/openai_client.py)
+#   fake   : 서버 없이 프로세스 안에서 결정적으로 응답 (models/fake_backend.py)
+# options는 Ollama 형식(temperature, num_predict, num_ctx, seed ...)으로 받고 백엔드가 자기 형식으로 바꾼다.
+BACKENDS = ("ollama", "openai", "fake")
+
+
+class BackendError(Exception):
+    """모델 백엔드 호출 실패의 공통 상위 예외 (OllamaError 등)"""
+
+
+@dataclass
+class GenerateResult:
+    """비스트리밍 호출 결과: 응답 텍스트 + 서버가 돌려주는 토큰 수/시간(ns) 지표"""
+    text: str
+    cached: bool = False                         # 응답 캐시에서 가져온 경우 (지표 없음)
+    prompt_eval_count: Optional[int] = None      # 실제로 prefill한 프롬프트 토큰 수 (KV 캐시 재사용분 제외)
+    eval_count: Optional[int] = None             # 생성 토큰 수
+    total_duration: Optional[int] = None
+    load_duration: Optional[int] = None          # 모델 로드 시간 (콜드 스타트 여부)
+    prompt_eval_duration: Optional[int] = None
+    eval_duration: Optional[int] = None
+
+    def metrics(self) -> dict:
+        """텔레메트리용 지표 dict (시간은 ms)"""
+        return ollama_metrics(asdict(self))
+
+
+# Ollama 응답의 시간 지표(ns) → 텔레메트리 키(ms)
+_DURATION_FIELDS = {
+    "total_duration": "total_ms",
+    "load_duration": "load_ms",
+    "prompt_eval_duration": "prompt_eval_ms",
+    "eval_duration": "eval_ms",
+}
+
+
+def ollama_metrics(data: dict) -> dict:
+    """Ollama 응답(또는 스트림 마지막 청크)의 토큰 수/시간 필드 → {prompt_eval_count, eval_count, *_ms}"""
+    metrics = {key: data.get(key) for key in ("prompt_eval_count", "eval_count")}
+    for field, key in _DURATION_FIELDS.items():
+        metrics[key] = data[field] / 1e6 if data.get(field) is not None else None
+    return metrics
+
+
+class ModelBackend(ABC):
+    """
+    모델 백엔드 공통 인터페이스.
+    - supports_batch가 True인 백엔드는 generate_batch로 여러 프롬프트를 요청 하나에 보낸다
+      (BatchingBackend가 동시에 들어온 윈도우들을 모아서 호출)
+    - cache: models.cache.ResponseCache 또는 None (temperature=0 응답만 캐시)
+    - generate_result / chat_result / generate_stream / chat_stream은 백엔드마다 반드시 구현 (빠지면 생성 시 TypeError)
+    """
+    name = "base"
+    supports_batch = False
+    cache = None
+
+    @abstractmethod
+    def generate_result(
+        self,
+        prompt: str,
+        model: str = "llama3.1:8b",
+        temperature: float = 0.0,
+        extra_options: Optional[dict] = None,
+        response_format: Optional[dict] = None,
+    ) -> GenerateResult:
+        ...
+
+    @abstractmethod
+    def chat_result(
+        self,
+        messages: List[dict],
+        model: str = "llama3.1:8b",
+        temperature: float = 0.0,
+        extra_options: Optional[dict] = None,
+        response_format: Optional[dict] = None,
+    ) -> GenerateResult:
+        ...
+
+    @abstractmethod
+    def generate_stream(
+        self,
+        prompt: str,
+        model: str = "llama3.1:8b",
+        temperature: float = 0.0,
+        num_predict: Optional[int] = None,
+        extra_options: Optional[dict] = None,
+        stats: Optional[dict] = None,
+        response_format: Optional[dict] = None,
+    ) -> Iterator[str]:
+        ...
+
+    @abstractmethod
+    def chat_stream(
+        self,
+        messages: List[dict],
+        model: str = "llama3.1:8b",
+        temperature: float = 0.0,
+        num_predict: Optional[int] = None,
+        extra_options: Optional[dict] = None,
+        stats: Optional[dict] = None,
+        response_format: Optional[dict] = None,
+    ) -> Iterator[str]:
+        ...
+
+    def generate_batch(
+        self,
+        prompts: List[str],
+        model: str = "llama3.1:8b",
+        temperature: float = 0.0,
+        extra_options: Optional[dict] = None,
+        response_format: Optional[dict] = None,
+    ) -> List[GenerateResult]:
+        """같은 설정의 프롬프트 여러 개 → 결과 목록 (기본 구현은 하나씩 호출)"""
+        return [self.generate_result(p, model, temperature, extra_options, response_format) for p in prompts]
+
+    def generate(
+        self,
+        prompt: str,
+        model: str = "llama3.1:8b",
+        temperature: float = 0.0,
+        extra_options: Optional[dict] = None,
+        response_format: Optional[dict] = None,
+    ) -> str:
+        """비스트리밍 호출 후 응답 텍스트만 반환 (실패 시 BackendError 계열 예외)"""
+        return self.generate_result(prompt, model, temperature, extra_options, response_format).text
+
+    def unload(self, model: str):
+        """모델을 메모리에서 내림 (지원하지 않는 백엔드는 아무것도 하지 않음)"""
+
+    def close(self):
+        pass
+
+
+@dataclass
+class _BatchRequest:
+    prompt: str
+    model: str
+    temperature: float
+    extra_options: Optional[dict]
+    response_format: Optional[dict]
+    future: Future
+
+    def group_key(self) -> Tuple:
+        """요청 하나로 묶을 수 있는지 (모델/옵션/출력 형식이 같아야 함)"""
+        return (
+            self.model,
+            self.temperature,
+            json.dumps(self.extra_options, sort_keys=True),
+            json.dumps(self.response_format, sort_keys=True),
+        )
+
+
+class BatchingBackend(ModelBackend):
+    """
+    generate_result 요청을 모아 generate_batch 한 번으로 보내는 래퍼 (supports_batch 백엔드용).
+    파이프라인의 윈도우 스레드들은 지금처럼 한 윈도우씩 호출하고, 여기서 max_wait_ms 동안
+    최대 max_batch개까지 모은 뒤 같은 설정끼리 묶어서 보낸다 — continuous batching 서버가 한 번에 처리.
+    배치는 max_inflight개까지 동시에 보낸다. 스트리밍/chat 호출은 묶지 않고 그대로 넘긴다.
+    """
+
+    def __init__(self, backend: ModelBackend, max_batch: int = 8, max_wait_ms: float = 10.0, max_inflight: int = 2):
+        self.backend = backend
+        self.name = backend.name
+        self.cache = backend.cache
+        self.max_batch = max(max_batch, 1)
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.batched_prompts = 0
+        self._stats_lock = threading.Lock()
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._pending: "queue.Queue[Optional[_BatchRequest]]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max(max_inflight, 1))
+        self._thread = threading.Thread(target=self._collect, daemon=True)
+        self._thread.start()
+
+    def generate_result(
+        self,
+        prompt: str,
+        model: str = "llama3.1:8b",
+        temperature: float = 0.0,
+        extra_options: Optional[dict] = None,
+        response_format: Optional[dict] = None,
+    ) -> GenerateResult:
+        request = _BatchRequest(prompt, model, temperature, extra_options, response_format, Future())
+        with self._close_lock:
+            # close 뒤에 들어온 요청(투표에서 기다리지 않기로 한 샘플 등)은 모아 줄 스레드가 없음
+            if self._closed:
+                raise BackendError("배치 백엔드가 이미 닫혔습니다")
+            self._pending.put(request)
+        return request.future.result()
+
+    def _collect(self):
+        """대기 중인 요청을 모아 설정별로 묶어서 보냄 (전용 스레드)"""
+        while True:
+            first = self._pending.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._pending.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._pending.put(None)
+                    break
+                batch.append(request)
+
+            groups: Dict[Tuple, List[_BatchRequest]] = {}
+            for request in batch:
+                groups.setdefault(request.group_key(), []).append(request)
+            for requests in groups.values():
+                self._executor.submit(self._send, requests)
+
+    def _send(self, requests: List[_BatchRequest]):
+        head = requests[0]
+        try:
+            results = self.backend.generate_batch(
+                [r.prompt for r in requests], head.model, head.temperature, head.extra_options, head.response_format
+            )
+        except Exception as e:
+            for request in requests:
+                request.future.set_exception(e)
+            return
+        # _send는 max_inflight개 스레드에서 동시에 돌므로 통계는 잠금 안에서 갱신
+        with self._stats_lock:
+            self.batches += 1
+            self.batched_prompts += len(requests)
+        for request, result in zip(requests, results):
+            request.future.set_result(result)
+
+    def chat_result(self, messages, model="llama3.1:8b", temperature=0.0, extra_options=None, response_format=None):
+        return self.backend.chat_result(messages, model, temperature, extra_options, response_format)
+
+    def generate_stream(self, prompt, model="llama3.1:8b", temperature=0.0, num_predict=None, extra_options=None,
+                        stats=None, response_format=None):
+        return self.backend.generate_stream(prompt, model, temperature, num_predict, extra_options, stats, response_format)
+
+    def chat_stream(self, messages, model="llama3.1:8b", temperature=0.0, num_predict=None, extra_options=None,
+                    stats=None, response_format=None):
+        return self.backend.chat_stream(messages, model, temperature, num_predict, extra_options, stats, response_format)
+
+    def generate_batch(self, prompts, model="llama3.1:8b", temperature=0.0, extra_options=None, response_format=None):
+        return self.backend.generate_batch(prompts, model, temperature, extra_options, response_format)
+
+    def unload(self, model: str):
+        self.backend.unload(model)
+
+    def close(self):
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._pending.put(None)
+        # 모으던 배치를 다 넘긴 뒤에 executor를 닫음 (먼저 닫으면 남은 배치의 future가 끝나지 않음)
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+        self.backend.close()
@@ -0,0 +1,179 @@
+#models/cache.py
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+# 캐시 모드
+#   use      : 읽기 + 쓰기 (기본)
+#   bypass   : 캐시를 전혀 사용하지 않음
+#   refresh  : 읽지 않고 새 응답으로 덮어쓰기
+#   readonly : 읽기만 하고 새 응답은 저장하지 않음
+CACHE_MODES = ("use", "bypass", "refresh", "readonly")
+# put이 이만큼 쌓일 때마다 evict — serve 모드처럼 오래 떠 있는 프로세스에서도 크기/나이 제한 유지
+EVICT_EVERY_PUTS = 200
+
+
+def make_cache_key(model: str, options: dict, prompt: str) -> str:
+    """(model, options, prompt) → sha256 해시 키"""
+    payload = json.dumps(
+        {"model": model, "options": options, "prompt": prompt},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    LLM 응답을 SQLite 파일에 저장하는 content-addressed 캐시.
+    크기(max_bytes, LRU) 및 나이(max_age_sec) 기준으로 오래된 항목을 정리한다 (생성 시 + put EVICT_EVERY_PUTS번마다).
+    readonly 모드는 DB를 읽기 전용(mode=ro)으로 열고 파일을 만들거나 바꾸지 않는다.
+    여러 스레드에서 동시에 호출해도 안전하다.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        mode: str = "use",
+        max_bytes: Optional[int] = None,
+        max_age_sec: Optional[float] = None,
+    ):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"지원하지 않는 캐시 모드: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.max_age_sec = max_age_sec
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._puts_since_evict = 0
+        if mode == "readonly":
+            # 캐시 경로에 아무것도 쓰지 않음 (파일이 없거나 테이블이 없으면 빈 캐시)
+            if self.path.exists():
+                self._conn = sqlite3.connect(
+                    f"{self.path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False, timeout=30
+                )
+                exists = self._conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'responses'"
+                ).fetchone()
+                if exists is None:
+                    self.close()
+        elif mode != "bypass":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    response TEXT,
+                    size INTEGER,
+                    created_at REAL,
+                    accessed_at REAL
+                )"""
+            )
+            self._conn.commit()
+            self.evict()
+
+    @property
+    def readable(self) -> bool:
+        return self.mode in ("use", "readonly")
+
+    @property
+    def writable(self) -> bool:
+        return self.mode in ("use", "refresh")
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.readable:
+            return None
+        now = time.time()
+        with self._lock:
+            if self._conn is None:
+                self.misses += 1
+                return None
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.max_age_sec is not None and now - row[1] > self.max_age_sec):
+                self.misses += 1
+                return None
+            if self.mode == "use":
+                self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, model: str, response: str):
+        if not self.writable:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, len(response.encode("utf-8")), now, now),
+            )
+            self._conn.commit()
+            self._puts_since_evict += 1
+            due = self._puts_since_evict >= EVICT_EVERY_PUTS
+        if due and (self.max_bytes is not None or self.max_age_sec is not None):
+            self.evict()
+
+    def evict(self):
+        """나이 초과 항목 삭제 후, 전체 크기가 max_bytes를 넘으면 가장 오래 안 쓴 항목부터 삭제"""
+        with self._lock:
+            self._puts_since_evict = 0
+            if self.max_age_sec is not None:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?", (time.time() - self.max_age_sec,)
+                )
+            if self.max_bytes is not None:
+                total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+                if total > self.max_bytes:
+                    rows = self._conn.execute(
+                        "SELECT key, size FROM responses ORDER BY accessed_at ASC"
+                    ).fetchall()
+                    stale = []
+                    for key, size in rows:
+                        if total <= self.max_bytes:
+                            break
+                        stale.append((key,))
+                        total -= size
+                    self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+            self._conn.commit()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def open_response_cache(
+    path: Union[str, Path],
+    mode: str = "use",
+    max_mb: Optional[float] = None,
+    max_age_days: Optional[float] = None,
+) -> Optional[ResponseCache]:
+    """CLI 옵션 → ResponseCache (bypass 모드면 None)"""
+    if mode == "bypass":
+        return None
+    return ResponseCache(
+        path,
+        mode=mode,
+        max_bytes=int(max_mb * 1024 * 1024) if max_mb is not None else None,
+        max_age_sec=max_age_days * 86400 if max_age_days is not None else None,
+    )
+
+
+def add_cache_arguments(parser):
+    """argparse에 캐시 관련 옵션 추가 (run_model_predict.py / main2.py 공용)"""
+    parser.add_argument("--cache", type=str, choices=CACHE_MODES, default="use",
+                        help="LLM 응답 캐시 모드 (use/bypass/refresh/readonly)")
+    parser.add_argument("--cache_path", type=str, default=None, help="캐시 SQLite 파일 경로")
+    parser.add_argument("--cache_max_mb", type=float, default=None, help="캐시 최대 크기 (MB, LRU 정리)")
+    parser.add_argument("--cache_max_age_days", type=float, default=None, help="캐시 항목 최대 보관 기간 (일)")
@@ -0,0 +1,174 @@
+#models/fake_backend.py
+import json
+import re
+import threading
+import time
+import zlib
+from typing import Iterator, List, Optional
+
+from models.backend import GenerateResult, ModelBackend
+from models.cache import ResponseCache, make_cache_key
+
+# 프롬프트 안의 timestamp (YYYY-MM-DD HH:MM:SS)
+_TIMESTAMP_PATTERN = r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}"
+# 토큰 수 추정 (utils.windowing.estimate_tokens와 같은 비율)
+_CHARS_PER_TOKEN = 4
+
+
+class FakeBackend(ModelBackend):
+    """
+    서버 없이 프로세스 안에서 결정적으로 응답하는 백엔드 (파이프라인/처리량 점검용).
+    프롬프트 데이터의 timestamp 중 (model, timestamp) 해시로 고른 약 anomaly_rate 비율을 이상으로 보고한다
+    — 같은 입력이면 temperature와 상관없이 항상 같은 응답.
+    - response_format이 있으면 schema 모양(anomalies / result)의 JSON으로 응답
+    - num_predict가 있으면 그만큼의 토큰(글자 수 추정)에서 응답을 자른다
+    - latency_ms: 요청 하나(배치 포함)마다 기다리는 시간 — 배치 효과 측정용
+    - cache: 다른 백엔드처럼 temperature=0 비스트리밍 응답을 캐시 (캐시 적중분은 latency 없이 반환)
+    """
+    name = "fake"
+    supports_batch = True
+
+    def __init__(self, anomaly_rate: float = 0.01, latency_ms: float = 0.0, cache: Optional[ResponseCache] = None):
+        self.anomaly_rate = anomaly_rate
+        self.latency_ms = latency_ms
+        self.cache = cache
+        self.requests = 0
+        self.prompts = 0
+        self._lock = threading.Lock()
+
+    def _is_anomaly(self, model: str, timestamp: str) -> bool:
+        return zlib.crc32(f"{model}|{timestamp}".encode()) % 10_000 < self.anomaly_rate * 10_000
+
+    def _respond(self, prompt: str, model: str, extra_options: Optional[dict], response_format: Optional[dict]) -> str:
+        data = prompt.split("Data:", 1)[-1]
+        flagged = [ts for ts in dict.fromkeys(re.findall(_TIMESTAMP_PATTERN, data)) if self._is_anomaly(model, ts)]
+        if response_format is not None:
+            items = [{"timestamp": ts, "score": round(0.5 + (zlib.crc32(ts.encode()) % 50) / 100, 2)} for ts in flagged]
+            payload = {"anomalies": items}
+            if "result" in response_format.get("properties", {}):
+                payload = {"result": "abnormal" if flagged else "normal", **payload}
+            text = json.dumps(payload)
+        else:
+            text = "\n".join(flagged + [f"Final result: **{'abnormal' if flagged else 'normal'}**"])
+        num_predict = (extra_options or {}).get("num_predict")
+        if num_predict is not None and num_predict >= 0:
+            text = text[: num_predict * _CHARS_PER_TOKEN]
+        return text
+
+    def _wait(self, prompts: int):
+        with self._lock:
+            self.requests += 1
+            self.prompts += prompts
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    def _result(self, prompt: str, text: str) -> GenerateResult:
+        latency_ns = int(self.latency_ms * 1e6)
+        return GenerateResult(
+            text=text,
+            prompt_eval_count=len(prompt) // _CHARS_PER_TOKEN,
+            eval_count=len(text) // _CHARS_PER_TOKEN,
+            total_duration=latency_ns,
+            load_duration=0,
+        )
+
+    def generate_batch(
+        self,
+        prompts: List[str],
+        model: str = "llama3.1:8b",
+        temperature: float = 0.0,
+        extra_options: Optional[dict] = None,
+        response_format: Optional[dict] = None,
+    ) -> List[GenerateResult]:
+        """캐시에 없는 프롬프트만 요청 하나로 처리"""
+        keys = [self._cache_key(p, model, temperature, extra_options, response_format) for p in prompts]
+        results: List[Optional[GenerateResult]] = [None] * len(prompts)
+        for i, key in enumerate(keys):
+            cached = self.cache.get(key) if key is not None else None
+            if cached is not None:
+                results[i] = GenerateResult(text=cached, cached=True)
+        missing = [i for i, r in enumerate(results) if r is None]
+        if missing:
+            for i, result in zip(missing, self._generate([prompts[i] for i in missing], model, extra_options, response_format)):
+                results[i] = result
+                if keys[i] is not None:
+                    self.cache.put(keys[i], model, result.text)
+        return results
+
+    def _cache_key(
+        self,
+        prompt: str,
+        model: str,
+        temperature: float,
+        extra_options: Optional[dict],
+        response_format: Optional[dict],
+    ) -> Optional[str]:
+        """temperature=0 요청만 캐시 (다른 백엔드 응답과 섞이지 않게 "fake"를 키에 포함)"""
+        if self.cache is None or temperature != 0:
+            return None
+        options = {"temperature": temperature, **(extra_options or {}), "format": response_format}
+        return make_cache_key(model, options, f"fake\n{prompt}")
+
+    def _generate(
+        self,
+        prompts: List[str],
+        model: str,
+        extra_options: Optional[dict],
+        response_format: Optional[dict],
+    ) -> List[GenerateResult]:
+        self._wait(len(prompts))
+        return [self._result(p, self._respond(p, model, extra_options, response_format)) for p in prompts]
+
+    def generate_result(
+        self,
+        prompt: str,
+        model: str = "llama3.1:8b",
+        temperature: float = 0.0,
+        extra_options: Optional[dict] = None,
+        response_format: Optional[dict] = None,
+    ) -> GenerateResult:
+        return self.generate_batch([prompt], model, temperature, extra_options, response_format)[0]
+
+    def chat_result(
+        self,
+        messages: List[dict],
+        model: str = "llama3.1:8b",
+        temperature: float = 0.0,
+        extra_options: Optional[dict] = None,
+        response_format: Optional[dict] = None,
+    ) -> GenerateResult:
+        prompt = "\n".join(m.get("content", "") for m in messages)
+        return self.generate_result(prompt, model, temperature, extra_options, response_format)
+
+    def _stream(self, result: GenerateResult, stats: Optional[dict]) -> Iterator[str]:
+        for i in range(0, len(result.text), _CHARS_PER_TOKEN):
+            yield result.text[i:i + _CHARS_PER_TOKEN]
+        if stats is not None:
+            stats.update(result.metrics())
+
+    def generate_stream(
+        self,
+        prompt: str,
+        model: str = "llama3.1:8b",
+        temperature: float = 0.0,
+        num_predict: Optional[int] = None,
+        extra_options: Optional[dict] = None,
+        stats: Optional[dict] = None,
+        response_format: Optional[dict] = None,
+    ) -> Iterator[str]:
+        options = {**(extra_options or {}), **({"num_predict": num_predict} if num_predict is not None else {})}
+        # 스트리밍 응답은 캐시하지 않음 (다른 백엔드와 같음)
+        return self._stream(self._generate([prompt], model, options, response_format)[0], stats)
+
+    def chat_stream(
+        self,
+        messages: List[dict],
+        model: str = "llama3.1:8b",
+        temperature: float = 0.0,
+        num_predict: Optional[int] = None,
+        extra_options: Optional[dict] = None,
+        stats: Optional[dict] = None,
+        response_format: Optional[dict] = None,
+    ) -> Iterator[str]:
+        prompt = "\n".join(m.get("content", "") for m in messages)
+        return self.generate_stream(prompt, model, temperature, num_predict, extra_options, stats, response_format)
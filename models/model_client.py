@@ -1,17 +1,392 @@
 #models/model_client.py
+import json
+import threading
+from typing import Iterator, List, Optional
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from models.backend import BACKENDS, BackendError, BatchingBackend, GenerateResult, ModelBackend, ollama_metrics
+from models.cache import ResponseCache, make_cache_key
+from models.fake_backend import FakeBackend
+from models.openai_client import DEFAULT_OPENAI_URL, OpenAICompatibleClient
+
+DEFAULT_OLLAMA_URL = "http://localhost:11434"
+
+
+class OllamaError(BackendError):
+    """Ollama 호출 실패의 공통 상위 예외"""
+
+
+class OllamaConnectionError(OllamaError):
+    """서버에 연결할 수 없음 (재시도 후에도 실패)"""
+
+
+class OllamaTimeoutError(OllamaError):
+    """연결 또는 응답 대기 시간 초과"""
+
+
+class OllamaHTTPError(OllamaError):
+    """서버가 오류 상태 코드를 반환 (5xx는 재시도 후에도 실패한 경우)"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class OllamaResponseError(OllamaError):
+    """응답 본문을 해석할 수 없음"""
+
+
+def _extract_text(data: dict) -> Optional[str]:
+    """/api/generate 응답은 response, /api/chat 응답은 message.content"""
+    if "response" in data:
+        return data["response"]
+    message = data.get("message")
+    if isinstance(message, dict):
+        return message.get("content")
+    return None
+
+
+class OllamaClient(ModelBackend):
+    """
+    재사용 가능한 Ollama HTTP 클라이언트 (ModelBackend 구현, /api/generate는 프롬프트를 하나씩만 받으므로 배치 없음).
+    - requests.Session 기반 커넥션 풀 (윈도우마다 TCP 연결을 새로 열지 않음)
+    - connect/read 타임아웃
+    - 5xx 및 연결 오류에 대한 backoff 재시도
+    - keep_alive로 윈도우 사이에 모델이 언로드되지 않도록 유지
+    - 실패 시 "[ERROR] ..." 문자열 대신 OllamaError 계열 예외 발생
+    """
+
+    name = "ollama"
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_OLLAMA_URL,
+        connect_timeout: float = 5.0,
+        read_timeout: Optional[float] = 600.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        keep_alive: Optional[str] = "30m",
+        pool_size: int = 16,
+        cache: Optional[ResponseCache] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.keep_alive = keep_alive
+        self.cache = cache
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,  # 생성 도중 끊긴 요청은 재전송하지 않음 (GPU 시간 중복 방지)
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset(["POST"]),
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _post(self, path: str, payload: dict) -> dict:
+        url = f"{self.base_url}{path}"
+        try:
+            response = self.session.post(url, json=payload, timeout=self.timeout)
+        except requests.exceptions.RetryError as e:
+            raise OllamaHTTPError(f"Ollama 요청 재시도 초과: {e}") from e
+        except requests.exceptions.Timeout as e:
+            raise OllamaTimeoutError(f"Ollama 요청 시간 초과: {e}") from e
+        except requests.exceptions.ConnectionError as e:
+            raise OllamaConnectionError(f"Ollama 서버 연결 실패: {e}") from e
+        except requests.exceptions.RequestException as e:
+            raise OllamaConnectionError(f"Ollama 요청 실패: {e}") from e
+
+        if response.status_code >= 400:
+            raise OllamaHTTPError(
+                f"Ollama 요청 실패 ({response.status_code}): {response.text[:200]}",
+                status_code=response.status_code,
+            )
+        try:
+            return response.json()
+        except ValueError as e:
+            raise OllamaResponseError(f"Ollama 응답 JSON 파싱 실패: {response.text[:200]}") from e
+
+    def _options(self, temperature: float, extra_options: Optional[dict]) -> dict:
+        return {"temperature": temperature, **(extra_options or {})}
+
+    @staticmethod
+    def _with_format(body: dict, cache_source: str, response_format: Optional[dict]):
+        """format(JSON schema)이 있으면 요청 본문과 캐시 키 원본에 포함 (없으면 기존 키 그대로)"""
+        if response_format is None:
+            return body, cache_source
+        source = json.dumps({"source": cache_source, "format": response_format}, ensure_ascii=False, sort_keys=True)
+        return {**body, "format": response_format}, source
+
+    def _request(self, endpoint: str, body: dict, model: str, options: dict, cache_source: str) -> GenerateResult:
+        """
+        비스트리밍 호출 공통 처리 (/api/generate, /api/chat).
+        결정적인 응답(temperature=0)만 캐시 — 샘플링 결과를 캐시하면 반복 실험이 의미 없어짐.
+        """
+        cache_key = None
+        if self.cache is not None and options.get("temperature") == 0:
+            cache_key = make_cache_key(model, options, cache_source)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return GenerateResult(text=cached, cached=True)
+
+        payload = {"model": model, **body, "options": options, "stream": False}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+
+        data = self._post(endpoint, payload)
+        text = _extract_text(data)
+        if text is None:
+            raise OllamaResponseError(f"Ollama 응답에 텍스트 필드 없음: {str(data)[:200]}")
+
+        if cache_key is not None:
+            self.cache.put(cache_key, model, text)
+        return GenerateResult(
+            text=text,
+            prompt_eval_count=data.get("prompt_eval_count"),
+            eval_count=data.get("eval_count"),
+            total_duration=data.get("total_duration"),
+            load_duration=data.get("load_duration"),
+            prompt_eval_duration=data.get("prompt_eval_duration"),
+            eval_duration=data.get("eval_duration"),
+        )
+
+    def generate_result(
+        self,
+        prompt: str,
+        model: str = "llama3.1:8b",
+        temperature: float = 0.0,
+        extra_options: Optional[dict] = None,
+        response_format: Optional[dict] = None,
+    ) -> GenerateResult:
+        """/api/generate 호출 → 응답 텍스트 + Ollama 토큰/시간 지표 (response_format: Ollama format, JSON schema)"""
+        options = self._options(temperature, extra_options)
+        body, cache_source = self._with_format({"prompt": prompt}, prompt, response_format)
+        return self._request("/api/generate", body, model, options, cache_source)
+
+    def chat_result(
+        self,
+        messages: List[dict],
+        model: str = "llama3.1:8b",
+        temperature: float = 0.0,
+        extra_options: Optional[dict] = None,
+        response_format: Optional[dict] = None,
+    ) -> GenerateResult:
+        """/api/chat 호출 → 응답 텍스트 + Ollama 토큰/시간 지표 (messages: [{"role", "content"}, ...])"""
+        options = self._options(temperature, extra_options)
+        cache_source = json.dumps(messages, ensure_ascii=False, sort_keys=True)
+        body, cache_source = self._with_format({"messages": messages}, cache_source, response_format)
+        return self._request("/api/chat", body, model, options, cache_source)
+
+    def _stream(
+        self,
+        endpoint: str,
+        body: dict,
+        model: str,
+        options: dict,
+        stats: Optional[dict] = None,
+    ) -> Iterator[str]:
+        """
+        스트리밍 호출 공통 처리 — NDJSON 청크가 도착할 때마다 응답 텍스트 조각을 yield.
+        제너레이터를 중간에 닫으면(close) 연결을 끊어 서버 측 생성도 중단된다.
+        스트리밍 응답은 캐시하지 않는다 (조기 중단된 응답은 전체 응답과 다르므로).
+        stats가 주어지면 끝까지 받은 경우 마지막 청크의 지표(ollama_metrics)를 기록한다.
+        """
+        payload = {"model": model, **body, "options": options, "stream": True}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+
+        url = f"{self.base_url}{endpoint}"
+        try:
+            response = self.session.post(url, json=payload, timeout=self.timeout, stream=True)
+        except requests.exceptions.RetryError as e:
+            raise OllamaHTTPError(f"Ollama 요청 재시도 초과: {e}") from e
+        except requests.exceptions.Timeout as e:
+            raise OllamaTimeoutError(f"Ollama 요청 시간 초과: {e}") from e
+        except requests.exceptions.ConnectionError as e:
+            raise OllamaConnectionError(f"Ollama 서버 연결 실패: {e}") from e
+        except requests.exceptions.RequestException as e:
+            raise OllamaConnectionError(f"Ollama 요청 실패: {e}") from e
+
+        try:
+            if response.status_code >= 400:
+                raise OllamaHTTPError(
+                    f"Ollama 요청 실패 ({response.status_code}): {response.text[:200]}",
+                    status_code=response.status_code,
+                )
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                try:
+                    data = json.loads(line)
+                except ValueError as e:
+                    raise OllamaResponseError(f"Ollama 스트림 청크 파싱 실패: {line[:200]!r}") from e
+                if "error" in data:
+                    raise OllamaResponseError(f"Ollama 스트림 오류: {data['error']}")
+                text = _extract_text(data)
+                if text:
+                    yield text
+                if data.get("done"):
+                    if stats is not None:
+                        stats.update(ollama_metrics(data))
+                    break
+        except requests.exceptions.Timeout as e:
+            raise OllamaTimeoutError(f"Ollama 스트림 수신 시간 초과: {e}") from e
+        except requests.exceptions.ConnectionError as e:
+            raise OllamaConnectionError(f"Ollama 스트림 연결 끊김: {e}") from e
+        except requests.exceptions.RequestException as e:
+            # ChunkedEncodingError 등 스트림 도중 끊긴 경우
+            raise OllamaConnectionError(f"Ollama 스트림 수신 실패: {e}") from e
+        finally:
+            response.close()
+
+    def generate_stream(
+        self,
+        prompt: str,
+        model: str = "llama3.1:8b",
+        temperature: float = 0.0,
+        num_predict: Optional[int] = None,
+        extra_options: Optional[dict] = None,
+        stats: Optional[dict] = None,
+        response_format: Optional[dict] = None,
+    ) -> Iterator[str]:
+        """/api/generate 스트리밍 호출 (_stream 참고)"""
+        options = self._options(temperature, extra_options)
+        if num_predict is not None:
+            options["num_predict"] = num_predict
+        body, _ = self._with_format({"prompt": prompt}, prompt, response_format)
+        return self._stream("/api/generate", body, model, options, stats)
+
+    def chat_stream(
+        self,
+        messages: List[dict],
+        model: str = "llama3.1:8b",
+        temperature: float = 0.0,
+        num_predict: Optional[int] = None,
+        extra_options: Optional[dict] = None,
+        stats: Optional[dict] = None,
+        response_format: Optional[dict] = None,
+    ) -> Iterator[str]:
+        """/api/chat 스트리밍 호출 (_stream 참고)"""
+        options = self._options(temperature, extra_options)
+        if num_predict is not None:
+            options["num_predict"] = num_predict
+        body, _ = self._with_format({"messages": messages}, "", response_format)
+        return self._stream("/api/chat", body, model, options, stats)
+
+    def unload(self, model: str):
+        """모델을 즉시 메모리에서 내림 (keep_alive=0) — 다음 모델이 VRAM을 두고 경쟁하지 않게"""
+        self._post("/api/generate", {"model": model, "keep_alive": 0})
+
+    def close(self):
+        self.session.close()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client() -> ModelBackend:
+    """프로세스 전역에서 공유하는 기본 클라이언트 (Ollama)"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = OllamaClient()
+        return _default_client
+
+
+def create_backend(
+    backend: str = "ollama",
+    ollama_url: str = DEFAULT_OLLAMA_URL,
+    openai_url: str = DEFAULT_OPENAI_URL,
+    api_key: Optional[str] = None,
+    connect_timeout: float = 5.0,
+    read_timeout: Optional[float] = 600.0,
+    retries: int = 3,
+    keep_alive: Optional[str] = "30m",
+    pool_size: int = 16,
+    max_batch: int = 8,
+    batch_wait_ms: float = 10.0,
+    max_inflight: int = 2,
+    fake_latency_ms: float = 0.0,
+    cache: Optional[ResponseCache] = None,
+) -> ModelBackend:
+    """
+    백엔드 종류(BACKENDS) → ModelBackend.
+    여러 프롬프트를 한 요청으로 받는 백엔드(openai, fake)는 max_batch > 1이면 BatchingBackend로 감싼다
+    (배치는 max_inflight개까지 동시에 전송).
+    """
+    if backend == "ollama":
+        client = OllamaClient(ollama_url, connect_timeout, read_timeout, retries, keep_alive=keep_alive, pool_size=pool_size, cache=cache)
+    elif backend == "openai":
+        client = OpenAICompatibleClient(
+            openai_url, connect_timeout, read_timeout, retries, pool_size=pool_size, api_key=api_key, cache=cache
+        )
+    elif backend == "fake":
+        client = FakeBackend(latency_ms=fake_latency_ms, cache=cache)
+    else:
+        raise ValueError(f"지원하지 않는 백엔드: {backend} (가능: {', '.join(BACKENDS)})")
+    if client.supports_batch and max_batch > 1:
+        client = BatchingBackend(client, max_batch, batch_wait_ms, max_inflight)
+    return client
+
+
+def query_ollama(
+    prompt: str,
+    model="llama3.1:8b",
+    temperature=0.0,
+    client: Optional[ModelBackend] = None,
+    extra_options: Optional[dict] = None,
+    response_format: Optional[dict] = None,
+) -> str:
+    """기존 호출부 호환용 함수 (client가 없으면 기본 Ollama 클라이언트). 실패 시 BackendError 계열 예외 발생."""
+    client = client or get_default_client()
+    return client.generate(
+        prompt, model=model, temperature=temperature, extra_options=extra_options, response_format=response_format
+    )
+
+
+def add_client_arguments(parser):
+    """argparse에 모델 백엔드/클라이언트 옵션 추가 (run_model_predict.py / main2.py 공용)"""
+    parser.add_argument("--backend", type=str, choices=BACKENDS, default="ollama", help="모델 백엔드 (openai: llama.cpp server/vLLM 등 /v1/completions, fake: 서버 없이 결정적 응답)")
+    parser.add_argument("--ollama_url", type=str, default=DEFAULT_OLLAMA_URL, help="Ollama 서버 주소")
+    parser.add_argument("--openai_url", type=str, default=DEFAULT_OPENAI_URL, help="[openai] OpenAI 호환 서버 주소")
+    parser.add_argument("--api_key", type=str, default=None, help="[openai] API 키 (로컬 서버는 보통 불필요)")
+    parser.add_argument("--connect_timeout", type=float, default=5.0, help="연결 타임아웃 (초)")
+    parser.add_argument("--read_timeout", type=float, default=600.0, help="응답 대기 타임아웃 (초)")
+    parser.add_argument("--retries", type=int, default=3, help="5xx/연결 오류 재시도 횟수")
+    parser.add_argument("--keep_alive", type=str, default="30m", help="요청 후 모델을 메모리에 유지할 시간 (Ollama keep_alive)")
+    parser.add_argument("--max_batch", type=int, default=8, help="[openai/fake] 동시에 들어온 윈도우를 요청 하나로 묶을 최대 개수 (1이면 묶지 않음)")
+    parser.add_argument("--batch_wait_ms", type=float, default=10.0, help="[openai/fake] 배치를 모으기 위해 기다리는 최대 시간 (ms)")
+    parser.add_argument("--max_inflight", type=int, default=2, help="[openai/fake] 동시에 보낼 배치 요청 수")
+    parser.add_argument("--fake_latency_ms", type=float, default=0.0, help="[fake] 요청마다 기다리는 시간 (ms)")
+
+
+def client_kwargs_from_args(args) -> dict:
+    """CLI 옵션 → create_backend 인자 (워커 프로세스로 넘길 수 있는 단순 dict)"""
+    return dict(
+        backend=args.backend,
+        ollama_url=args.ollama_url,
+        openai_url=args.openai_url,
+        api_key=args.api_key,
+        connect_timeout=args.connect_timeout,
+        read_timeout=args.read_timeout,
+        retries=args.retries,
+        keep_alive=args.keep_alive,
+        pool_size=max(16, getattr(args, "concurrency", 1)),
+        max_batch=args.max_batch,
+        batch_wait_ms=args.batch_wait_ms,
+        max_inflight=args.max_inflight,
+        fake_latency_ms=args.fake_latency_ms,
+    )
+
 
-def query_ollama(prompt: str, model="llama3.1:8b", temperature=0.0) -> str:
-    url = "http://localhost:11434/api/generate"
-    payload = {
-        "model": model,
-        "prompt": prompt,
-        "temperature": temperature,
-        "stream": False
-    }
-    try:
-        response = requests.post(url, json=payload)
-        response.raise_for_status()
-        return response.json()["response"]
-    except Exception as e:
-        return f"[ERROR] Ollama 요청 실패: {e}"
+def client_from_args(args, cache: Optional[ResponseCache] = None) -> ModelBackend:
+    return create_backend(**client_kwargs_from_args(args), cache=cache)
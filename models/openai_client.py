@@ -0,0 +1,290 @@
+#models/openai_client.py
+import json
+import time
+from typing import Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from models.backend import BackendError, GenerateResult, ModelBackend
+from models.cache import ResponseCache, make_cache_key
+
+# OpenAI 호환 로컬 서버 (llama.cpp server 기본 8080, vLLM 기본 8000)
+DEFAULT_OPENAI_URL = "http://localhost:8080"
+
+# Ollama options → OpenAI 요청 필드 (num_ctx 등 서버 시작 시 정하는 값은 무시)
+_OPTION_FIELDS = {
+    "num_predict": "max_tokens",
+    "seed": "seed",
+    "top_p": "top_p",
+    "top_k": "top_k",
+    "stop": "stop",
+}
+
+
+class OpenAIBackendError(BackendError):
+    """OpenAI 호환 서버 호출 실패 (연결/타임아웃/오류 상태 코드/응답 형식)"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _split_count(total: Optional[int], weights: List[int]) -> List[Optional[int]]:
+    """배치 요청의 usage 합계 → 항목별 추정치 (weights 비율, 합계는 보존)"""
+    if total is None:
+        return [None] * len(weights)
+    if sum(weights) == 0:
+        weights = [1] * len(weights)
+    counts = [total * w // sum(weights) for w in weights]
+    counts[-1] += total - sum(counts)
+    return counts
+
+
+class OpenAICompatibleClient(ModelBackend):
+    """
+    OpenAI 호환 /v1/completions, /v1/chat/completions 클라이언트 (llama.cpp server, vLLM 등).
+    /v1/completions는 프롬프트 목록을 한 요청으로 받으므로 generate_batch가 요청 하나로 처리된다
+    (BatchingBackend로 감싸면 동시에 들어온 윈도우들이 자동으로 묶임).
+    """
+    name = "openai"
+    supports_batch = True
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_OPENAI_URL,
+        connect_timeout: float = 5.0,
+        read_timeout: Optional[float] = 600.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        pool_size: int = 16,
+        api_key: Optional[str] = None,
+        cache: Optional[ResponseCache] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.cache = cache
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset(["POST"]),
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+    def _body(self, model: str, temperature: float, extra_options: Optional[dict], response_format: Optional[dict]) -> dict:
+        body = {"model": model, "temperature": temperature}
+        for key, value in (extra_options or {}).items():
+            if key in _OPTION_FIELDS:
+                body[_OPTION_FIELDS[key]] = value
+        if response_format is not None:
+            # response_format: vLLM / OpenAI 형식, json_schema: llama.cpp server 형식
+            body["response_format"] = {"type": "json_schema", "json_schema": {"name": "output", "schema": response_format}}
+            body["json_schema"] = response_format
+        return body
+
+    def _post(self, path: str, payload: dict, stream: bool = False) -> requests.Response:
+        url = f"{self.base_url}{path}"
+        try:
+            response = self.session.post(url, json=payload, timeout=self.timeout, stream=stream)
+        except requests.exceptions.RetryError as e:
+            raise OpenAIBackendError(f"요청 재시도 초과 ({url}): {e}") from e
+        except requests.exceptions.Timeout as e:
+            raise OpenAIBackendError(f"요청 시간 초과 ({url}): {e}") from e
+        except requests.exceptions.ConnectionError as e:
+            raise OpenAIBackendError(f"서버 연결 실패 ({url}): {e}") from e
+        except requests.exceptions.RequestException as e:
+            raise OpenAIBackendError(f"요청 실패 ({url}): {e}") from e
+        if response.status_code >= 400:
+            text = response.text[:200]
+            response.close()
+            raise OpenAIBackendError(f"요청 실패 ({response.status_code}): {text}", status_code=response.status_code)
+        return response
+
+    def _post_json(self, path: str, payload: dict) -> dict:
+        response = self._post(path, payload)
+        try:
+            return response.json()
+        except ValueError as e:
+            raise OpenAIBackendError(f"응답 JSON 파싱 실패: {response.text[:200]}") from e
+
+    def _cache_key(self, endpoint: str, body: dict, source: str) -> Optional[str]:
+        """temperature=0 요청만 캐시 (Ollama 응답과 섞이지 않게 endpoint를 키에 포함)"""
+        if self.cache is None or body.get("temperature") != 0:
+            return None
+        options = {k: v for k, v in body.items() if k != "model"}
+        return make_cache_key(body["model"], options, f"{endpoint}\n{source}")
+
+    def generate_batch(
+        self,
+        prompts: List[str],
+        model: str = "llama3.1:8b",
+        temperature: float = 0.0,
+        extra_options: Optional[dict] = None,
+        response_format: Optional[dict] = None,
+    ) -> List[GenerateResult]:
+        """/v1/completions 한 번으로 여러 프롬프트 처리 (캐시에 있는 프롬프트는 보내지 않음)"""
+        body = self._body(model, temperature, extra_options, response_format)
+        results: List[Optional[GenerateResult]] = [None] * len(prompts)
+        keys = [self._cache_key("/v1/completions", body, p) for p in prompts]
+        for i, key in enumerate(keys):
+            cached = self.cache.get(key) if key is not None else None
+            if cached is not None:
+                results[i] = GenerateResult(text=cached, cached=True)
+        missing = [i for i, r in enumerate(results) if r is None]
+        if not missing:
+            return results
+
+        started = time.perf_counter_ns()
+        batch = [prompts[i] for i in missing]
+        data = self._post_json("/v1/completions", {**body, "prompt": batch if len(batch) > 1 else batch[0]})
+        elapsed = time.perf_counter_ns() - started
+        choices = sorted(data.get("choices") or [], key=lambda c: c.get("index", 0))
+        if len(choices) != len(missing):
+            raise OpenAIBackendError(f"응답 개수 불일치: 프롬프트 {len(missing)}개, choices {len(choices)}개")
+
+        texts = [choice.get("text") or "" for choice in choices]
+        if len(missing) == 1:
+            results[missing[0]] = _result_from_response(texts[0], data, elapsed)
+            if keys[missing[0]] is not None:
+                self.cache.put(keys[missing[0]], model, texts[0])
+            return results
+
+        usage = data.get("usage") or {}
+        prompt_counts = _split_count(usage.get("prompt_tokens"), [len(prompts[i]) for i in missing])
+        eval_counts = _split_count(usage.get("completion_tokens"), [len(t) for t in texts])
+        for n, i in enumerate(missing):
+            results[i] = GenerateResult(
+                text=texts[n], prompt_eval_count=prompt_counts[n], eval_count=eval_counts[n], total_duration=elapsed
+            )
+            if keys[i] is not None:
+                self.cache.put(keys[i], model, texts[n])
+        return results
+
+    def generate_result(
+        self,
+        prompt: str,
+        model: str = "llama3.1:8b",
+        temperature: float = 0.0,
+        extra_options: Optional[dict] = None,
+        response_format: Optional[dict] = None,
+    ) -> GenerateResult:
+        return self.generate_batch([prompt], model, temperature, extra_options, response_format)[0]
+
+    def chat_result(
+        self,
+        messages: List[dict],
+        model: str = "llama3.1:8b",
+        temperature: float = 0.0,
+        extra_options: Optional[dict] = None,
+        response_format: Optional[dict] = None,
+    ) -> GenerateResult:
+        """/v1/chat/completions 호출 (메시지 목록은 배치로 묶지 않음)"""
+        body = self._body(model, temperature, extra_options, response_format)
+        key = self._cache_key("/v1/chat/completions", body, json.dumps(messages, ensure_ascii=False, sort_keys=True))
+        cached = self.cache.get(key) if key is not None else None
+        if cached is not None:
+            return GenerateResult(text=cached, cached=True)
+
+        started = time.perf_counter_ns()
+        data = self._post_json("/v1/chat/completions", {**body, "messages": messages})
+        elapsed = time.perf_counter_ns() - started
+        try:
+            text = data["choices"][0]["message"]["content"] or ""
+        except (KeyError, IndexError, TypeError) as e:
+            raise OpenAIBackendError(f"응답에 텍스트 필드 없음: {str(data)[:200]}") from e
+        if key is not None:
+            self.cache.put(key, model, text)
+        return _result_from_response(text, data, elapsed)
+
+    def _stream(self, endpoint: str, payload: dict, stats: Optional[dict]) -> Iterator[str]:
+        """SSE(data: ...) 스트림 → 텍스트 조각. 제너레이터를 닫으면 연결을 끊어 서버 측 생성도 중단된다."""
+        payload = {**payload, "stream": True, "stream_options": {"include_usage": True}}
+        response = self._post(endpoint, payload, stream=True)
+        try:
+            for line in response.iter_lines():
+                if not line or not line.startswith(b"data:"):
+                    continue
+                chunk = line[5:].strip()
+                if chunk == b"[DONE]":
+                    break
+                try:
+                    data = json.loads(chunk)
+                except ValueError as e:
+                    raise OpenAIBackendError(f"스트림 청크 파싱 실패: {chunk[:200]!r}") from e
+                usage = data.get("usage")
+                if usage and stats is not None:
+                    stats.update(prompt_eval_count=usage.get("prompt_tokens"), eval_count=usage.get("completion_tokens"))
+                for choice in data.get("choices") or []:
+                    text = choice.get("text") if "text" in choice else (choice.get("delta") or {}).get("content")
+                    if text:
+                        yield text
+        except requests.exceptions.Timeout as e:
+            raise OpenAIBackendError(f"스트림 수신 시간 초과: {e}") from e
+        except requests.exceptions.ConnectionError as e:
+            raise OpenAIBackendError(f"스트림 연결 끊김: {e}") from e
+        except requests.exceptions.RequestException as e:
+            # ChunkedEncodingError 등 스트림 도중 끊긴 경우
+            raise OpenAIBackendError(f"스트림 수신 실패: {e}") from e
+        finally:
+            response.close()
+
+    def generate_stream(
+        self,
+        prompt: str,
+        model: str = "llama3.1:8b",
+        temperature: float = 0.0,
+        num_predict: Optional[int] = None,
+        extra_options: Optional[dict] = None,
+        stats: Optional[dict] = None,
+        response_format: Optional[dict] = None,
+    ) -> Iterator[str]:
+        body = self._body(model, temperature, extra_options, response_format)
+        if num_predict is not None:
+            body["max_tokens"] = num_predict
+        return self._stream("/v1/completions", {**body, "prompt": prompt}, stats)
+
+    def chat_stream(
+        self,
+        messages: List[dict],
+        model: str = "llama3.1:8b",
+        temperature: float = 0.0,
+        num_predict: Optional[int] = None,
+        extra_options: Optional[dict] = None,
+        stats: Optional[dict] = None,
+        response_format: Optional[dict] = None,
+    ) -> Iterator[str]:
+        body = self._body(model, temperature, extra_options, response_format)
+        if num_predict is not None:
+            body["max_tokens"] = num_predict
+        return self._stream("/v1/chat/completions", {**body, "messages": messages}, stats)
+
+    def close(self):
+        self.session.close()
+
+
+def _result_from_response(text: str, data: dict, elapsed_ns: int) -> GenerateResult:
+    """
+    단일 응답 → GenerateResult. llama.cpp server가 주는 timings(prompt_n: 실제 prefill 토큰 수)가 있으면
+    그것을 쓰고, 없으면 usage 토큰 수를 쓴다.
+    """
+    usage = data.get("usage") or {}
+    timings = data.get("timings") or {}
+    return GenerateResult(
+        text=text,
+        prompt_eval_count=timings.get("prompt_n", usage.get("prompt_tokens")),
+        eval_count=timings.get("predicted_n", usage.get("completion_tokens")),
+        total_duration=elapsed_ns,
+        prompt_eval_duration=int(timings["prompt_ms"] * 1e6) if "prompt_ms" in timings else None,
+        eval_duration=int(timings["predicted_ms"] * 1e6) if "predicted_ms" in timings else None,
+    )
@@ -38,12 +38,19 @@ if [ "$mode" == "predict" ]; then
     read -p "🔁 반복 횟수 입력 (기본: 1): " repeat
     repeat=${repeat:-1}
 
+    read -p "⚡ 동시 처리 윈도우 수 (기본: 1): " concurrency
+    concurrency=${concurrency:-1}
+
+    # 🗳️ 반복 대신 윈도우마다 여러 샘플을 동시에 보내 다수결 (결과 파일 하나)
+    read -p "🗳️ 윈도우당 투표 샘플 수 (기본: 1 = 투표 안 함): " vote
+    vote=${vote:-1}
+
     echo "🚀 모델 예측 반복 실행 중..."
 
     # ✅ 루프 추가
     for ((i=1; i<=repeat; i++)); do
         echo "🔂 실행 $i / $repeat"
-        python3 "$PYTHON_SCRIPT" --folder "$folder" --file "$file" --mode "$mode" --model "$model" --temp "$temp" --num_rows "$num_rows"
+        python3 "$PYTHON_SCRIPT" --folder "$folder" --file "$file" --mode "$mode" --model "$model" --temp "$temp" --num_rows "$num_rows" --concurrency "$concurrency" --vote "$vote"
     done
 
     # echo "🚀 모델 예측 실행 중..."
@@ -61,13 +68,18 @@ elif [ "$mode" == "evaluate" ]; then
         exit 1
     fi
 
-    select pred_file in "${pred_files[@]}"; do
+    select pred_file in "ALL" "${pred_files[@]}"; do
         [[ -n "$pred_file" ]] && break
     done
 
     echo "📐 정확도 비교 중..."
-    # 🔧 수정: 예측 파일 경로에 하위 폴더 포함
-    python3 "$PYTHON_SCRIPT" --folder "$folder" --file "$file_stem/$pred_file" --mode "$mode"
+    if [ "$pred_file" == "ALL" ]; then
+        # 결과 폴더 전체(_v1_N.csv 모든 버전)를 한 번에 평가
+        python3 "$PYTHON_SCRIPT" --folder "$folder" --file "$file_stem" --mode "$mode"
+    else
+        # 🔧 수정: 예측 파일 경로에 하위 폴더 포함
+        python3 "$PYTHON_SCRIPT" --folder "$folder" --file "$file_stem/$pred_file" --mode "$mode"
+    fi
 
 
 # ⚙️ label 모드
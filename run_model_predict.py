@@ -1,64 +1,124 @@
 import argparse
-import csv
+import queue
+import re
+import sys
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict, fields, replace
 from datetime import datetime
+from itertools import chain
+from multiprocessing import Manager
 from pathlib import Path
-from typing import List, Optional
-import tempfile
-import os
+from typing import Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
 
 from utils.labeling import (
     load_json_file,
     simple_mark_anormal_flexible,
-    compare_label_accuracy,
+    write_labeled_csv,
+    write_labeled_csv_chunked,
+    build_label_jobs,
+    label_corpus,
+)
+from utils.evaluate import (
+    align_by_timestamp,
+    evaluate_anomaly_sets,
+    evaluate_arrays,
+    evaluate_many,
+    evaluate_streaming,
+    load_label_arrays,
+)
+from utils.predict import (
+    PredictOptions,
+    StreamStopRules,
+    build_window_prompt,
+    llm_options_for,
+    load_prompt_parts,
+    predict_from_prompt,
+    predict_window,
 )
-from utils.predict import query_ollama_and_extract_timestamps
-from utils.file import read_csv_file
+from utils.manifest import RunManifest
+from utils.live import BACKPRESSURE_POLICIES, LINE_QUEUE_SIZE, JsonlEventSink, LiveDetector, LiveSourceError, read_stream, tail_file
+from utils.prefilter import DEFAULT_THRESHOLDS, PREFILTER_METHODS, point_scores, screen_windows
+from utils.windowing import WindowPlan, build_window_plan, fit_token_model, plan_window_rows
+from utils.chunked import DEFAULT_CHUNK_ROWS, iter_csv_chunks, iter_window_batches, snap_chunked
+from utils.hierarchy import HierarchyOptions, coarse_to_fine_windows
+from utils.dataset import load_series, load_timestamps, read_series_frame
+from utils.timestamps import NS_PER_SEC, TimestampIndex, datetimes_to_ns
+from utils.prompt import PROMPT_LAYOUTS
+from utils.telemetry import TELEMETRY_REPORTS, StageTimer, Telemetry, report
+from utils.serialize import DATA_FORMATS
+from utils.runstore import RunStore
+from utils.daemon import DEFAULT_DAEMON_HOST, DEFAULT_DAEMON_PORT, serve
+from utils.output import OUTPUT_FORMATS, VERDICT_SCHEMA, json_num_predict, parse_verdict_json
+from utils.sweep import SweepConfig, expand_grid, group_by_model, parse_list, summarize_sweep
+from utils.voting import DEFAULT_VOTE_TEMPERATURE, vote_temperature
+from models.cache import add_cache_arguments, open_response_cache
+from models.backend import BatchingBackend, ModelBackend
+from models.model_client import add_client_arguments, client_from_args, client_kwargs_from_args, create_backend, get_default_client
 
 # 절대 경로 기반 프로젝트 루트
 PROJECT_ROOT = Path("/Users/seongha/Documents/ollama_anomaly")
 BASE_DIR = PROJECT_ROOT / "NAB/data"
 LABEL_JSON_PATH = PROJECT_ROOT / "NAB/labels/combined_windows.json"
+CACHE_PATH = PROJECT_ROOT / ".cache/llm_responses.sqlite"
+SERIES_CACHE_DIR = PROJECT_ROOT / ".cache/series"
+RUN_STORE_PATH = PROJECT_ROOT / "runs/runs.sqlite"
 
 
-# 📌 timestamp 파싱 함수
-def parse_timestamp(ts: str) -> datetime:
-    for fmt in ("%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S"):
-        try:
-            return datetime.strptime(ts, fmt)
-        except ValueError:
-            continue
-    return datetime.fromisoformat(ts)
-
-
-# 문자열 기반 비교를 위해 datetime → str 변환
-def format_ts(dt: datetime) -> str:
-    return dt.strftime("%Y-%m-%d %H:%M:%S")
-
 # 📌 LLM 예측 결과를 CSV로 저장
-def save_labeled_csv(base_csv_path: Path, anomaly_timestamps: List[datetime], output_path: Path):
-    # 미리 문자열 형태로 anomaly timestamp 목록 준비
-    anomaly_ts_strs = set(format_ts(ts) for ts in anomaly_timestamps)
+def snap_to_rows(
+    base_csv_path: Path,
+    anomaly_timestamps: List[datetime],
+    snap_tolerance: float = 0.0,
+    series_cache: Optional[Path] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    예측 timestamp를 원본 행의 timestamp(int64)에 이진 탐색으로 맞춤 → (행 timestamp 배열, anomaly 마스크).
+    snap_tolerance(초) 이내에서 가장 가까운 행으로 맞추고, 어떤 행에도 맞지 않는 예측은 개수만 알린다.
+    """
+    row_ts = np.asarray(load_timestamps(base_csv_path, series_cache))
+    rows = TimestampIndex(row_ts).snap(datetimes_to_ns(anomaly_timestamps), int(snap_tolerance * NS_PER_SEC))
+    unmatched = int(np.count_nonzero(rows < 0))
+    if unmatched:
+        print(f"⚠️ 원본 행과 맞지 않는 예측 timestamp {unmatched}개 무시 (허용 오차 {snap_tolerance}초)")
 
-    with open(base_csv_path, encoding="utf-8") as f:
-        rows = list(csv.DictReader(f))
+    anomaly_mask = np.zeros(len(row_ts), dtype=bool)
+    anomaly_mask[rows[rows >= 0]] = True
+    return row_ts, anomaly_mask
 
-    for row in rows:
-        # 문자열로 직접 비교
-        ts_str = row["timestamp"].strip()
-        row["label"] = "anomaly" if ts_str in anomaly_ts_strs else "normal"
 
-    with open(output_path, "w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=rows[0].keys())
-        writer.writeheader()
-        writer.writerows(rows)
+def save_labeled_csv(
+    base_csv_path: Path,
+    anomaly_timestamps: List[datetime],
+    output_path: Path,
+    snap_tolerance: float = 0.0,
+    series_cache: Optional[Path] = None,
+):
+    """예측 timestamp를 원본 행에 맞춰(snap_to_rows) label 컬럼을 붙여 저장"""
+    _, anomaly_mask = snap_to_rows(base_csv_path, anomaly_timestamps, snap_tolerance, series_cache)
+    write_labeled_csv(base_csv_path, output_path, anomaly_mask)
 
     print(f"✅ 예측 라벨 저장: {output_path}")
 
 
 # 🧩 label 모드
-def run_label_mode(folder: str, file: str):
+def run_label_mode(
+    folder: str,
+    file: str,
+    series_cache: Optional[Path] = None,
+    label_data: Optional[dict] = None,
+    chunk_rows: Optional[int] = None,
+):
+    """
+    정답 라벨 CSV 생성 (label_data: 미리 읽어 둔 combined_windows.json, 없으면 파일에서 읽음).
+    chunk_rows가 있으면 캐시 없이 청크 단위로 읽고 쓴다.
+    """
     file_path = BASE_DIR / folder / file
-    label_data = load_json_file(LABEL_JSON_PATH)
+    label_data = label_data if label_data is not None else load_json_file(LABEL_JSON_PATH)
     relative_key = f"{folder}/{file}"
 
     if relative_key not in label_data:
@@ -69,10 +129,28 @@ def run_label_mode(folder: str, file: str):
     label_dir.mkdir(parents=True, exist_ok=True)
     label_path = label_dir / f"{Path(file).stem}_label.csv"
 
-    simple_mark_anormal_flexible(str(file_path), str(label_path), label_data[relative_key])
+    simple_mark_anormal_flexible(str(file_path), str(label_path), label_data[relative_key], series_cache, chunk_rows)
     print(f"✅ 정답 라벨 저장: {label_path}")
 
 
+# 🧩 label_all 모드: combined_windows.json 전체를 프로세스 풀로 라벨링
+def run_label_all_mode(
+    folder: Optional[str] = None,
+    workers: Optional[int] = None,
+    series_cache: Optional[Path] = None,
+    chunk_rows: Optional[int] = None,
+):
+    label_data = load_json_file(LABEL_JSON_PATH)
+    jobs = build_label_jobs(BASE_DIR, label_data, label_subdir="label", folder=folder)
+    if not jobs:
+        print("❌ 라벨링할 파일이 없습니다.")
+        return
+
+    print(f"🏷 {len(jobs)}개 파일 라벨링 시작 (workers={workers or 'auto'})")
+    done = label_corpus(jobs, workers, series_cache, chunk_rows)
+    print(f"✅ 정답 라벨 저장 완료: {done}/{len(jobs)}개 파일")
+
+
 # 🧩 predict 모드
 # def run_predict_mode(folder: str, file: str, model_name: str, temperature: float, num_rows: int):
 #     file_path = BASE_DIR / folder / file
@@ -99,70 +177,962 @@ def run_label_mode(folder: str, file: str):
 #     save_labeled_csv(file_path, predicted_timestamps, result_path)
 
 
-def run_predict_mode(folder: str, file: str, model_name: str, temperature: float, num_rows: int):
+def make_window_plan(df, prompt_template: str, scenario: str, options: PredictOptions) -> WindowPlan:
+    """
+    PredictOptions → 윈도우 계획.
+    adaptive_windows면 사전 필터 점수(기본 mad)가 임계값을 넘는 지점 주변에서만 윈도우를 줄이고 겹친다.
+    """
+    hot = None
+    if options.adaptive_windows:
+        method = options.prefilter or "mad"
+        threshold = options.prefilter_threshold
+        threshold = DEFAULT_THRESHOLDS[method] if threshold is None else threshold
+        hot = point_scores(df, method, scenario) >= threshold
+    return build_window_plan(
+        df,
+        prompt_template,
+        scenario,
+        options.num_rows,
+        options.data_format,
+        options.precision,
+        options.token_budget,
+        options.overlap,
+        hot,
+    )
+
+
+def predict_windows(
+    df,
+    prompt_template: str,
+    scenario: str,
+    options: PredictOptions,
+    client: Optional[ModelBackend] = None,
+    windows: Optional[List[Tuple[int, int]]] = None,
+    completed: Optional[Dict[int, List[datetime]]] = None,
+    on_window: Optional[Callable[[int, int, List[datetime]], None]] = None,
+    llm_slots=None,
+    telemetry: Optional[Telemetry] = None,
+    file_key: str = "",
+    offset: int = 0,
+) -> Dict[int, List[datetime]]:
+    """
+    윈도우들을 최대 options.concurrency개씩 동시에 예측 → {start: timestamps}.
+    - completed: 이미 끝난 윈도우 결과 (재실행 시 건너뜀)
+    - on_window: 윈도우 하나가 끝날 때마다 호출 (manifest 기록 등)
+    - llm_slots: 여러 프로세스가 공유하는 LLM 동시 호출 제한 (세마포어)
+    - telemetry: 윈도우별 단계 시간/Ollama 지표 기록 (file_key로 구분)
+    - offset: df의 0번째 행이 전체 시계열의 몇 번째 행인지 (청크 처리 시, windows는 전체 행 번호)
+    한 윈도우의 실패는 나머지 윈도우를 취소하지 않으며, 실패한 윈도우는 결과에서 빠진다.
+    """
+    windows = windows if windows is not None else make_window_plan(df, prompt_template, scenario, options).windows
+    window_results = dict(completed or {})
+    pending = [(start, end) for start, end in windows if start not in window_results]
+    if window_results:
+        print(f"⏩ 이미 완료된 윈도우 {len(windows) - len(pending)}개 건너뜀")
+
+    # 🔎 사전 필터: 점수가 임계값을 넘지 않는 윈도우는 LLM 호출 없이 normal 처리
+    if options.prefilter and pending:
+        pending, skipped = screen_windows(
+            df, [(start - offset, end - offset) for start, end in pending], options.prefilter, scenario,
+            options.prefilter_threshold,
+        )
+        pending = [(start + offset, end + offset) for start, end in pending]
+        for start, _ in skipped:
+            window_results[start + offset] = []
+        print(f"🔎 사전 필터({options.prefilter}): LLM 호출 {len(skipped)}/{len(skipped) + len(pending)}개 생략")
+
+    # 투표 모드는 윈도우 하나가 요청 여러 개를 보내므로 윈도우가 아니라 샘플 요청마다 슬롯을 잡는다
+    # (concurrency와 llm_slots가 실제 동시 요청 수를 제한하도록)
+    request_slots = threading.BoundedSemaphore(max(options.concurrency, 1))
+
+    @contextmanager
+    def request_slot():
+        with request_slots:
+            if llm_slots is not None:
+                llm_slots.acquire()
+            try:
+                yield
+            finally:
+                if llm_slots is not None:
+                    llm_slots.release()
+
+    def run_one(start: int, end: int) -> List[datetime]:
+        timer = StageTimer()
+        error = None
+        try:
+            if options.vote_samples > 1:
+                return predict_window(
+                    df.iloc[start - offset:end - offset], prompt_template, scenario, options, client, timer.timings,
+                    request_slot,
+                )
+            with timer.stage("wait"):
+                if llm_slots is not None:
+                    llm_slots.acquire()
+            try:
+                # df.iloc 슬라이스는 복사 없이 그대로 전달 (임시 파일/CSV 재파싱 없음)
+                return predict_window(
+                    df.iloc[start - offset:end - offset], prompt_template, scenario, options, client, timer.timings
+                )
+            finally:
+                if llm_slots is not None:
+                    llm_slots.release()
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            if telemetry is not None:
+                telemetry.record_window(file_key, start, end, options.model_name, timer.timings, error)
+
+    # ✅ 최대 concurrency개의 윈도우를 동시에 처리 (Ollama 서버의 OLLAMA_NUM_PARALLEL 활용)
+    with ThreadPoolExecutor(max_workers=max(options.concurrency, 1)) as executor:
+        futures = {executor.submit(run_one, start, end): (start, end) for start, end in pending}
+        for future in as_completed(futures):
+            start, end = futures[future]
+            try:
+                window_results[start] = future.result()
+            except Exception as e:
+                # 한 윈도우의 실패가 나머지 윈도우를 취소하지 않음
+                print(f"⚠️ 슬라이스 {start}~{end} 예측 실패: {e}")
+                continue
+            print(f"📈 슬라이스 {start}~{end} → {len(window_results[start])}개 예측")
+            if on_window is not None:
+                on_window(start, end, window_results[start])
+
+    return window_results
+
+
+def merge_window_results(windows: List[Tuple[int, int]], window_results: Dict[int, List[datetime]]) -> List[datetime]:
+    """윈도우 순서대로 병합 후 중복 제거 및 정렬"""
+    all_predicted = []
+    for start, _ in windows:
+        all_predicted.extend(window_results.get(start, []))
+    return sorted(set(all_predicted))
+
+
+def save_prediction(
+    file_path: Path,
+    unique_predicted: List[datetime],
+    snap_tolerance: float = 0.0,
+    series_cache: Optional[Path] = None,
+) -> Path:
+    """<stem>/<stem>_v1_N.csv 로 예측 라벨 저장 (N은 다음 버전 번호, run store 없이 실행할 때)"""
+    result_path = prediction_csv_path(file_path, csv_version(file_path) + 1)
+    result_path.parent.mkdir(exist_ok=True)
+    save_labeled_csv(file_path, unique_predicted, result_path, snap_tolerance, series_cache)
+    return result_path
+
+
+def prediction_csv_path(file_path: Path, version: int) -> Path:
+    return file_path.parent / file_path.stem / f"{file_path.stem}_v1_{version}.csv"
+
+
+def csv_version(file_path: Path) -> int:
+    """<stem>/ 폴더에 이미 있는 _v1_N.csv 중 가장 큰 N (없으면 0)"""
+    result_dir = file_path.parent / file_path.stem
+    return max([version_number(f) for f in result_dir.glob(f"{file_path.stem}_v1_*.csv")] + [0])
+
+
+def record_prediction(
+    store: RunStore,
+    file_path: Path,
+    file_key: str,
+    unique_predicted: List[datetime],
+    options: PredictOptions,
+    windows: List[Tuple[int, int]],
+    timings: Optional[dict] = None,
+    series_cache: Optional[Path] = None,
+    write_csv: bool = False,
+) -> str:
+    """
+    예측 결과를 run store에 기록 (이상 timestamp + 메타데이터만) → "folder/file@vN".
+    버전은 저장소 안에서 원자적으로 할당하되, 기존 _v1_N.csv 번호보다 크게 매겨 materialize 시 겹치지 않게 한다.
+    write_csv면 라벨 CSV도 바로 만든다 (기본은 materialize 모드에서 필요할 때만).
+    """
+    row_ts, anomaly_mask = snap_to_rows(file_path, unique_predicted, options.snap_tolerance, series_cache)
+    version = store.add_run(
+        file_key,
+        row_ts[anomaly_mask],
+        asdict(options),
+        windows,
+        timings,
+        version_floor=csv_version(file_path),
+    )
+    print(f"🗃️ run 저장: {file_key} v{version} (이상 {int(anomaly_mask.sum())}개)")
+    if write_csv:
+        materialize_run(store, file_key, version, series_cache)
+    return f"{file_key}@v{version}"
+
+
+def materialize_run(
+    store: RunStore,
+    file_key: str,
+    version: Optional[int] = None,
+    series_cache: Optional[Path] = None,
+    chunk_rows: Optional[int] = None,
+) -> Optional[Path]:
+    """run store의 실행 하나(기본: 최신) → <stem>/<stem>_v1_N.csv 라벨 CSV (chunk_rows가 있으면 청크 단위로 기록)"""
+    version = version or store.latest_version(file_key)
+    if version is None:
+        print(f"❌ 저장된 실행이 없습니다: {file_key}")
+        return None
+    file_path = BASE_DIR / file_key
+    try:
+        anomalies = store.anomalies(file_key, version)
+    except KeyError:
+        print(f"❌ 저장된 실행이 없습니다: {file_key} v{version}")
+        return None
+    result_path = prediction_csv_path(file_path, version)
+    if result_path.exists():
+        # 같은 실행을 다시 요청했거나, run store 없이 만든 같은 번호의 CSV — 덮어쓰지 않음
+        print(f"⚠️ 이미 있는 파일이라 다시 만들지 않습니다: {result_path}")
+        return result_path
+    result_path.parent.mkdir(exist_ok=True)
+    if chunk_rows:
+        write_labeled_csv_chunked(file_path, result_path, lambda ts: np.isin(ts, anomalies), chunk_rows)
+    else:
+        anomaly_mask = np.isin(load_timestamps(file_path, series_cache), anomalies)
+        write_labeled_csv(file_path, result_path, anomaly_mask)
+    print(f"✅ 예측 라벨 저장: {result_path}")
+    return result_path
+
+
+def _print_predict_start(options: PredictOptions):
+    """예측 시작 안내 (run_predict_mode / run_predict_chunked 공용)"""
+    print(f"🧠 Ollama 예측 시작: {options.model_name} (T={options.temperature}, concurrency={options.concurrency})")
+    if options.vote_samples > 1:
+        sample_temperature = vote_temperature(options.temperature, options.vote_temperature)
+        print(f"🗳️ 투표 모드: 윈도우당 {options.vote_samples}샘플 (quorum {options.vote_quorum}, T={sample_temperature})")
+
+
+def _print_client_stats(client: Optional[ModelBackend]):
+    """응답 캐시 / 요청 배치 통계 (run_predict_mode / run_predict_chunked 공용)"""
+    if client is not None and client.cache is not None:
+        print(f"🗄️ 응답 캐시: hit {client.cache.hits} / miss {client.cache.misses}")
+    if isinstance(client, BatchingBackend) and client.batches:
+        print(f"📦 배치: {client.batches}번에 프롬프트 {client.batched_prompts}개를 묶어 호출 (캐시 hit 포함)")
+
+
+def run_predict_mode(
+    folder: str,
+    file: str,
+    options: PredictOptions,
+    client: Optional[ModelBackend] = None,
+    plan_only: bool = False,
+    series_cache: Optional[Path] = None,
+    telemetry: Optional[Telemetry] = None,
+    hierarchy: Optional[HierarchyOptions] = None,
+    store: Optional[RunStore] = None,
+    write_csv: bool = False,
+):
+    """
+    파일 하나 예측. hierarchy가 주어지면 bucket 요약(overview)으로 먼저 훑고
+    모델이 표시한 구간만 원래 해상도 윈도우로 예측한다 (utils.hierarchy 참고).
+    store가 있으면 결과를 run store에 기록하고(write_csv면 라벨 CSV도), 없으면 <stem>_v1_N.csv로 저장한다.
+    """
     file_path = BASE_DIR / folder / file
-    print(f"🧠 Ollama 예측 시작: {model_name} (T={temperature})")
+    _print_predict_start(options)
+    timer = StageTimer()
 
-    # 전체 CSV 로드
-    df = read_csv_file(str(file_path))
+    # 전체 시계열 로드 (series_cache가 있으면 파싱 없이 memmap 캐시에서)
+    with timer.stage("load"):
+        df = read_series_frame(file_path, series_cache)
     if df is None or df.empty:
         print("❌ CSV 데이터를 읽을 수 없습니다.")
         return
 
-    stride = num_rows // 2  # ✅ 슬라이딩 간격 (중첩 50%)
-    total_rows = len(df)
-    all_predicted = []
+    # ✅ 템플릿/시나리오는 파일당 한 번만 로드
+    try:
+        prompt_template, scenario = load_prompt_parts(file, options.output_format)
+    except FileNotFoundError as e:
+        print(e)
+        return
+
+    # 🗺️ 윈도우 계획 (경계 + 예상 토큰) — plan_only면 출력만 하고 종료
+    with timer.stage("plan"):
+        plan = make_window_plan(df, prompt_template, scenario, options)
+    print(plan.summary())
+    if plan_only:
+        print(plan.table())
+        return
 
-    for start in range(0, total_rows, stride):
-        end = start + num_rows
-        if start >= total_rows:
-            break
+    windows = plan.windows
+    file_key = f"{folder}/{file}"
+    if hierarchy is not None and windows:
+        # 🪜 coarse-to-fine: overview 단계에서 표시된 구간의 윈도우만 남김
+        window_rows = max(end - start for start, end in windows)
+        with timer.stage("overview"):
+            windows, stats = coarse_to_fine_windows(
+                df, prompt_template, scenario, options, hierarchy, window_rows, client, telemetry, file_key
+            )
+        print(stats.summary(len(plan.windows)))
+    with timer.stage("total"):
+        window_results = predict_windows(
+            df, prompt_template, scenario, options, client, windows, telemetry=telemetry, file_key=file_key
+        )
+    if telemetry is not None:
+        telemetry.record("file", file=file_key, windows=len(windows), **timer.timings)
+
+    failed = len(windows) - len(window_results)
+    if failed:
+        print(f"⚠️ 실패한 윈도우: {failed}/{len(windows)}")
+    if windows and not window_results:
+        # 모든 윈도우가 실패하면 '이상 없음'으로 저장하지 않음
+        print("❌ 모든 윈도우 예측 실패 — 결과를 저장하지 않습니다.")
+        return
 
-        sliced_df = df.iloc[start:end].copy()
-        if sliced_df.empty:
-            continue
+    unique_predicted = merge_window_results(windows, window_results)
 
-         # ✅ 슬라이스를 임시 파일로 저장
-        with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".csv", newline="", encoding="utf-8") as tmp_file:
-            sliced_df.to_csv(tmp_file.name, index=False)
-            temp_file_path = tmp_file.name
+    _print_client_stats(client)
 
-        # ✅ 각 슬라이스에 대해 모델 예측 (원본 파일 이름 전달)
-        predicted_ts = query_ollama_and_extract_timestamps(
-            temp_file_path, model_name, temperature, num_rows, original_file_name=file
+    if store is not None:
+        return record_prediction(
+            store, file_path, file_key, unique_predicted, options, windows, timer.timings, series_cache, write_csv
         )
-        all_predicted.extend(predicted_ts)
+    result_path = save_prediction(file_path, unique_predicted, options.snap_tolerance, series_cache)
+    print(f"✅ 전체 예측 라벨 저장 완료: {result_path}")
+    return result_path
 
-        print(f"📈 슬라이스 {start}~{end} → {len(predicted_ts)}개 예측")
 
-        # ✅ 임시 파일 삭제
-        os.remove(temp_file_path)
+def run_predict_chunked(
+    folder: str,
+    file: str,
+    options: PredictOptions,
+    client: Optional[ModelBackend] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    telemetry: Optional[Telemetry] = None,
+    store: Optional[RunStore] = None,
+    write_csv: bool = False,
+):
+    """
+    메모리 상한이 있는 predict: CSV를 chunk_rows행씩 읽으면서 청크 경계를 넘는 고정 윈도우(겹침 유지)를 예측하고,
+    결과 라벨도 청크 단위로 기록한다 — 메모리는 파일 길이와 상관없이 청크 하나 + 예측된 이상 timestamp 분량.
+    윈도우 크기는 첫 청크로 추정한 행당 토큰 수로 정하고, prefilter 점수는 청크 안에서 계산한다.
+    adaptive_windows / hierarchical은 전체 시계열 점수가 필요해서 지원하지 않는다 (고정 윈도우로 예측).
+    """
+    file_path = BASE_DIR / folder / file
+    file_key = f"{folder}/{file}"
+    _print_predict_start(options)
+    if options.adaptive_windows:
+        print("⚠️ 청크 처리에서는 adaptive_windows 대신 고정 윈도우를 사용합니다.")
+    timer = StageTimer()
 
+    try:
+        prompt_template, scenario = load_prompt_parts(file, options.output_format)
+    except FileNotFoundError as e:
+        print(e)
+        return
+
+    chunks = iter_csv_chunks(file_path, chunk_rows)
+    with timer.stage("load"):
+        first = next(chunks, None)
+    if first is None or first.empty:
+        print("❌ CSV 데이터를 읽을 수 없습니다.")
+        return
+    with timer.stage("plan"):
+        token_model = fit_token_model(first, prompt_template, scenario, options.data_format, options.precision)
+        window_rows, _ = plan_window_rows(token_model, options.num_rows, options.token_budget)
+    print(f"🧱 청크 처리: {chunk_rows:,}행씩 읽기, 윈도우 {window_rows:,}행 (겹침 {options.overlap})")
 
-    # 중복 제거 및 정렬
-    unique_predicted = sorted(set(all_predicted))
+    # 윈도우별 결과는 청크마다 바로 합쳐서 이상 timestamp 집합만 유지
+    predicted = set()
+    total = failed = 0
+    with timer.stage("total"):
+        for offset, frame, windows in iter_window_batches(chain([first], chunks), window_rows, options.overlap):
+            window_results = predict_windows(
+                frame, prompt_template, scenario, options, client, windows,
+                telemetry=telemetry, file_key=file_key, offset=offset,
+            )
+            predicted.update(ts for timestamps in window_results.values() for ts in timestamps)
+            total += len(windows)
+            failed += len(windows) - len(window_results)
+    if telemetry is not None:
+        telemetry.record("file", file=file_key, windows=total, **timer.timings)
 
-    # 결과 저장
-    result_dir = file_path.parent / file_path.stem
-    result_dir.mkdir(exist_ok=True)
-
-    version_prefix = f"{file_path.stem}_v1_"
-    existing = list(result_dir.glob(f"{version_prefix}*.csv"))
-    next_version = (
-        max(
-            [int(f.stem.split("_v1_")[-1]) for f in existing if f.stem.split("_v1_")[-1].isdigit()]
-            + [0]
-        )
-        + 1
+    if failed:
+        print(f"⚠️ 실패한 윈도우: {failed}/{total}")
+    if total and failed == total:
+        print("❌ 모든 윈도우 예측 실패 — 결과를 저장하지 않습니다.")
+        return
+    _print_client_stats(client)
+
+    anomaly_ns, unmatched = snap_chunked(
+        file_path, datetimes_to_ns(sorted(predicted)), int(options.snap_tolerance * NS_PER_SEC), chunk_rows
     )
+    if unmatched:
+        print(f"⚠️ 원본 행과 맞지 않는 예측 timestamp {unmatched}개 무시 (허용 오차 {options.snap_tolerance}초)")
 
-    result_path = result_dir / f"{version_prefix}{next_version}.csv"
-    save_labeled_csv(file_path, unique_predicted, result_path)
+    if store is not None:
+        version = store.add_run(
+            file_key, anomaly_ns, asdict(options), None, timer.timings, version_floor=csv_version(file_path)
+        )
+        print(f"🗃️ run 저장: {file_key} v{version} (이상 {len(anomaly_ns)}개)")
+        if write_csv:
+            materialize_run(store, file_key, version, chunk_rows=chunk_rows)
+        return f"{file_key}@v{version}"
+    result_path = prediction_csv_path(file_path, csv_version(file_path) + 1)
+    result_path.parent.mkdir(exist_ok=True)
+    write_labeled_csv_chunked(file_path, result_path, lambda ts: np.isin(ts, anomaly_ns), chunk_rows)
     print(f"✅ 전체 예측 라벨 저장 완료: {result_path}")
+    return result_path
+
+
+# 🧩 batch 모드: 여러 파일을 프로세스 풀로 분산 + manifest 기반 재개
+_batch_worker = {}
+
+
+def _init_batch_worker(
+    client_kwargs: dict,
+    cache_args: tuple,
+    llm_slots,
+    manifest_path: str,
+    series_cache: Optional[Path] = None,
+    telemetry: Optional[Telemetry] = None,
+    store_path: Optional[Path] = None,
+    write_csv: bool = False,
+):
+    """워커 프로세스 초기화: 프로세스당 클라이언트/캐시/manifest/run store 연결 하나씩 생성"""
+    _batch_worker["client"] = create_backend(**client_kwargs, cache=open_response_cache(*cache_args))
+    _batch_worker["llm_slots"] = llm_slots
+    _batch_worker["manifest"] = RunManifest(manifest_path)
+    _batch_worker["series_cache"] = series_cache
+    _batch_worker["telemetry"] = telemetry
+    _batch_worker["store"] = RunStore(store_path) if store_path is not None else None
+    _batch_worker["write_csv"] = write_csv
+
+
+def _batch_predict_file(file_key: str, options: PredictOptions, completed: Dict[int, List[datetime]]):
+    """워커에서 파일 하나 처리 → (file_key, 결과 경로 또는 None, 오류 메시지 또는 None)"""
+    manifest = _batch_worker["manifest"]
+    folder, file = file_key.split("/", 1)
+    file_path = BASE_DIR / folder / file
+    telemetry = _batch_worker["telemetry"]
+    timer = StageTimer()
+    try:
+        with timer.stage("load"):
+            df = read_series_frame(file_path, _batch_worker["series_cache"])
+        if df is None or df.empty:
+            raise RuntimeError("CSV 데이터를 읽을 수 없습니다.")
+        prompt_template, scenario = load_prompt_parts(file, options.output_format)
+
+        with timer.stage("plan"):
+            windows = make_window_plan(df, prompt_template, scenario, options).windows
+        with timer.stage("total"):
+            window_results = predict_windows(
+                df, prompt_template, scenario, options, _batch_worker["client"], windows,
+                completed=completed,
+                on_window=lambda start, end, ts: manifest.record_window(file_key, start, end, ts),
+                llm_slots=_batch_worker["llm_slots"],
+                telemetry=telemetry,
+                file_key=file_key,
+            )
+        if telemetry is not None:
+            telemetry.record("file", file=file_key, windows=len(windows), **timer.timings)
+        failed = len(windows) - len(window_results)
+        if failed:
+            # 실패한 윈도우가 있으면 완료 처리하지 않음 → 재실행 시 해당 윈도우만 다시 처리
+            raise RuntimeError(f"실패한 윈도우 {failed}/{len(windows)}")
+
+        unique_predicted = merge_window_results(windows, window_results)
+        if _batch_worker["store"] is not None:
+            result_path = record_prediction(
+                _batch_worker["store"], file_path, file_key, unique_predicted, options, windows, timer.timings,
+                _batch_worker["series_cache"], _batch_worker["write_csv"],
+            )
+        else:
+            result_path = save_prediction(file_path, unique_predicted, options.snap_tolerance, _batch_worker["series_cache"])
+        manifest.record_file(file_key, "done", result=str(result_path))
+        return file_key, str(result_path), None
+    except Exception as e:
+        manifest.record_file(file_key, "failed", error=str(e))
+        return file_key, None, str(e)
+
+
+def find_batch_files(folder_glob: Optional[str], file_glob: Optional[str]) -> List[str]:
+    """BASE_DIR/<folder_glob>/<file_glob> → ["folder/file.csv", ...] (라벨/결과 파일 제외)"""
+    paths = sorted(BASE_DIR.glob(f"{folder_glob or '*'}/{file_glob or '*.csv'}"))
+    return [
+        f"{p.parent.name}/{p.name}"
+        for p in paths
+        if p.is_file() and not p.stem.endswith("_label")
+    ]
+
+
+def run_batch_mode(
+    folder_glob: Optional[str],
+    file_glob: Optional[str],
+    options: PredictOptions,
+    client_kwargs: dict,
+    cache_args: tuple,
+    workers: Optional[int] = None,
+    llm_concurrency: Optional[int] = None,
+    manifest_path: Optional[Path] = None,
+    series_cache: Optional[Path] = None,
+    telemetry: Optional[Telemetry] = None,
+    store_path: Optional[Path] = None,
+    write_csv: bool = False,
+):
+    """
+    폴더/파일 glob(기본: BASE_DIR 전체)에 해당하는 파일들을 프로세스 풀로 예측.
+    LLM 동시 호출 수는 모든 워커가 공유하는 세마포어로 llm_concurrency개로 제한한다.
+    같은 manifest로 다시 실행하면 완료된 파일/윈도우는 건너뛴다.
+    """
+    file_keys = find_batch_files(folder_glob, file_glob)
+    if not file_keys:
+        print("❌ 처리할 CSV 파일이 없습니다.")
+        return
+
+    manifest_path = manifest_path or PROJECT_ROOT / "runs" / f"batch_{datetime.now():%Y%m%d_%H%M%S}.jsonl"
+    manifest = RunManifest(manifest_path)
+    config, done_files, done_windows = manifest.load()
+    current_config = asdict(options)
+    if config and config != current_config:
+        print(f"❌ manifest 설정이 현재 옵션과 다릅니다: {manifest_path}")
+        return
+    if not config:
+        manifest.record_config(current_config)
+
+    todo = [key for key in file_keys if key not in done_files]
+    llm_concurrency = llm_concurrency or options.concurrency
+    print(f"📦 배치 예측: {len(todo)}/{len(file_keys)}개 파일 (workers={workers or 'auto'}, LLM 동시 호출 {llm_concurrency})")
+    print(f"🧾 manifest: {manifest_path}")
+
+    succeeded, failed = 0, 0
+    with Manager() as sync_manager:
+        llm_slots = sync_manager.BoundedSemaphore(llm_concurrency)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_batch_worker,
+            initargs=(client_kwargs, cache_args, llm_slots, str(manifest_path), series_cache, telemetry, store_path, write_csv),
+        ) as executor:
+            futures = [
+                executor.submit(_batch_predict_file, key, options, done_windows.get(key, {}))
+                for key in todo
+            ]
+            for future in as_completed(futures):
+                file_key, result_path, error = future.result()
+                if error:
+                    failed += 1
+                    print(f"❌ {file_key}: {error}")
+                else:
+                    succeeded += 1
+                    print(f"✅ {file_key} → {result_path}")
+
+    print(f"📦 배치 완료: 성공 {succeeded}, 실패 {failed}, 이전 실행에서 완료 {len(file_keys) - len(todo)}")
+
+
+# 🧩 live 모드: 계속 늘어나는 시계열(파일 tail 또는 stdin NDJSON/CSV)을 온라인으로 탐지
+def run_live_mode(
+    source: str,
+    file: str,
+    options: PredictOptions,
+    client: Optional[ModelBackend] = None,
+    stride: Optional[int] = None,
+    interval: Optional[float] = None,
+    backpressure: str = "coalesce",
+    events_path: Optional[Path] = None,
+    from_start: bool = False,
+    telemetry: Optional[Telemetry] = None,
+):
+    """
+    source가 "-"면 stdin, 아니면 파일을 tail. 시나리오는 file 이름 기준으로 로드한다.
+    최근 options.num_rows개 점으로 stride행마다(또는 interval초마다) 윈도우를 예측하고,
+    탐지된 timestamp를 events_path(JSONL)에 이벤트로 기록한다.
+    """
+    if source != "-" and not Path(source).is_file():
+        print(f"❌ 입력 파일이 존재하지 않습니다: {source}")
+        return
+    try:
+        prompt_template, scenario = load_prompt_parts(file, options.output_format)
+    except FileNotFoundError as e:
+        print(e)
+        return
+
+    events_path = events_path or PROJECT_ROOT / "runs" / f"live_{datetime.now():%Y%m%d_%H%M%S}.jsonl"
+    sink = JsonlEventSink(events_path)
+    detector = LiveDetector(prompt_template, scenario, options, client, sink, stride, interval, backpressure, telemetry)
+
+    lines = queue.Queue(maxsize=LINE_QUEUE_SIZE)
+    stop = threading.Event()
+    if source == "-":
+        reader = threading.Thread(target=read_stream, args=(sys.stdin, lines, stop), daemon=True)
+    else:
+        reader = threading.Thread(target=tail_file, args=(source, lines, stop, from_start), daemon=True)
+    reader.start()
+
+    print(
+        f"📡 live 탐지 시작: {source} (윈도우 {options.num_rows}행, stride {detector.stride}행"
+        + (f", 타이머 {interval}초" if interval else "")
+        + f", backpressure={backpressure})"
+    )
+    print(f"🧾 이벤트: {events_path}")
+    try:
+        detector.run(lines, stop)
+    except KeyboardInterrupt:
+        print("\n⏹️ 중단됨")
+    except LiveSourceError as e:
+        print(f"❌ {e}")
+    finally:
+        stop.set()
+        sink.close()
+        print(f"📡 live 종료: {detector.stats.summary()}")
+
+
+# 🧩 sweep 모드: 모델 × temperature × num_rows × data_format 그리드를 한 번에 실행
+def _load_sweep_file(file_key: str, series_cache: Optional[Path] = None, output_format: str = "text") -> Optional[dict]:
+    """sweep 대상 파일 하나의 데이터/템플릿/정답 라벨 (설정이 몇 개든 파일당 한 번만 로드)"""
+    file_path = BASE_DIR / file_key
+    df = read_series_frame(file_path, series_cache)
+    if df is None or df.empty:
+        print(f"❌ CSV 데이터를 읽을 수 없습니다: {file_key}")
+        return None
+    try:
+        prompt_template, scenario = load_prompt_parts(file_path.name, output_format)
+    except FileNotFoundError as e:
+        print(e)
+        return None
+
+    label_path = file_path.parent / "label" / f"{file_path.stem}_label.csv"
+    truth = load_label_arrays(label_path, None, series_cache) if label_path.exists() else None
+    if truth is None:
+        print(f"⚠️ 정답 라벨 없음 — 지표 없이 기록: {label_path}")
+    row_ts = np.asarray(load_timestamps(file_path, series_cache))
+    return {
+        "df": df,
+        "template": prompt_template,
+        "scenario": scenario,
+        "row_ts": row_ts,
+        "index": TimestampIndex(row_ts),
+        "truth": truth,
+        "prompts": {},  # SweepConfig.prompt_key → (windows, llm_windows, {start: WindowPrompt})
+    }
+
+
+def _sweep_prompts(data: dict, options: PredictOptions, prompt_key) -> tuple:
+    """
+    (num_rows, data_format)별 윈도우 계획 + 윈도우 프롬프트를 한 번만 만들어 재사용.
+    모델/temperature/반복 횟수와 무관하므로 같은 키의 모든 실행이 같은 프롬프트 문자열을 공유한다.
+    """
+    if prompt_key not in data["prompts"]:
+        df, template, scenario = data["df"], data["template"], data["scenario"]
+        windows = make_window_plan(df, template, scenario, options).windows
+        llm_windows = windows
+        if options.prefilter:
+            llm_windows, _ = screen_windows(df, windows, options.prefilter, scenario, options.prefilter_threshold)
+        prompts = {
+            start: build_window_prompt(
+                df.iloc[start:end], template, scenario, options.data_format, options.precision, options.prompt_layout
+            )
+            for start, end in llm_windows
+        }
+        data["prompts"][prompt_key] = (windows, llm_windows, prompts)
+    return data["prompts"][prompt_key]
+
+
+def _sweep_row(run: dict, data: dict, snap_tolerance: float) -> dict:
+    """반복 실행 하나 → sweep 표의 한 행 (설정 + 윈도우/토큰 통계 + 평가 지표)"""
+    config = run["config"]
+    windows = run["windows"]
+    predicted = merge_window_results(windows, run["results"])
+    server = [t.get("ollama") or {} for t in run["timings"]]
+    row = {
+        "file": run["file"],
+        "model": config.model_name,
+        "temperature": config.temperature,
+        "num_rows": config.num_rows,
+        "data_format": config.data_format,
+        "repeat": run["repeat"],
+        "windows": len(windows),
+        "llm_windows": run["llm_windows"],
+        "failed": run["failed"],
+        "cached": sum(1 for t in run["timings"] if t.get("cached")),
+        "predicted": len(predicted),
+        "llm_sec": sum(t.get("http_ms", 0.0) for t in run["timings"]) / 1000,
+        "prompt_tokens": sum(s.get("prompt_eval_count") or 0 for s in server),
+        "generated_tokens": sum(s.get("eval_count") or 0 for s in server),
+    }
+    # 모든 LLM 윈도우가 실패한 실행은 '이상 없음'으로 평가하지 않음
+    all_failed = run["llm_windows"] > 0 and run["failed"] == run["llm_windows"]
+    if data["truth"] is not None and not all_failed:
+        rows = data["index"].snap(datetimes_to_ns(predicted), int(snap_tolerance * NS_PER_SEC))
+        mask = np.zeros(len(data["row_ts"]), dtype=bool)
+        mask[rows[rows >= 0]] = True
+        y_true, y_pred = align_by_timestamp(*data["truth"], data["row_ts"], mask)
+        row.update(evaluate_arrays(y_true, y_pred))
+    return row
+
+
+def run_sweep_mode(
+    folder_glob: Optional[str],
+    file_glob: Optional[str],
+    base_options: PredictOptions,
+    configs: List[SweepConfig],
+    repeats: int = 1,
+    client: Optional[ModelBackend] = None,
+    output_path: Optional[Path] = None,
+    series_cache: Optional[Path] = None,
+    telemetry: Optional[Telemetry] = None,
+    unload_models: bool = True,
+):
+    """
+    설정 그리드 × 파일 × 반복을 실행해서 결과/지표를 sweep 표(CSV) 하나에 기록.
+    - 파일 데이터/정답 라벨은 한 번만, 윈도우 프롬프트는 (num_rows, data_format)별로 한 번만 만든다
+    - 모델별로 묶어서 실행하고 다음 모델로 넘어갈 때 이전 모델을 내려 서버의 모델 교체를 모델 수만큼으로 줄인다
+    - 같은 모델의 모든 설정/반복 윈도우를 한 스레드 풀(base_options.concurrency)에 넣어 동시에 처리
+    모든 윈도우가 실패한 실행은 지표 없이 기록된다 (failed 컬럼 참고).
+    """
+    file_keys = find_batch_files(folder_glob, file_glob)
+    if not file_keys:
+        print("❌ 처리할 CSV 파일이 없습니다.")
+        return
+    files = {}
+    for key in file_keys:
+        data = _load_sweep_file(key, series_cache, base_options.output_format)
+        if data is not None:
+            files[key] = data
+    if not files:
+        return
+
+    output_path = output_path or PROJECT_ROOT / "runs" / f"sweep_{datetime.now():%Y%m%d_%H%M%S}.csv"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    groups = group_by_model(configs)
+    print(
+        f"🧪 sweep: 모델 {len(groups)}개, 설정 {len(configs)}개 × 파일 {len(files)}개 × 반복 {repeats}회 "
+        f"(concurrency={base_options.concurrency})"
+    )
+    print(f"🧾 sweep 표: {output_path}")
+
+    client = client or get_default_client()
+    table = []
+    for model_no, (model, model_configs) in enumerate(groups.items(), start=1):
+        runs = []
+        for config in model_configs:
+            options = replace(
+                base_options,
+                model_name=config.model_name,
+                temperature=config.temperature,
+                num_rows=config.num_rows,
+                data_format=config.data_format,
+            )
+            for key, data in files.items():
+                windows, llm_windows, prompts = _sweep_prompts(data, options, config.prompt_key)
+                for repeat in range(repeats):
+                    runs.append({
+                        "file": key, "config": config, "options": options, "repeat": repeat,
+                        "windows": windows, "llm_windows": len(llm_windows), "prompts": prompts,
+                        "results": {start: [] for start, _ in windows if start not in prompts},
+                        "timings": [], "failed": 0,
+                    })
+
+        def run_one(run: dict, start: int, end: int) -> List[datetime]:
+            options = run["options"]
+            timer = StageTimer()
+            error = None
+            try:
+                return predict_from_prompt(
+                    files[run["file"]]["df"].iloc[start:end],
+                    run["prompts"][start],
+                    options.model_name,
+                    options.temperature,
+                    client,
+                    options.stream_rules,
+                    llm_options_for(options),
+                    timer.timings,
+                    options.output_format,
+                    options.snap_tolerance,
+                )
+            except Exception as e:
+                error = str(e)
+                raise
+            finally:
+                run["timings"].append(timer.timings)
+                if telemetry is not None:
+                    telemetry.record_window(run["file"], start, end, options.model_name, timer.timings, error)
+
+        jobs = [(run, start, end) for run in runs for start, end in run["windows"] if start in run["prompts"]]
+        print(f"🔁 [{model_no}/{len(groups)}] {model}: 실행 {len(runs)}개, LLM 호출 {len(jobs)}개")
+        with ThreadPoolExecutor(max_workers=max(base_options.concurrency, 1)) as executor:
+            futures = {executor.submit(run_one, *job): job for job in jobs}
+            for future in as_completed(futures):
+                run, start, end = futures[future]
+                try:
+                    run["results"][start] = future.result()
+                except Exception as e:
+                    run["failed"] += 1
+                    print(f"⚠️ {run['file']} {start}~{end} ({run['config']}) 예측 실패: {e}")
+
+        for run in runs:
+            row = _sweep_row(run, files[run["file"]], base_options.snap_tolerance)
+            table.append(row)
+            if telemetry is not None:
+                telemetry.record("sweep", **row)
+        # 모델이 끝날 때마다 표를 다시 기록 (중간에 중단돼도 끝난 모델 결과는 남는다)
+        pd.DataFrame(table).to_csv(output_path, index=False)
+
+        if unload_models and model_no < len(groups):
+            try:
+                client.unload(model)
+            except Exception as e:
+                print(f"⚠️ 모델 언로드 실패 ({model}): {e}")
+
+    if client.cache is not None:
+        print(f"🗄️ 응답 캐시: hit {client.cache.hits} / miss {client.cache.misses}")
+    summary = summarize_sweep(pd.DataFrame(table))
+    print(f"\n📊 sweep 결과 (설정별 평균, 반복 {repeats}회):")
+    print(summary.to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+    print(f"✅ sweep 표 저장: {output_path}")
+    return output_path
+
+
+# 🧩 serve 모드: 템플릿/시나리오, 라벨 구간, 시계열 캐시, 모델 클라이언트를 띄워 둔 상주 서비스
+def _job_file(params: dict) -> Tuple[str, str]:
+    folder, file = params.get("folder"), params.get("file")
+    if not folder or not file:
+        raise ValueError("folder와 file이 필요합니다.")
+    if not (BASE_DIR / folder / file).exists():
+        raise ValueError(f"데이터 파일이 존재하지 않습니다: {folder}/{file}")
+    return folder, file
+
+
+def _job_options(base: Optional[PredictOptions], params: dict) -> PredictOptions:
+    """작업 파라미터의 "options"(PredictOptions 필드 이름) → 서비스 기본값 위에 덮어쓴 PredictOptions"""
+    overrides = dict(params.get("options") or {})
+    unknown = set(overrides) - {f.name for f in fields(PredictOptions)}
+    if unknown:
+        raise ValueError(f"알 수 없는 옵션: {', '.join(sorted(unknown))}")
+    if isinstance(overrides.get("stream_rules"), dict):
+        overrides["stream_rules"] = StreamStopRules(**overrides["stream_rules"])
+    options = replace(base or PredictOptions(), **overrides)
+    if not 0 <= options.overlap < 1:
+        raise ValueError(f"overlap은 0 이상 1 미만이어야 합니다: {options.overlap}")
+    return options
+
+
+def run_serve_mode(
+    host: str = DEFAULT_DAEMON_HOST,
+    port: int = DEFAULT_DAEMON_PORT,
+    workers: int = 1,
+    base_options: Optional[PredictOptions] = None,
+    client: Optional[ModelBackend] = None,
+    series_cache: Optional[Path] = None,
+    store: Optional[RunStore] = None,
+    preload: bool = False,
+):
+    """
+    detect/label/evaluate/check 작업을 HTTP로 받아 큐에서 실행하는 상주 서비스 (submit_job.py로 제출).
+    프로세스 시작 비용(import, JSON/템플릿 로드, 연결 수립)을 작업마다 내지 않도록
+    combined_windows.json과 클라이언트(커넥션 풀)를 한 번만 만들고, 템플릿/시나리오는 내용을 캐시한다.
+    preload면 BASE_DIR의 모든 시계열 캐시와 시나리오를 시작할 때 미리 만든다.
+    """
+    client = client or get_default_client()
+    label_data = load_json_file(LABEL_JSON_PATH) if LABEL_JSON_PATH.exists() else {}
+    preloaded = 0
+    if preload:
+        for file_key in find_batch_files(None, None):
+            try:
+                # 작업마다 output_format을 바꿀 수 있으므로 text/json 템플릿 모두 (base_options가 없어도 됨)
+                for output_format in OUTPUT_FORMATS:
+                    load_prompt_parts(Path(file_key).name, output_format)
+                if series_cache is not None:
+                    load_series(BASE_DIR / file_key, series_cache)
+            except (FileNotFoundError, ValueError) as e:
+                print(f"⚠️ 미리 로드 실패 ({file_key}): {e}")
+                continue
+            preloaded += 1
+        print(f"🔥 미리 로드: {preloaded}개 파일 (시나리오 + 시계열 캐시)")
+
+    def detect(params: dict):
+        folder, file = _job_file(params)
+        plan_only = bool(params.get("plan_only"))
+        hierarchy = HierarchyOptions(**params["hierarchy"]) if params.get("hierarchy") else None
+        result = run_predict_mode(
+            folder, file, _job_options(base_options, params), client, plan_only, series_cache,
+            hierarchy=hierarchy, store=store, write_csv=bool(params.get("write_csv")),
+        )
+        if result is None and not plan_only:
+            raise RuntimeError("예측 실패 (로그 참고)")
+        return result
+
+    def label(params: dict):
+        folder, file = _job_file(params)
+        run_label_mode(folder, file, series_cache, label_data)
+        return str(BASE_DIR / folder / "label" / f"{Path(file).stem}_label.csv")
+
+    def evaluate(params: dict):
+        result = run_evaluate_mode(params.get("folder", ""), params.get("file", ""), params.get("chunksize"), series_cache, store)
+        if result is None:
+            raise RuntimeError("평가 실패 (로그 참고)")
+        return result
+
+    def check(params: dict):
+        # main2.py와 같은 앞부분 N행 정상/비정상 판정 (짧은 작업 — 서비스에서는 프로세스 시작 비용 없이 처리)
+        folder, file = _job_file(params)
+        options = _job_options(base_options, params)
+        df = read_series_frame(BASE_DIR / folder / file, series_cache)
+        if df is None or df.empty:
+            raise RuntimeError("CSV 데이터를 읽을 수 없습니다.")
+        head = df.head(int(params.get("rows", 10)))
+        prompt_template, scenario = load_prompt_parts(file, options.output_format)
+        window_prompt = build_window_prompt(head, prompt_template, scenario, options.data_format, options.precision)
+        if options.output_format == "json":
+            response = client.generate(
+                window_prompt.prompt, model=options.model_name, temperature=options.temperature,
+                extra_options={"num_predict": json_num_predict(len(head))}, response_format=VERDICT_SCHEMA,
+            )
+            result = parse_verdict_json(response)
+        else:
+            response = client.generate(window_prompt.prompt, model=options.model_name, temperature=options.temperature)
+            match = re.search(r"final result:\s*\*\*(normal|abnormal)\*\*", response.lower())
+            result = match.group(1).capitalize() if match else "Unknown"
+        print(response)
+        return {"file": file, "result": result, "response": response.strip()}
+
+    def info() -> dict:
+        return {
+            "preloaded_files": preloaded,
+            "label_entries": len(label_data),
+            "model": base_options.model_name if base_options else None,
+            "response_cache": None if client.cache is None else {"hits": client.cache.hits, "misses": client.cache.misses},
+        }
+
+    serve({"detect": detect, "label": label, "evaluate": evaluate, "check": check}, host, port, workers, info)
 
 
 # 🧩 evaluate 모드
-def run_evaluate_mode(folder: str, file: str):
+def version_number(path: Path) -> int:
+    """<stem>_v1_N.csv → N (숫자가 아니면 0)"""
+    suffix = path.stem.split("_v1_")[-1]
+    return int(suffix) if suffix.isdigit() else 0
+
+
+def _evaluate_chunked(
+    label_path: Path,
+    pred_files: List[Path],
+    anomaly_sets: Optional[Dict[str, np.ndarray]],
+    chunksize: Optional[int],
+) -> Optional[pd.DataFrame]:
+    """chunksize가 있으면 청크 병합 평가, 정렬되지 않은 파일이면 None (전체 로드 평가로 대체)"""
+    if not chunksize:
+        return None
+    try:
+        return evaluate_streaming(label_path, pred_files, anomaly_sets, chunksize)
+    except ValueError as e:
+        print(f"⚠️ {e} — 전체를 읽어 평가합니다.")
+        return None
+
+
+def run_evaluate_mode(
+    folder: str,
+    file: str,
+    chunksize: Optional[int] = None,
+    series_cache: Optional[Path] = None,
+    store: Optional[RunStore] = None,
+):
+    """
+    예측 결과 평가. file이 예측 CSV면 해당 파일만,
+    결과 폴더(<stem>/)면 그 안의 모든 _v1_N.csv를 정답 라벨 한 번 로드로 일괄 평가.
+    file이 원본 시계열이면 run store에 기록된 그 파일의 모든 실행을 (라벨 CSV 없이) 평가.
+    chunksize가 있으면 정답/예측 라벨을 청크 단위로 병합하며 평가한다 (utils.evaluate.evaluate_streaming).
+    """
     pred_path = Path(file)
     if not pred_path.is_absolute():
         pred_path = BASE_DIR / folder / file
@@ -171,16 +1141,53 @@ def run_evaluate_mode(folder: str, file: str):
         print(f"❌ 예측 결과 파일이 존재하지 않습니다: {pred_path}")
         return
 
-    label_path = pred_path.parent.parent / "label" / f"{pred_path.stem.split('_v1_')[0]}_label.csv"
+    file_key = f"{folder}/{file}"
+    if pred_path.is_file() and "_v1_" not in pred_path.stem and store is not None:
+        # 원본 시계열 파일: 예측 CSV로 평가하면 안 되므로 저장된 실행이 없으면 여기서 끝
+        if not store.has_runs(file_key):
+            print(f"❌ run store에 저장된 실행이 없습니다: {file_key}")
+            return
+        label_path = pred_path.parent / "label" / f"{pred_path.stem}_label.csv"
+        if not label_path.exists():
+            print(f"❌ 정답 라벨 파일이 존재하지 않습니다: {label_path}")
+            return
+        runs = store.list_runs(file_key)
+        anomaly_sets = {f"v{version}": store.anomalies(file_key, version) for version in runs["version"]}
+        result_df = _evaluate_chunked(label_path, [], anomaly_sets, chunksize)
+        if result_df is None:
+            result_df = evaluate_anomaly_sets(label_path, anomaly_sets, chunksize, series_cache)
+        result_df.insert(1, "model", runs["model"].to_numpy())
+        result_df.insert(2, "temperature", runs["temperature"].to_numpy())
+        columns = ["file", "model", "temperature", "precision", "recall", "f1", "pa_f1", "nab_score", "windows_detected", "windows"]
+        print(f"\n📊 평가 결과 (run store {len(runs)}개 실행, 정답: {label_path.name}):")
+        print(result_df[columns].to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+        return result_df
+
+    if pred_path.is_dir():
+        pred_files = sorted(pred_path.glob(f"{pred_path.name}_v1_*.csv"), key=version_number)
+        stem = pred_path.name
+        label_dir = pred_path.parent / "label"
+    else:
+        pred_files = [pred_path]
+        stem = pred_path.stem.split("_v1_")[0]
+        label_dir = pred_path.parent.parent / "label"
+
+    if not pred_files:
+        print(f"❌ 예측 결과 파일이 없습니다: {pred_path}")
+        return
+
+    label_path = label_dir / f"{stem}_label.csv"
     if not label_path.exists():
         print(f"❌ 정답 라벨 파일이 존재하지 않습니다: {label_path}")
         return
 
-    accuracy = compare_label_accuracy(str(label_path), str(pred_path))
-    if accuracy is not None:
-        print(f"✅ 정확도: {accuracy * 100:.2f}%")
-    else:
-        print("⚠️ 비교 실패: 두 파일의 행 개수가 다릅니다.")
+    result_df = _evaluate_chunked(label_path, pred_files, None, chunksize)
+    if result_df is None:
+        result_df = evaluate_many(label_path, pred_files, chunksize, series_cache)
+    columns = ["file", "accuracy", "precision", "recall", "f1", "pa_f1", "nab_score", "windows_detected", "windows"]
+    print(f"\n📊 평가 결과 ({len(pred_files)}개 파일, 정답: {label_path.name}):")
+    print(result_df[columns].to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+    return result_df
 
 
 # 🚀 메인 함수
@@ -188,24 +1195,51 @@ def main(
     folder: str,
     file: str,
     mode: str,
-    model_name: Optional[str] = None,
-    temperature: Optional[float] = None,
-    num_rows: int = 1000,
+    options: Optional[PredictOptions] = None,
+    client: Optional[ModelBackend] = None,
+    workers: Optional[int] = None,
+    chunksize: Optional[int] = None,
+    plan_only: bool = False,
+    series_cache: Optional[Path] = None,
+    telemetry: Optional[Telemetry] = None,
+    hierarchy: Optional[HierarchyOptions] = None,
+    store: Optional[RunStore] = None,
+    write_csv: bool = False,
+    version: Optional[int] = None,
+    chunk_rows: Optional[int] = None,
 ):
+    if mode == "label_all":
+        run_label_all_mode(folder, workers, series_cache, chunk_rows)
+        return
+
+    if not folder or not file:
+        print("❌ --folder와 --file을 모두 입력해야 합니다.")
+        return
+
     file_path = BASE_DIR / folder / file
-    if mode in {"label", "predict"} and not file_path.exists():
+    if mode in {"label", "predict", "materialize"} and not file_path.exists():
         print(f"❌ 데이터 파일이 존재하지 않습니다: {file_path}")
         return
 
     if mode == "label":
-        run_label_mode(folder, file)
+        run_label_mode(folder, file, series_cache, chunk_rows=chunk_rows)
     elif mode == "predict":
-        if not model_name or temperature is None:
+        if options is None:
             print("❌ 모델 이름과 temperature 값을 모두 입력해야 합니다.")
             return
-        run_predict_mode(folder, file, model_name, temperature, num_rows)
+        if chunk_rows and not plan_only:
+            if hierarchy is not None:
+                print("⚠️ 청크 처리에서는 --hierarchical을 지원하지 않아 모든 윈도우를 예측합니다.")
+            run_predict_chunked(folder, file, options, client, chunk_rows, telemetry, store, write_csv)
+        else:
+            run_predict_mode(folder, file, options, client, plan_only, series_cache, telemetry, hierarchy, store, write_csv)
     elif mode == "evaluate":
-        run_evaluate_mode(folder, file)
+        run_evaluate_mode(folder, file, chunk_rows or chunksize, series_cache, store)
+    elif mode == "materialize":
+        if store is None:
+            print("❌ materialize 모드는 run store가 필요합니다 (--no_run_store 없이 실행).")
+            return
+        materialize_run(store, f"{folder}/{file}", version, series_cache, chunk_rows)
     else:
         print(f"❌ 지원하지 않는 모드입니다: {mode}")
 
@@ -213,20 +1247,202 @@ def main(
 # 🧵 CLI 실행
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--folder", type=str, required=True, help="데이터 폴더 이름")
-    parser.add_argument("--file", type=str, required=True, help="CSV 파일 이름")
-    parser.add_argument("--mode", type=str, choices=["label", "predict", "evaluate"], required=True)
-    parser.add_argument("--model", type=str, help="Ollama 모델 이름 (예: mistral, llama3 등)")
+    parser.add_argument("--folder", type=str, help="데이터 폴더 이름 (label_all: 선택, batch/sweep: glob 패턴)")
+    parser.add_argument("--file", type=str, help="CSV 파일 이름 (batch/sweep: glob 패턴, 기본 *.csv)")
+    parser.add_argument("--mode", type=str, choices=["label", "label_all", "predict", "batch", "evaluate", "live", "sweep", "materialize", "serve"], required=True)
+    parser.add_argument("--workers", type=int, default=None, help="[label_all/batch] 프로세스 풀 크기 (기본: CPU 수), [serve] 동시에 실행할 작업 수 (기본 1)")
+    parser.add_argument("--llm_concurrency", type=int, default=None, help="[batch] 전체 워커가 공유하는 LLM 동시 호출 수 (기본: --concurrency)")
+    parser.add_argument("--manifest", type=str, default=None, help="[batch] 진행 기록 파일 (기존 파일을 주면 이어서 실행)")
+    parser.add_argument("--chunksize", type=int, default=None, help="[evaluate] 정답/예측 라벨을 청크 단위로 병합하며 평가 (행 수, --chunk_rows의 이전 이름)")
+    parser.add_argument("--chunk_rows", type=int, default=None, help=f"[predict/label/label_all/evaluate/materialize] 시계열 캐시 없이 이 행 수씩 읽고 쓰기 — 파일 길이와 상관없이 메모리 일정 (예: {DEFAULT_CHUNK_ROWS})")
+    parser.add_argument("--no_series_cache", action="store_true", help="시계열 .npy 캐시를 쓰지 않고 매번 CSV 파싱")
+    parser.add_argument("--model", type=str, help="모델 이름 (예: mistral, llama3 등 — openai 백엔드는 서버에 올린 모델 이름)")
     parser.add_argument("--temp", type=float, help="LLM temperature 값")
     parser.add_argument("--num_rows", type=int, default=1000, help="LLM에 넣을 row 수 제한")
+    parser.add_argument("--concurrency", type=int, default=1, help="동시에 처리할 윈도우 수 (Ollama는 OLLAMA_NUM_PARALLEL에 맞춰, openai/fake 백엔드는 --max_batch개씩 묶여 전송)")
+    parser.add_argument("--data_format", type=str, choices=DATA_FORMATS, default="verbose", help="프롬프트 데이터 포맷 (verbose/csv/compact)")
+    parser.add_argument("--precision", type=int, default=None, help="값의 소수점 자리수 (기본: 원본 그대로)")
+    add_cache_arguments(parser)
+    add_client_arguments(parser)
+    parser.add_argument("--stream", action="store_true", help="스트리밍 모드 (timestamp 증분 파싱 + 조기 중단)")
+    parser.add_argument("--max_timestamps", type=int, default=None, help="[stream] 윈도우당 최대 timestamp 수")
+    parser.add_argument("--max_tokens", type=int, default=None, help="[stream] 윈도우당 최대 생성 토큰 수")
+    parser.add_argument("--allow_trailing_text", action="store_true", help="[stream] 목록 뒤 텍스트가 나와도 중단하지 않음")
+    parser.add_argument("--prefilter", type=str, choices=PREFILTER_METHODS, default=None, help="LLM 호출 전 통계 사전 필터")
+    parser.add_argument("--prefilter_threshold", type=float, default=None, help="사전 필터 임계값 (기본: 방법별 기본값)")
+    parser.add_argument("--token_budget", type=int, default=None, help="모델 컨텍스트 토큰 수 (윈도우 크기를 여기에 맞추고 num_ctx로 전달, --num_rows는 상한)")
+    parser.add_argument("--overlap", type=float, default=0.5, help="윈도우 겹침 비율 (0 이상 1 미만, 기본 0.5)")
+    parser.add_argument("--adaptive_windows", action="store_true", help="이상 의심 구간 주변에서만 윈도우 축소/겹침")
+    parser.add_argument("--plan_only", action="store_true", help="윈도우 계획(경계, 예상 토큰)만 출력하고 종료")
+    parser.add_argument("--snap_tolerance", type=float, default=0.0, help="예측 timestamp를 가장 가까운 행에 맞출 허용 오차 (초, 기본 0 = 정확히 일치)")
+    parser.add_argument("--source", type=str, default=None, help="[live] tail할 파일 경로 또는 - (stdin, NDJSON/CSV 줄). 기본: --folder/--file")
+    parser.add_argument("--stride", type=int, default=None, help="[live] 새 행이 이만큼 쌓이면 윈도우 실행 (기본: num_rows/2)")
+    parser.add_argument("--interval", type=float, default=None, help="[live] 새 행이 있으면 이 간격(초)마다 윈도우 실행")
+    parser.add_argument("--backpressure", type=str, choices=BACKPRESSURE_POLICIES, default="coalesce", help="[live] LLM이 밀릴 때 대기 윈도우 처리")
+    parser.add_argument("--events", type=str, default=None, help="[live] 이벤트 JSONL 경로 (기본: runs/live_<시각>.jsonl)")
+    parser.add_argument("--from_start", action="store_true", help="[live] 파일의 기존 내용도 윈도우 대상으로 (기본: 링 버퍼만 채움)")
+    parser.add_argument("--telemetry", type=str, default=None, help="단계별 시간/토큰 지표 JSONL 경로 (predict/batch/live/sweep)")
+    parser.add_argument("--telemetry_report", type=str, choices=TELEMETRY_REPORTS, default="summary", help="종료 시 텔레메트리 요약 출력 (prometheus: <경로>.prom 기록)")
+    parser.add_argument("--no_run_store", action="store_true", help="[predict/batch] run store 대신 예측마다 라벨 CSV(_v1_N.csv) 저장")
+    parser.add_argument("--write_csv", action="store_true", help="[predict/batch] run store에 기록하면서 라벨 CSV도 바로 생성")
+    parser.add_argument("--version", type=int, default=None, help="[materialize] 라벨 CSV로 만들 실행 버전 (기본: 최신)")
+    parser.add_argument("--host", type=str, default=DEFAULT_DAEMON_HOST, help="[serve] 바인드 주소")
+    parser.add_argument("--port", type=int, default=DEFAULT_DAEMON_PORT, help="[serve] 포트")
+    parser.add_argument("--preload", action="store_true", help="[serve] 시작할 때 모든 시계열 캐시/시나리오를 미리 로드")
+    parser.add_argument("--hierarchical", action="store_true", help="[predict] bucket 요약(min/max/mean)으로 먼저 훑고 표시된 구간만 원래 해상도로 예측")
+    parser.add_argument("--overview_buckets", type=int, default=200, help="[hierarchical] overview 프롬프트 하나의 bucket 수")
+    parser.add_argument("--max_depth", type=int, default=3, help="[hierarchical] overview 단계 최대 수")
+    parser.add_argument("--models", type=str, default=None, help="[sweep] 모델 목록 (쉼표 구분, 기본: --model)")
+    parser.add_argument("--temps", type=str, default=None, help="[sweep] temperature 목록 (쉼표 구분, 기본: --temp)")
+    parser.add_argument("--num_rows_grid", type=str, default=None, help="[sweep] 윈도우 행 수 목록 (쉼표 구분, 기본: --num_rows)")
+    parser.add_argument("--data_formats", type=str, default=None, help="[sweep] 데이터 포맷 목록 (쉼표 구분, 기본: --data_format)")
+    parser.add_argument("--repeats", type=int, default=1, help="[sweep] 설정별 반복 실행 수 (동시에 실행)")
+    parser.add_argument("--sweep_output", type=str, default=None, help="[sweep] 결과 표 CSV 경로 (기본: runs/sweep_<시각>.csv)")
+    parser.add_argument("--no_unload", action="store_true", help="[sweep] 다음 모델로 넘어갈 때 이전 모델을 내리지 않음")
+    parser.add_argument("--prompt_layout", type=str, choices=PROMPT_LAYOUTS, default="flat", help="프롬프트 구성 (flat: /api/generate, chat: 지시문+시나리오를 system 메시지로 고정)")
+    parser.add_argument("--vote", type=int, default=1, help="윈도우당 샘플 수 (1보다 크면 동시에 샘플링해 quorum 이상 나온 timestamp만 채택, 결과가 정해지면 남은 샘플 취소)")
+    parser.add_argument("--vote_quorum", type=float, default=0.5, help="[vote] 채택에 필요한 표 (1 이하: 샘플 대비 비율, 1 초과: 표 수)")
+    parser.add_argument("--vote_parallel", type=int, default=None, help="[vote] 윈도우 하나에서 동시에 보낼 최대 샘플 수 (기본: --vote 전부, 전체 요청 수는 --concurrency/--llm_concurrency로 제한)")
+    parser.add_argument("--vote_temp", type=float, default=None, help=f"[vote] 샘플 temperature (기본: --temp, --temp가 0이면 {DEFAULT_VOTE_TEMPERATURE})")
+    parser.add_argument("--output_format", type=str, choices=OUTPUT_FORMATS, default="text", help="모델 출력 형식 (json: JSON schema 강제 + 윈도우 크기 기반 num_predict 상한 + 윈도우 행 검증)")
 
     args = parser.parse_args()
+    if not 0 <= args.overlap < 1:
+        # 1 이상이면 stride가 1행(행마다 LLM 호출), 음수면 행을 건너뜀
+        parser.error(f"--overlap은 0 이상 1 미만이어야 합니다: {args.overlap}")
 
-    main(
-        folder=args.folder,
-        file=args.file,
-        mode=args.mode,
-        model_name=args.model,
-        temperature=args.temp,
-        num_rows=args.num_rows,
-    )
+    configs = None
+    if args.mode == "sweep":
+        # 그리드 플래그가 없으면 단일 값 플래그를 그대로 사용
+        models = parse_list(args.models) if args.models else [args.model] if args.model else []
+        temps = parse_list(args.temps, float) if args.temps else [args.temp] if args.temp is not None else []
+        if not models or not temps:
+            parser.error("sweep 모드에는 --models(--model)와 --temps(--temp)가 필요합니다.")
+        num_rows_grid = parse_list(args.num_rows_grid, int) if args.num_rows_grid else [args.num_rows]
+        data_formats = parse_list(args.data_formats) if args.data_formats else [args.data_format]
+        unknown = [fmt for fmt in data_formats if fmt not in DATA_FORMATS]
+        if unknown:
+            parser.error(f"알 수 없는 데이터 포맷: {', '.join(unknown)} (가능: {', '.join(DATA_FORMATS)})")
+        configs = expand_grid(models, temps, num_rows_grid, data_formats)
+        args.model, args.temp = models[0], temps[0]
+
+    options = None
+    if args.mode in {"predict", "batch", "live", "sweep"} or (args.mode == "serve" and args.model):
+        if not args.model or args.temp is None:
+            parser.error("predict/batch/live 모드에는 --model과 --temp가 필요합니다.")
+        stream_rules = None
+        if args.stream:
+            stream_rules = StreamStopRules(
+                max_timestamps=args.max_timestamps,
+                max_tokens=args.max_tokens,
+                stop_on_trailing_text=not args.allow_trailing_text,
+            )
+        options = PredictOptions(
+            model_name=args.model,
+            temperature=args.temp,
+            num_rows=args.num_rows,
+            concurrency=args.concurrency,
+            data_format=args.data_format,
+            precision=args.precision,
+            stream_rules=stream_rules,
+            prefilter=args.prefilter,
+            prefilter_threshold=args.prefilter_threshold,
+            token_budget=args.token_budget,
+            overlap=args.overlap,
+            adaptive_windows=args.adaptive_windows,
+            prompt_layout=args.prompt_layout,
+            snap_tolerance=args.snap_tolerance,
+            output_format=args.output_format,
+            vote_samples=max(args.vote, 1),
+            vote_quorum=args.vote_quorum,
+            vote_parallel=args.vote_parallel,
+            vote_temperature=args.vote_temp,
+        )
+
+    cache_args = (args.cache_path or CACHE_PATH, args.cache, args.cache_max_mb, args.cache_max_age_days)
+    # 청크 처리는 시계열 캐시(전체 파일을 한 번에 파싱해서 만듦) 없이 CSV를 직접 흘려 읽음
+    series_cache = None if args.no_series_cache or args.chunk_rows else SERIES_CACHE_DIR
+    telemetry = Telemetry(args.telemetry) if args.telemetry else None
+    store_path = None if args.no_run_store else RUN_STORE_PATH
+
+    if args.mode == "batch":
+        # --folder/--file은 glob 패턴으로 사용 (기본: BASE_DIR 전체)
+        run_batch_mode(
+            args.folder,
+            args.file,
+            options,
+            client_kwargs_from_args(args),
+            cache_args,
+            workers=args.workers,
+            llm_concurrency=args.llm_concurrency,
+            manifest_path=Path(args.manifest) if args.manifest else None,
+            series_cache=series_cache,
+            telemetry=telemetry,
+            store_path=store_path,
+            write_csv=args.write_csv,
+        )
+    elif args.mode == "serve":
+        # 작업별 옵션이 없으면 --model/--temp 등으로 만든 기본값 사용
+        run_serve_mode(
+            args.host,
+            args.port,
+            workers=args.workers or 1,
+            base_options=options,
+            client=client_from_args(args, open_response_cache(*cache_args)),
+            series_cache=series_cache,
+            store=RunStore(store_path) if store_path is not None else None,
+            preload=args.preload,
+        )
+    elif args.mode == "sweep":
+        run_sweep_mode(
+            args.folder,
+            args.file,
+            options,
+            configs,
+            repeats=max(args.repeats, 1),
+            client=client_from_args(args, open_response_cache(*cache_args)),
+            output_path=Path(args.sweep_output) if args.sweep_output else None,
+            series_cache=series_cache,
+            telemetry=telemetry,
+            unload_models=not args.no_unload,
+        )
+    elif args.mode == "live":
+        source = args.source
+        if source is None:
+            if not args.folder or not args.file:
+                parser.error("live 모드에는 --source 또는 --folder/--file이 필요합니다.")
+            source = str(BASE_DIR / args.folder / args.file)
+        if not args.file:
+            parser.error("live 모드에는 시나리오를 찾을 --file이 필요합니다.")
+        run_live_mode(
+            source,
+            args.file,
+            options,
+            client_from_args(args, open_response_cache(*cache_args)),
+            stride=args.stride,
+            interval=args.interval,
+            backpressure=args.backpressure,
+            events_path=Path(args.events) if args.events else None,
+            from_start=args.from_start,
+            telemetry=telemetry,
+        )
+    else:
+        client = client_from_args(args, open_response_cache(*cache_args)) if args.mode == "predict" else None
+        main(
+            folder=args.folder,
+            file=args.file,
+            mode=args.mode,
+            options=options,
+            client=client,
+            workers=args.workers,
+            chunksize=args.chunksize,
+            plan_only=args.plan_only,
+            series_cache=series_cache,
+            telemetry=telemetry,
+            hierarchy=HierarchyOptions(args.overview_buckets, args.max_depth) if args.hierarchical else None,
+            store=RunStore(store_path) if store_path is not None and args.mode in {"predict", "evaluate", "materialize"} else None,
+            write_csv=args.write_csv,
+            version=args.version,
+            chunk_rows=args.chunk_rows,
+        )
+    report(telemetry, args.telemetry_report)
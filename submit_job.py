@@ -0,0 +1,119 @@
+# run_model_predict.py --mode serve 서비스에 작업을 제출하는 얇은 CLI (표준 라이브러리만 사용 — pandas import 없음)
+#   python submit_job.py detect --folder realKnownCause --file nyc_taxi.csv --model llama3.1:8b --temp 0 --wait
+#   python submit_job.py check --folder artificialNoAnomaly --file art_daily_no_noise.csv --rows 10 --wait
+#   python submit_job.py status 3 / list / health / cancel 3
+import argparse
+import json
+import sys
+import time
+import urllib.error
+import urllib.request
+
+DEFAULT_URL = "http://127.0.0.1:8765"
+
+
+def request(url: str, method: str = "GET", payload=None):
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    req = urllib.request.Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=30) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        body = e.read().decode("utf-8", "replace")
+        try:
+            message = json.loads(body).get("error", body)
+        except ValueError:
+            message = body
+        sys.exit(f"❌ {e.code}: {message}")
+    except urllib.error.URLError as e:
+        sys.exit(f"❌ 서비스에 연결할 수 없습니다 ({url}): {e.reason}")
+
+
+def parse_value(text: str):
+    """--option 값: JSON으로 읽을 수 있으면 JSON (숫자/true/null 등), 아니면 문자열"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def wait(base_url: str, job_id: str, interval: float) -> dict:
+    """작업이 끝날 때까지 로그를 이어서 출력"""
+    since = 0
+    while True:
+        job = request(f"{base_url}/jobs/{job_id}?since={since}")
+        if job.get("log"):
+            print(job["log"], end="")
+        since = job.get("log_size", since)
+        if job["status"] in ("done", "failed", "cancelled"):
+            return job
+        time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="탐지 서비스 작업 제출/조회")
+    parser.add_argument("command", choices=["detect", "label", "evaluate", "check", "status", "list", "health", "cancel"])
+    parser.add_argument("job_id", nargs="?", help="[status/cancel] 작업 ID")
+    parser.add_argument("--url", type=str, default=DEFAULT_URL, help="서비스 주소")
+    parser.add_argument("--folder", type=str)
+    parser.add_argument("--file", type=str)
+    parser.add_argument("--model", type=str, default=None)
+    parser.add_argument("--temp", type=float, default=None)
+    parser.add_argument("--num_rows", type=int, default=None)
+    parser.add_argument("--rows", type=int, default=None, help="[check] 앞부분 행 수 (기본 10)")
+    parser.add_argument("--option", action="append", default=[], metavar="KEY=VALUE", help="PredictOptions 필드 (여러 번 지정 가능)")
+    parser.add_argument("--plan_only", action="store_true")
+    parser.add_argument("--write_csv", action="store_true")
+    parser.add_argument("--wait", action="store_true", help="작업이 끝날 때까지 로그를 출력하며 대기")
+    parser.add_argument("--interval", type=float, default=0.5, help="[wait] 상태 조회 간격 (초)")
+    args = parser.parse_args()
+    base_url = args.url.rstrip("/")
+
+    if args.command == "health":
+        print(json.dumps(request(f"{base_url}/health"), ensure_ascii=False, indent=2))
+        return
+    if args.command == "list":
+        for job in request(f"{base_url}/jobs"):
+            print(f"{job['id']:>5}  {job['kind']:<9} {job['status']:<9} {job['params'].get('folder', '')}/{job['params'].get('file', '')}")
+        return
+    if args.command in ("status", "cancel"):
+        if not args.job_id:
+            parser.error(f"{args.command}에는 작업 ID가 필요합니다.")
+        if args.command == "cancel":
+            print(request(f"{base_url}/jobs/{args.job_id}", method="DELETE"))
+        elif args.wait:
+            job = wait(base_url, args.job_id, args.interval)
+            print(json.dumps({k: v for k, v in job.items() if k != "log"}, ensure_ascii=False, indent=2))
+        else:
+            print(json.dumps(request(f"{base_url}/jobs/{args.job_id}"), ensure_ascii=False, indent=2))
+        return
+
+    options = {}
+    if args.model:
+        options["model_name"] = args.model
+    if args.temp is not None:
+        options["temperature"] = args.temp
+    if args.num_rows is not None:
+        options["num_rows"] = args.num_rows
+    for item in args.option:
+        key, _, value = item.partition("=")
+        options[key] = parse_value(value)
+
+    payload = {"kind": args.command, "folder": args.folder, "file": args.file, "options": options}
+    if args.rows is not None:
+        payload["rows"] = args.rows
+    if args.plan_only:
+        payload["plan_only"] = True
+    if args.write_csv:
+        payload["write_csv"] = True
+    submitted = request(f"{base_url}/jobs", method="POST", payload=payload)
+    print(f"📨 작업 제출: {submitted['id']} ({args.command})")
+    if args.wait:
+        job = wait(base_url, submitted["id"], args.interval)
+        if job["status"] != "done":
+            sys.exit(f"❌ 작업 {job['id']} {job['status']}: {job.get('error')}")
+        print(f"✅ 작업 {job['id']} 완료: {json.dumps(job['result'], ensure_ascii=False)[:1000]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#utils/chunked.py
+import gc
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from utils.timestamps import TimestampIndex, parse_timestamp_array
+
+# 청크 처리: 파일 길이와 상관없이 한 번에 최대 chunk_rows(+ 윈도우 하나)행만 메모리에 둔다.
+# 시계열 캐시(utils.dataset)를 쓰지 않고 CSV를 pandas 청크 reader로 한 번씩 흘려 읽는다.
+DEFAULT_CHUNK_ROWS = 200_000
+
+
+def release_chunk():
+    """
+    다 쓴 청크 회수. pandas 객체의 순환 참조(.str 접근자 캐시 등)는 객체 수 기준으로 도는 gc가 늦게 회수해서,
+    그대로 두면 청크 수만큼 메모리가 쌓인다 — 청크마다 직접 회수한다.
+    """
+    gc.collect()
+
+
+def iter_csv_chunks(
+    csv_path: Union[str, Path],
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    usecols: Optional[List[str]] = None,
+    dtype=None,
+) -> Iterator[pd.DataFrame]:
+    """CSV → chunk_rows행씩 DataFrame (행 번호는 파일 전체 기준 RangeIndex)"""
+    for chunk in pd.read_csv(csv_path, chunksize=max(chunk_rows, 1), usecols=usecols, dtype=dtype, encoding="utf-8"):
+        yield chunk
+        release_chunk()
+
+
+def iter_timestamp_chunks(csv_path: Union[str, Path], chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[np.ndarray]:
+    """CSV의 timestamp 컬럼만 청크 단위 int64 (epoch ns) 배열로"""
+    for chunk in iter_csv_chunks(csv_path, chunk_rows, usecols=["timestamp"], dtype=str):
+        yield parse_timestamp_array(chunk["timestamp"])
+
+
+def iter_window_batches(
+    chunks: Iterator[pd.DataFrame],
+    window_rows: int,
+    overlap: float = 0.5,
+) -> Iterator[Tuple[int, pd.DataFrame, List[Tuple[int, int]]]]:
+    """
+    청크 경계를 넘어 utils.windowing.fixed_windows와 같은 (start, end) 윈도우를 만든다
+    → 청크마다 (offset, frame, windows): frame의 0번째 행이 전체의 offset번째 행이고,
+    windows(전체 행 번호)는 모두 frame 안에 들어 있다. 다음 윈도우에 필요한 겹침 행만 다음 청크로 넘긴다.
+    """
+    window_rows = max(window_rows, 1)
+    stride = max(int(round(window_rows * (1 - overlap))), 1)
+    buffer = None
+    offset = 0
+    next_start = 0
+    for chunk in chunks:
+        buffer = chunk.reset_index(drop=True) if buffer is None else pd.concat([buffer, chunk], ignore_index=True)
+        buffer_end = offset + len(buffer)
+        windows = []
+        while next_start + window_rows <= buffer_end:
+            windows.append((next_start, next_start + window_rows))
+            next_start += stride
+        if windows:
+            yield offset, buffer, windows
+        # 다음 윈도우 시작 이전 행은 더 이상 필요 없음
+        drop = min(next_start - offset, len(buffer))
+        buffer = buffer.iloc[drop:].reset_index(drop=True)
+        offset += drop
+
+    # 파일 끝: 남은 시작 위치의 윈도우는 끝이 잘린 채로 (fixed_windows + iloc 슬라이스와 같음)
+    if buffer is not None and len(buffer):
+        buffer_end = offset + len(buffer)
+        windows = []
+        while next_start < buffer_end:
+            windows.append((next_start, next_start + window_rows))
+            next_start += stride
+        if windows:
+            yield offset, buffer, windows
+
+
+def snap_chunked(
+    csv_path: Union[str, Path],
+    query_ns: np.ndarray,
+    tolerance_ns: int = 0,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Tuple[np.ndarray, int]:
+    """
+    TimestampIndex.snap의 청크 버전: 원본 timestamp를 청크 단위로 훑으며 query마다 가장 가까운 행을 찾는다
+    → (맞춘 행 timestamp 정렬 배열, 어떤 행에도 맞지 않은 query 수). 거리가 같으면 앞쪽 행.
+    메모리는 청크 하나 + query 수에 비례한다.
+    """
+    query_ns = np.asarray(query_ns, dtype="int64")
+    best_dist = np.full(len(query_ns), np.iinfo("int64").max, dtype="int64")
+    best_ts = np.zeros(len(query_ns), dtype="int64")
+    if len(query_ns):
+        for row_ts in iter_timestamp_chunks(csv_path, chunk_rows):
+            rows = TimestampIndex(row_ts).snap(query_ns, tolerance_ns)
+            found = rows >= 0
+            dist = np.abs(row_ts[rows[found]] - query_ns[found])
+            better = np.zeros(len(query_ns), dtype=bool)
+            better[found] = dist < best_dist[found]
+            best_dist[better] = np.abs(row_ts[rows[better]] - query_ns[better])
+            best_ts[better] = row_ts[rows[better]]
+    matched = best_dist != np.iinfo("int64").max
+    return np.unique(best_ts[matched]), int(np.count_nonzero(~matched))
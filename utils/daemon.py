@@ -0,0 +1,255 @@
+#utils/daemon.py
+import io
+import itertools
+import json
+import queue
+import sys
+import threading
+import time
+import traceback
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+# 상주 탐지 서비스 (로컬 HTTP): 작업 큐 + 작업별 상태/로그
+#   POST   /jobs        {"kind": "detect" | "label" | "evaluate" | ..., ...} → {"id", "status"}
+#   GET    /jobs        작업 목록 (로그 제외)
+#   GET    /jobs/<id>   작업 상태 + 결과 + 로그 (?since=N 이면 N번째 글자 이후 로그만)
+#   DELETE /jobs/<id>   대기 중인 작업 취소
+#   GET    /health      큐 길이, 워커 수, 미리 로드한 항목
+# 작업 실행 함수는 호출 측(run_model_predict.py --mode serve)에서 kind별로 등록한다.
+DEFAULT_DAEMON_HOST = "127.0.0.1"
+DEFAULT_DAEMON_PORT = 8765
+JOB_STATES = ("queued", "running", "done", "failed", "cancelled")
+# 끝난 작업은 최근 이만큼만 메모리에 유지
+MAX_FINISHED_JOBS = 1000
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    params: dict
+    status: str = "queued"
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
+    log: io.StringIO = field(default_factory=io.StringIO, repr=False)
+
+    def to_dict(self, with_log: bool = True, since: int = 0) -> dict:
+        data = {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+        if with_log:
+            text = self.log.getvalue()
+            data["log"] = text[since:]
+            data["log_size"] = len(text)
+        return data
+
+
+class _ThreadLocalStdout(io.TextIOBase):
+    """
+    스레드별 stdout 전환: 작업 실행 중인 스레드의 print는 그 작업 로그로,
+    나머지 스레드(HTTP 처리 등)는 원래 stdout으로 보낸다 (redirect_stdout은 프로세스 전역이라 쓸 수 없음).
+    작업 안에서 만든 스레드(윈도우 동시 처리)의 출력은 원래 stdout으로 간다.
+    """
+
+    def __init__(self, default):
+        self.default = default
+        self.local = threading.local()
+
+    def _target(self):
+        return getattr(self.local, "stream", None) or self.default
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+
+class JobQueue:
+    """작업 큐 + 워커 스레드 (작업 실행 중 예외는 작업 상태로만 기록하고 워커는 계속 돈다)"""
+
+    def __init__(self, handlers: Dict[str, Callable[[dict], Any]], workers: int = 1):
+        self.handlers = handlers
+        self.jobs: Dict[str, Job] = {}
+        self.pending: "queue.Queue[Optional[Job]]" = queue.Queue()
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.stdout = _ThreadLocalStdout(sys.stdout)
+        sys.stdout = self.stdout
+        self.threads = [threading.Thread(target=self._work, daemon=True) for _ in range(max(workers, 1))]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, kind: str, params: dict) -> Job:
+        if kind not in self.handlers:
+            raise ValueError(f"지원하지 않는 작업 종류: {kind} (가능: {', '.join(self.handlers)})")
+        job = Job(id=f"{next(self.ids)}", kind=kind, params=params)
+        with self.lock:
+            self.jobs[job.id] = job
+            self._trim()
+        self.pending.put(job)
+        return job
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None and job.status == "queued":
+                job.status = "cancelled"
+                job.finished_at = time.time()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self.lock:
+            return list(self.jobs.values())
+
+    def counts(self) -> Dict[str, int]:
+        with self.lock:
+            counts = dict.fromkeys(JOB_STATES, 0)
+            for job in self.jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def _trim(self):
+        finished = [j for j in self.jobs.values() if j.status in ("done", "failed", "cancelled")]
+        for job in finished[: max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            del self.jobs[job.id]
+
+    def _work(self):
+        while True:
+            job = self.pending.get()
+            if job is None:
+                return
+            with self.lock:
+                if job.status != "queued":
+                    continue
+                job.status = "running"
+                job.started_at = time.time()
+            self.stdout.local.stream = job.log
+            try:
+                result = self.handlers[job.kind](job.params)
+                job.result = _jsonable(result)
+                job.status = "done"
+            except Exception as e:
+                job.error = str(e)
+                job.log.write(traceback.format_exc())
+                job.status = "failed"
+            finally:
+                self.stdout.local.stream = None
+                job.finished_at = time.time()
+
+    def shutdown(self):
+        for _ in self.threads:
+            self.pending.put(None)
+        sys.stdout = self.stdout.default
+
+
+def _jsonable(value: Any) -> Any:
+    """작업 결과 → JSON으로 보낼 수 있는 값 (DataFrame/Path 등)"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if hasattr(value, "to_dict"):
+        return value.to_dict(orient="records")
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    return str(value)
+
+
+def make_handler(jobs: JobQueue, info: Callable[[], dict]):
+    """JobQueue를 노출하는 HTTP 요청 처리기 클래스"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, payload: Any):
+            body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _job_id(self) -> Optional[str]:
+            parts = self.path.split("?")[0].strip("/").split("/")
+            return parts[1] if len(parts) == 2 and parts[0] == "jobs" else None
+
+        def do_GET(self):
+            path, _, query = self.path.partition("?")
+            if path == "/health":
+                self._send(200, {"status": "ok", "jobs": jobs.counts(), "workers": len(jobs.threads), **info()})
+            elif path == "/jobs":
+                self._send(200, [job.to_dict(with_log=False) for job in jobs.list()])
+            elif self._job_id() is not None:
+                job = jobs.get(self._job_id())
+                if job is None:
+                    self._send(404, {"error": "작업 없음"})
+                    return
+                since = dict(p.split("=", 1) for p in query.split("&") if "=" in p).get("since", "0")
+                self._send(200, job.to_dict(since=int(since) if since.isdigit() else 0))
+            else:
+                self._send(404, {"error": "알 수 없는 경로"})
+
+        def do_POST(self):
+            if self.path != "/jobs":
+                self._send(404, {"error": "알 수 없는 경로"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                params = json.loads(self.rfile.read(length) or b"{}")
+                if not isinstance(params, dict):
+                    raise ValueError(f"요청 본문은 JSON 객체여야 합니다: {type(params).__name__}")
+                job = jobs.submit(params.pop("kind", ""), params)
+            except ValueError as e:
+                self._send(400, {"error": str(e)})
+                return
+            self._send(202, {"id": job.id, "status": job.status})
+
+        def do_DELETE(self):
+            job = jobs.cancel(self._job_id() or "")
+            if job is None:
+                self._send(404, {"error": "작업 없음"})
+            else:
+                self._send(200, {"id": job.id, "status": job.status})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(
+    handlers: Dict[str, Callable[[dict], Any]],
+    host: str = DEFAULT_DAEMON_HOST,
+    port: int = DEFAULT_DAEMON_PORT,
+    workers: int = 1,
+    info: Optional[Callable[[], dict]] = None,
+):
+    """로컬 HTTP 서버 실행 (Ctrl+C로 종료) — 로컬 전용이므로 기본은 127.0.0.1에만 바인드"""
+    jobs = JobQueue(handlers, workers)
+    server = ThreadingHTTPServer((host, port), make_handler(jobs, info or dict))
+    print(f"🛰️ 탐지 서비스 시작: http://{host}:{port} (작업 워커 {workers}개, 작업 종류: {', '.join(handlers)})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹️ 탐지 서비스 종료")
+    finally:
+        server.server_close()
+        jobs.shutdown()
@@ -0,0 +1,185 @@
+#utils/dataset.py
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from utils.file import read_csv_file
+from utils.timestamps import parse_timestamp_array
+
+# 시계열 CSV를 한 번만 파싱해서 컬럼 단위 .npy로 캐시 (memory-mapped로 읽기)
+#   timestamp.npy : int64 epoch ns
+#   values.npy    : float64 (rows × 값 컬럼 수)
+#   label.npy     : bool (label 컬럼이 있는 라벨/예측 CSV만, anomaly면 True)
+#   meta.json     : 원본 크기/mtime/sha1, 컬럼 이름/원래 dtype — 마지막에 기록되며 이게 있어야 유효한 캐시
+# 여러 프로세스가 같은 파일을 열면 OS 페이지 캐시를 공유하므로 워커마다 DataFrame을 따로 파싱/보관하지 않는다.
+SERIES_CACHE_VERSION = 1
+LABEL_COLUMN = "label"
+
+
+@dataclass
+class SeriesData:
+    """캐시된 시계열 (배열은 읽기 전용 memmap)"""
+    path: Path
+    timestamps: np.ndarray                # int64 epoch ns
+    values: np.ndarray                    # float64 (rows × len(value_names))
+    value_names: List[str]
+    int_columns: List[str]                # 원본이 정수 컬럼이던 값 (프롬프트 출력이 "20.0"이 되지 않도록 복원)
+    labels: Optional[np.ndarray] = None   # bool, label 컬럼이 있을 때만
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def to_frame(self, start: int = 0, end: Optional[int] = None) -> pd.DataFrame:
+        """
+        [start, end) 구간을 DataFrame으로 (복사 없이 memmap 위에 생성).
+        timestamp 컬럼은 datetime64 — 직렬화 결과는 원본 문자열 컬럼과 같다 (초 단위 timestamp 기준).
+        """
+        columns = {"timestamp": self.timestamps[start:end].view("datetime64[ns]")}
+        for i, name in enumerate(self.value_names):
+            column = self.values[start:end, i]
+            columns[name] = column.astype("int64") if name in self.int_columns else column
+        if self.labels is not None:
+            columns[LABEL_COLUMN] = np.where(self.labels[start:end], "anomaly", "normal")
+        return pd.DataFrame(columns, copy=False)
+
+
+def _file_sha1(path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def series_cache_dir(csv_path: Union[str, Path], cache_root: Union[str, Path]) -> Path:
+    """원본 경로별 캐시 디렉토리: <cache_root>/<stem>-<경로 해시>"""
+    csv_path = Path(csv_path).resolve()
+    key = hashlib.sha1(str(csv_path).encode("utf-8")).hexdigest()[:12]
+    return Path(cache_root) / f"{csv_path.stem}-{key}"
+
+
+def _atomic_write(path: Path, write):
+    """임시 파일에 쓴 뒤 os.replace — 동시에 같은 캐시를 만드는 프로세스가 있어도 반쯤 쓴 파일을 읽지 않게"""
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def _read_meta(entry: Path) -> Optional[dict]:
+    try:
+        with open(entry / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("version") == SERIES_CACHE_VERSION else None
+
+
+def _is_fresh(meta: dict, csv_path: Path, entry: Path) -> bool:
+    """
+    크기 + mtime이 같으면 유효. mtime만 바뀐 경우(복사/touch)에는 sha1을 비교해서
+    내용이 같으면 meta의 mtime만 갱신하고 재사용한다.
+    """
+    stat = csv_path.stat()
+    if meta["size"] != stat.st_size:
+        return False
+    if meta["mtime_ns"] == stat.st_mtime_ns:
+        return True
+    if meta["sha1"] != _file_sha1(csv_path):
+        return False
+    meta["mtime_ns"] = stat.st_mtime_ns
+    _atomic_write(entry / "meta.json", lambda f: f.write(json.dumps(meta).encode("utf-8")))
+    return True
+
+
+def build_series_cache(csv_path: Union[str, Path], entry: Path) -> dict:
+    """CSV를 파싱해서 캐시 디렉토리에 컬럼별 .npy + meta.json 기록 → meta 반환"""
+    csv_path = Path(csv_path)
+    stat = csv_path.stat()
+    df = pd.read_csv(csv_path, encoding="utf-8")
+
+    value_names, int_columns = [], []
+    for col in df.columns:
+        if col in ("timestamp", LABEL_COLUMN):
+            continue
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            raise ValueError(f"숫자가 아닌 컬럼은 캐시할 수 없습니다: {col}")
+        value_names.append(col)
+        if pd.api.types.is_integer_dtype(df[col]):
+            int_columns.append(col)
+
+    entry.mkdir(parents=True, exist_ok=True)
+    timestamps = parse_timestamp_array(df["timestamp"])
+    values = df[value_names].to_numpy(dtype="float64").reshape(len(df), len(value_names))
+    _atomic_write(entry / "timestamp.npy", lambda f: np.save(f, timestamps))
+    _atomic_write(entry / "values.npy", lambda f: np.save(f, values))
+    has_labels = LABEL_COLUMN in df.columns
+    if has_labels:
+        labels = df[LABEL_COLUMN].astype(str).str.strip().to_numpy() == "anomaly"
+        _atomic_write(entry / "label.npy", lambda f: np.save(f, labels))
+
+    meta = {
+        "version": SERIES_CACHE_VERSION,
+        "source": str(csv_path.resolve()),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha1": _file_sha1(csv_path),
+        "rows": len(df),
+        "value_names": value_names,
+        "int_columns": int_columns,
+        "has_labels": has_labels,
+    }
+    _atomic_write(entry / "meta.json", lambda f: f.write(json.dumps(meta).encode("utf-8")))
+    return meta
+
+
+def load_series(csv_path: Union[str, Path], cache_root: Union[str, Path]) -> SeriesData:
+    """
+    시계열 CSV → SeriesData. 유효한 캐시가 있으면 파싱 없이 memmap으로 열고,
+    없거나 원본이 바뀌었으면(크기/mtime/sha1) 다시 만든다.
+    """
+    csv_path = Path(csv_path)
+    entry = series_cache_dir(csv_path, cache_root)
+    meta = _read_meta(entry)
+    if meta is None or not _is_fresh(meta, csv_path, entry):
+        meta = build_series_cache(csv_path, entry)
+
+    labels = np.load(entry / "label.npy", mmap_mode="r") if meta["has_labels"] else None
+    return SeriesData(
+        path=csv_path,
+        timestamps=np.load(entry / "timestamp.npy", mmap_mode="r"),
+        values=np.load(entry / "values.npy", mmap_mode="r"),
+        value_names=meta["value_names"],
+        int_columns=meta["int_columns"],
+        labels=labels,
+    )
+
+
+def load_timestamps(csv_path: Union[str, Path], cache_root: Optional[Union[str, Path]] = None) -> np.ndarray:
+    """CSV의 timestamp 컬럼만 int64 (epoch ns) 배열로 (cache_root가 있으면 캐시에서)"""
+    if cache_root is not None:
+        return load_series(csv_path, cache_root).timestamps
+    return parse_timestamp_array(pd.read_csv(csv_path, usecols=["timestamp"], dtype=str, encoding="utf-8")["timestamp"])
+
+
+def read_series_frame(csv_path: Union[str, Path], cache_root: Optional[Union[str, Path]] = None) -> Optional[pd.DataFrame]:
+    """
+    predict 파이프라인용 DataFrame 로드 (read_csv_file 대체).
+    cache_root가 없거나 캐시할 수 없는 형식이면 기존처럼 CSV를 직접 읽는다.
+    """
+    if cache_root is None:
+        return read_csv_file(str(csv_path))
+    try:
+        return load_series(csv_path, cache_root).to_frame()
+    except ValueError as e:
+        print(f"⚠️ 시계열 캐시 사용 불가 ({e}) — CSV를 직접 읽습니다.")
+        return read_csv_file(str(csv_path))
+    except Exception as e:
+        print(f"[ERROR] CSV 읽기 실패: {csv_path} - {e}")
+        return None
@@ -0,0 +1,345 @@
+#utils/evaluate.py
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from utils.chunked import release_chunk
+from utils.dataset import load_series
+from utils.timestamps import parse_timestamp_array
+
+# NAB standard profile 가중치 (TP / FP / FN)
+NAB_A_TP = 1.0
+NAB_A_FP = -0.11
+NAB_A_FN = -1.0
+
+
+def load_label_arrays(
+    csv_path: Union[str, Path],
+    chunksize: Optional[int] = None,
+    cache_root: Optional[Union[str, Path]] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    라벨 CSV → (timestamp int64 배열, anomaly 여부 bool 배열).
+    timestamp/label 컬럼만 읽고, chunksize가 주어지면 청크 단위로 읽어 행 dict를 만들지 않는다.
+    cache_root가 주어지면 utils.dataset 캐시(memmap)에서 읽는다.
+    """
+    if cache_root is not None:
+        series = load_series(csv_path, cache_root)
+        if series.labels is None:
+            raise ValueError(f"label 컬럼 없음: {csv_path}")
+        return series.timestamps, series.labels
+
+    reader = pd.read_csv(
+        csv_path,
+        usecols=["timestamp", "label"],
+        dtype=str,
+        encoding="utf-8",
+        chunksize=chunksize,
+    )
+    chunks = reader if chunksize else [reader]
+    ts_parts, label_parts = [], []
+    for chunk in chunks:
+        ts_parts.append(parse_timestamp_array(chunk["timestamp"]))
+        label_parts.append(chunk["label"].str.strip().to_numpy() == "anomaly")
+    if not ts_parts:
+        return np.array([], dtype="int64"), np.array([], dtype=bool)
+    return np.concatenate(ts_parts), np.concatenate(label_parts)
+
+
+def align_by_timestamp(
+    true_ts: np.ndarray,
+    true_labels: np.ndarray,
+    pred_ts: np.ndarray,
+    pred_labels: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    timestamp 기준으로 두 라벨 배열 정렬.
+    정답 라벨의 모든 행을 유지하고, 예측에 없는 timestamp는 normal로 취급한다.
+    """
+    true_order = np.argsort(true_ts, kind="stable")
+    true_ts, true_labels = true_ts[true_order], true_labels[true_order]
+    pred_order = np.argsort(pred_ts, kind="stable")
+    pred_ts, pred_labels = pred_ts[pred_order], pred_labels[pred_order]
+
+    aligned = np.zeros(len(true_ts), dtype=bool)
+    if len(pred_ts):
+        idx = np.searchsorted(pred_ts, true_ts)
+        found = idx < len(pred_ts)
+        found[found] = pred_ts[idx[found]] == true_ts[found]
+        aligned[found] = pred_labels[idx[found]]
+    return true_labels, aligned
+
+
+def anomaly_segments(labels: np.ndarray) -> np.ndarray:
+    """연속된 anomaly 구간 → (N, 2) 배열 [start_idx, end_idx] (end 포함)"""
+    padded = np.concatenate([[False], labels, [False]]).astype(np.int8)
+    diff = np.diff(padded)
+    starts = np.flatnonzero(diff == 1)
+    ends = np.flatnonzero(diff == -1) - 1
+    return np.stack([starts, ends], axis=1) if len(starts) else np.empty((0, 2), dtype=int)
+
+
+def _prf(y_true: np.ndarray, y_pred: np.ndarray) -> Dict[str, float]:
+    tp = int(np.count_nonzero(y_true & y_pred))
+    fp = int(np.count_nonzero(~y_true & y_pred))
+    fn = int(np.count_nonzero(y_true & ~y_pred))
+    tn = int(len(y_true) - tp - fp - fn)
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        "tp": tp, "fp": fp, "fn": fn, "tn": tn,
+        "accuracy": (tp + tn) / len(y_true) if len(y_true) else 0.0,
+        "precision": precision, "recall": recall, "f1": f1,
+    }
+
+
+def point_adjust(y_true: np.ndarray, y_pred: np.ndarray, segments: Optional[np.ndarray] = None) -> np.ndarray:
+    """point-adjust: 정답 anomaly 구간 안에서 한 점이라도 맞히면 구간 전체를 맞힌 것으로 처리"""
+    segments = anomaly_segments(y_true) if segments is None else segments
+    adjusted = y_pred.copy()
+    if len(segments):
+        # 누적합으로 구간별 적중 수를 한 번에 계산
+        cumsum = np.concatenate([[0], np.cumsum(y_pred, dtype=np.int64)])
+        hits = cumsum[segments[:, 1] + 1] - cumsum[segments[:, 0]]
+        for start, end in segments[hits > 0]:
+            adjusted[start:end + 1] = True
+    return adjusted
+
+
+def _scaled_sigmoid(position: float) -> float:
+    """NAB scaled sigmoid: 구간 시작(-1)에 가까울수록 1, 구간 끝(0) 이후로 갈수록 -1"""
+    return 2.0 / (1.0 + np.exp(5.0 * position)) - 1.0
+
+
+def nab_score(y_true: np.ndarray, y_pred: np.ndarray, segments: Optional[np.ndarray] = None) -> Dict[str, float]:
+    """
+    NAB 방식 윈도우 점수 (standard profile, 단순화 버전).
+    - 구간마다 첫 탐지 위치에 대해 scaled sigmoid 가중 TP 점수, 놓치면 A_FN
+    - 구간 밖의 예측 anomaly는 각각 A_FP
+    - 정규화 점수 = 100 * (raw - null) / (perfect - null)
+    """
+    segments = anomaly_segments(y_true) if segments is None else segments
+    raw = 0.0
+    detected = 0
+    for start, end in segments:
+        hits = np.flatnonzero(y_pred[start:end + 1])
+        if len(hits):
+            first = start + hits[0]
+            position = -(end - first + 1) / (end - start + 1)
+            raw += NAB_A_TP * _scaled_sigmoid(position)
+            detected += 1
+        else:
+            raw += NAB_A_FN
+
+    outside = y_pred & ~y_true
+    raw += NAB_A_FP * int(np.count_nonzero(outside))
+
+    null = NAB_A_FN * len(segments)
+    perfect = NAB_A_TP * _scaled_sigmoid(-1.0) * len(segments)
+    normalized = 100.0 * (raw - null) / (perfect - null) if perfect != null else 0.0
+    return {
+        "windows": int(len(segments)),
+        "windows_detected": detected,
+        "nab_raw": float(raw),
+        "nab_score": float(normalized),
+    }
+
+
+def evaluate_arrays(y_true: np.ndarray, y_pred: np.ndarray) -> Dict[str, float]:
+    """정렬된 라벨 배열 → point / point-adjusted / NAB 지표"""
+    segments = anomaly_segments(y_true)
+    metrics = _prf(y_true, y_pred)
+    adjusted = _prf(y_true, point_adjust(y_true, y_pred, segments))
+    metrics.update(
+        pa_precision=adjusted["precision"],
+        pa_recall=adjusted["recall"],
+        pa_f1=adjusted["f1"],
+    )
+    metrics.update(nab_score(y_true, y_pred, segments))
+    return metrics
+
+
+class StreamingEvaluator:
+    """
+    evaluate_arrays의 스트리밍 버전: timestamp 순으로 정렬된 (y_true, y_pred) 청크를 update로 받아
+    point / point-adjusted / NAB 지표를 누적한다. 청크 경계에 걸친 정답 구간은 이어서 센다.
+    메모리는 청크 하나 분량 (행 배열을 모아 두지 않음).
+    """
+
+    def __init__(self):
+        self.tp = self.fp = self.fn = self.tn = 0
+        self.rows = 0
+        self.windows = 0
+        self.windows_detected = 0
+        self.pa_tp = 0
+        self.nab_hits = 0.0
+        self.open_start: Optional[int] = None     # 열린 정답 구간 시작 (전체 행 번호)
+        self.open_first_hit: Optional[int] = None  # 열린 구간의 첫 탐지 위치
+
+    def _close(self, end: int):
+        start, first = self.open_start, self.open_first_hit
+        self.windows += 1
+        if first is not None:
+            self.windows_detected += 1
+            self.pa_tp += end - start + 1
+            self.nab_hits += NAB_A_TP * _scaled_sigmoid(-(end - first + 1) / (end - start + 1))
+        self.open_start = self.open_first_hit = None
+
+    def update(self, y_true: np.ndarray, y_pred: np.ndarray):
+        y_true = np.asarray(y_true, dtype=bool)
+        y_pred = np.asarray(y_pred, dtype=bool)
+        counts = _prf(y_true, y_pred)
+        for key in ("tp", "fp", "fn", "tn"):
+            setattr(self, key, getattr(self, key) + counts[key])
+
+        for start, end in anomaly_segments(y_true):
+            hits = np.flatnonzero(y_pred[start:end + 1])
+            first = self.rows + start + hits[0] if len(hits) else None
+            if self.open_start is not None and start == 0:
+                # 이전 청크 끝에서 이어지는 구간
+                self.open_first_hit = self.open_first_hit if self.open_first_hit is not None else first
+            else:
+                if self.open_start is not None:
+                    self._close(self.rows - 1)
+                self.open_start, self.open_first_hit = self.rows + start, first
+            if end < len(y_true) - 1:
+                self._close(self.rows + end)
+        if self.open_start is not None and len(y_true) and not y_true[-1]:
+            self._close(self.rows - 1)
+        self.rows += len(y_true)
+
+    def result(self) -> Dict[str, float]:
+        if self.open_start is not None:
+            self._close(self.rows - 1)
+        y_total = self.tp + self.fn
+        precision = self.tp / (self.tp + self.fp) if self.tp + self.fp else 0.0
+        recall = self.tp / y_total if y_total else 0.0
+        pa_precision = self.pa_tp / (self.pa_tp + self.fp) if self.pa_tp + self.fp else 0.0
+        pa_recall = self.pa_tp / y_total if y_total else 0.0
+
+        def f1(p: float, r: float) -> float:
+            return 2 * p * r / (p + r) if p + r else 0.0
+
+        raw = self.nab_hits + NAB_A_FN * (self.windows - self.windows_detected) + NAB_A_FP * self.fp
+        null = NAB_A_FN * self.windows
+        perfect = NAB_A_TP * _scaled_sigmoid(-1.0) * self.windows
+        return {
+            "tp": self.tp, "fp": self.fp, "fn": self.fn, "tn": self.tn,
+            "accuracy": (self.tp + self.tn) / self.rows if self.rows else 0.0,
+            "precision": precision, "recall": recall, "f1": f1(precision, recall),
+            "pa_precision": pa_precision, "pa_recall": pa_recall, "pa_f1": f1(pa_precision, pa_recall),
+            "windows": self.windows,
+            "windows_detected": self.windows_detected,
+            "nab_raw": float(raw),
+            "nab_score": float(100.0 * (raw - null) / (perfect - null)) if perfect != null else 0.0,
+        }
+
+
+def iter_label_chunks(csv_path: Union[str, Path], chunksize: int) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    라벨 CSV → 청크별 (timestamp int64, anomaly bool). 청크 평가는 정렬된 파일 간 병합이므로
+    timestamp가 오름차순이 아니면 ValueError.
+    """
+    last = None
+    reader = pd.read_csv(csv_path, usecols=["timestamp", "label"], dtype=str, encoding="utf-8", chunksize=chunksize)
+    for chunk in reader:
+        ts = parse_timestamp_array(chunk["timestamp"])
+        if len(ts) and (np.any(np.diff(ts) < 0) or (last is not None and ts[0] < last)):
+            raise ValueError(f"청크 평가는 timestamp 순으로 정렬된 파일만 지원합니다: {csv_path}")
+        if len(ts):
+            last = ts[-1]
+        yield ts, chunk["label"].str.strip().to_numpy() == "anomaly"
+        release_chunk()
+
+
+class _MergeCursor:
+    """정렬된 예측 라벨 청크 스트림에서 timestamp가 bound 이하인 행을 꺼내는 커서 (남은 행은 다음 청크용으로 보관)"""
+
+    def __init__(self, chunks: Iterator[Tuple[np.ndarray, np.ndarray]]):
+        self.chunks = chunks
+        self.ts = np.array([], dtype="int64")
+        self.labels = np.array([], dtype=bool)
+        self.done = False
+
+    def take_until(self, bound: int) -> Tuple[np.ndarray, np.ndarray]:
+        while not self.done and (len(self.ts) == 0 or self.ts[-1] <= bound):
+            try:
+                ts, labels = next(self.chunks)
+            except StopIteration:
+                self.done = True
+                break
+            self.ts, self.labels = np.concatenate([self.ts, ts]), np.concatenate([self.labels, labels])
+        cut = int(np.searchsorted(self.ts, bound, side="right"))
+        taken = self.ts[:cut], self.labels[:cut]
+        self.ts, self.labels = self.ts[cut:], self.labels[cut:]
+        return taken
+
+
+def evaluate_streaming(
+    label_path: Union[str, Path],
+    pred_paths: List[Union[str, Path]] = (),
+    anomaly_sets: Optional[Dict[str, np.ndarray]] = None,
+    chunksize: int = 200_000,
+) -> pd.DataFrame:
+    """
+    정답 라벨을 청크 단위로 한 번 훑으면서 예측 라벨 CSV들(정렬 병합) / 이상 timestamp 집합을 함께 평가
+    → evaluate_many / evaluate_anomaly_sets와 같은 지표 DataFrame. 메모리는 파일 길이와 무관하게 청크 몇 개 분량.
+    """
+    anomaly_sets = {name: np.sort(np.asarray(ns, dtype="int64")) for name, ns in (anomaly_sets or {}).items()}
+    names = [Path(p).name for p in pred_paths] + list(anomaly_sets)
+    evaluators = {name: StreamingEvaluator() for name in names}
+    cursors = {Path(p).name: _MergeCursor(iter_label_chunks(p, chunksize)) for p in pred_paths}
+
+    for true_ts, true_labels in iter_label_chunks(label_path, chunksize):
+        if not len(true_ts):
+            continue
+        for name, cursor in cursors.items():
+            pred_ts, pred_labels = cursor.take_until(true_ts[-1])
+            _, y_pred = align_by_timestamp(true_ts, true_labels, pred_ts, pred_labels)
+            evaluators[name].update(true_labels, y_pred)
+        for name, anomaly_ns in anomaly_sets.items():
+            evaluators[name].update(true_labels, np.isin(true_ts, anomaly_ns))
+    return pd.DataFrame([{"file": name, **evaluators[name].result()} for name in names])
+
+
+def evaluate_many(
+    label_path: Union[str, Path],
+    pred_paths: List[Union[str, Path]],
+    chunksize: Optional[int] = None,
+    cache_root: Optional[Union[str, Path]] = None,
+) -> pd.DataFrame:
+    """
+    정답 라벨 파일 하나를 한 번만 읽고, 여러 예측 파일(_v1_N.csv 등)을 한 번에 평가.
+    반환: 예측 파일별 지표 DataFrame
+    """
+    true_ts, true_labels = load_label_arrays(label_path, chunksize, cache_root)
+    rows = []
+    for pred_path in pred_paths:
+        pred_ts, pred_labels = load_label_arrays(pred_path, chunksize, cache_root)
+        y_true, y_pred = align_by_timestamp(true_ts, true_labels, pred_ts, pred_labels)
+        metrics = evaluate_arrays(y_true, y_pred)
+        rows.append({"file": Path(pred_path).name, **metrics})
+    return pd.DataFrame(rows)
+
+
+def evaluate_anomaly_sets(
+    label_path: Union[str, Path],
+    anomaly_sets: Dict[str, np.ndarray],
+    chunksize: Optional[int] = None,
+    cache_root: Optional[Union[str, Path]] = None,
+) -> pd.DataFrame:
+    """
+    정답 라벨 파일 하나 + 예측별 이상 timestamp 집합(int64 ns, utils.runstore) → 예측별 지표 DataFrame.
+    예측 쪽은 라벨 CSV 없이 이상 timestamp만 읽으므로 I/O가 이상 개수에 비례한다.
+    """
+    true_ts, true_labels = load_label_arrays(label_path, chunksize, cache_root)
+    order = np.argsort(true_ts, kind="stable")
+    true_ts, true_labels = true_ts[order], true_labels[order]
+    rows = []
+    for name, anomaly_ns in anomaly_sets.items():
+        y_pred = np.isin(true_ts, anomaly_ns)
+        rows.append({"file": name, **evaluate_arrays(true_labels, y_pred)})
+    return pd.DataFrame(rows)
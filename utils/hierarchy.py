@@ -0,0 +1,208 @@
+#utils/hierarchy.py
+import math
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from models.backend import ModelBackend
+from utils.predict import PredictOptions, WindowPrompt, llm_options_for, predict_from_prompt
+from utils.prompt import build_messages, build_prompt, split_template
+from utils.serialize import serialize_df
+from utils.telemetry import StageTimer, Telemetry
+from utils.timestamps import datetimes_to_ns, frame_timestamps_ns
+from utils.windowing import fixed_windows
+
+# coarse-to-fine 탐지: 긴 구간을 bucket 요약(min/max/mean, mean = PAA)으로 먼저 보여주고
+# 모델이 표시한 bucket 주변만 다음 단계에서 확대, 구간이 윈도우 크기 이하가 되면 원래 해상도로 예측한다.
+OVERVIEW_STATS = ("min", "max", "mean")
+OVERVIEW_NOTE = (
+    "Overview: each row summarizes {bucket_rows} consecutive points starting at its timestamp "
+    "({columns}). Output the timestamps of the rows whose span may contain an anomaly.\n"
+)
+
+
+@dataclass
+class HierarchyOptions:
+    """coarse-to-fine 탐지 설정"""
+    overview_buckets: int = 200   # overview 프롬프트 하나에 넣을 bucket 수
+    max_depth: int = 3            # overview 단계 최대 수 (넘으면 남은 구간은 원래 해상도 윈도우로)
+    pad_buckets: int = 1          # 표시된 bucket 양옆으로 같이 확대할 bucket 수 (경계에 걸친 이상 대비)
+
+
+@dataclass
+class HierarchyStats:
+    overview_calls: int = 0
+    failed_overviews: int = 0
+    flagged_buckets: int = 0
+    depth: int = 0
+    leaf_windows: int = 0
+
+    def summary(self, flat_windows: int) -> str:
+        total = self.overview_calls + self.leaf_windows
+        return (
+            f"🪜 계층 탐지: 깊이 {self.depth}, overview {self.overview_calls}회"
+            + (f" (실패 {self.failed_overviews})" if self.failed_overviews else "")
+            + f" + 상세 윈도우 {self.leaf_windows}회 = {total}회 호출"
+            + f" (flat {flat_windows}회 대비 {flat_windows - total}회 절약, 표시된 bucket {self.flagged_buckets}개)"
+        )
+
+
+def bucket_overview(
+    df: pd.DataFrame,
+    start: int,
+    end: int,
+    bucket_rows: int,
+    precision: Optional[int] = None,
+) -> Tuple[pd.DataFrame, np.ndarray]:
+    """
+    [start, end) 구간 → bucket별 요약 DataFrame + bucket 시작 행 위치.
+    값 컬럼마다 <col>_min/<col>_max/<col>_mean (NaN은 무시), timestamp는 bucket 첫 행.
+    """
+    bucket_starts = np.arange(start, end, bucket_rows)
+    offsets = bucket_starts - start
+    overview = {"timestamp": df["timestamp"].iloc[bucket_starts].astype(str).to_numpy()}
+    for col in df.columns:
+        if col == "timestamp" or not pd.api.types.is_numeric_dtype(df[col]):
+            continue
+        values = df[col].to_numpy(dtype="float64")[start:end]
+        valid = ~np.isnan(values)
+        counts = np.add.reduceat(valid.astype("int64"), offsets)
+        sums = np.add.reduceat(np.where(valid, values, 0.0), offsets)
+        stats = {
+            "min": np.fmin.reduceat(values, offsets),
+            "max": np.fmax.reduceat(values, offsets),
+            "mean": np.divide(sums, counts, out=np.full(len(offsets), np.nan), where=counts > 0),
+        }
+        for name in OVERVIEW_STATS:
+            overview[f"{col}_{name}"] = np.round(stats[name], 3 if precision is None else precision)
+    return pd.DataFrame(overview), bucket_starts
+
+
+def overview_prompt(
+    overview: pd.DataFrame,
+    bucket_rows: int,
+    prompt_template: str,
+    scenario: str,
+    options: PredictOptions,
+) -> WindowPrompt:
+    """bucket 요약 → 프롬프트 (기존 템플릿/시나리오 그대로, 데이터 앞에 요약 설명 한 줄)"""
+    columns = "/".join(col for col in overview.columns if col != "timestamp")
+    text_block = OVERVIEW_NOTE.format(bucket_rows=bucket_rows, columns=columns) + serialize_df(overview, options.data_format)
+    prompt = build_prompt(prompt_template, scenario, text_block)
+    messages = build_messages(prompt_template, scenario, text_block) if options.prompt_layout == "chat" else None
+    return WindowPrompt(prompt, messages, split_template(prompt_template, scenario)[0])
+
+
+def tile_windows(start: int, end: int, window_rows: int, overlap: float) -> List[Tuple[int, int]]:
+    """[start, end)를 원래 해상도 윈도우로 나눔 (windowing.fixed_windows와 같은 크기/stride, 끝은 end에서 자름)"""
+    windows = []
+    for s, e in fixed_windows(end - start, window_rows, overlap):
+        windows.append((start + s, min(start + e, end)))
+        if start + e >= end:
+            break
+    return windows
+
+
+def flagged_spans(bucket_starts: np.ndarray, end: int, flagged: np.ndarray, pad: int) -> List[Tuple[int, int]]:
+    """표시된 bucket 번호 → 양옆 pad개를 붙여 합친 행 구간 목록"""
+    spans = []
+    for i in np.unique(flagged):
+        s = bucket_starts[max(i - pad, 0)]
+        e = bucket_starts[i + pad + 1] if i + pad + 1 < len(bucket_starts) else end
+        if spans and s <= spans[-1][1]:
+            spans[-1] = (spans[-1][0], max(spans[-1][1], e))
+        else:
+            spans.append((int(s), int(e)))
+    return spans
+
+
+def coarse_to_fine_windows(
+    df: pd.DataFrame,
+    prompt_template: str,
+    scenario: str,
+    options: PredictOptions,
+    hierarchy: HierarchyOptions,
+    window_rows: int,
+    client: Optional[ModelBackend] = None,
+    telemetry: Optional[Telemetry] = None,
+    file_key: str = "",
+) -> Tuple[List[Tuple[int, int]], HierarchyStats]:
+    """
+    overview 단계를 반복해서 원래 해상도로 예측할 윈도우만 골라냄 → (윈도우 목록, 통계).
+    - window_rows보다 긴 구간은 bucket overview 한 번으로 보고, 표시된 bucket 주변만 다음 단계로
+    - 같은 단계의 overview는 options.concurrency개씩 동시에 호출
+    - overview가 실패하거나 구간 전체가 표시되면 그 구간은 flat 윈도우로 (놓치는 구간이 없도록)
+    모델이 아무 bucket도 표시하지 않은 구간은 이상 없음으로 간주한다.
+    """
+    row_ns = frame_timestamps_ns(df)
+    stats = HierarchyStats()
+    leaves: List[Tuple[int, int]] = []
+
+    def zoom(span: Tuple[int, int], depth: int):
+        """overview 한 번 → (다음 단계 구간, 바로 예측할 윈도우, 표시된 bucket 수, 실패 여부)"""
+        start, end = span
+        bucket_rows = max(math.ceil((end - start) / hierarchy.overview_buckets), 2)
+        overview, bucket_starts = bucket_overview(df, start, end, bucket_rows, options.precision)
+        timer = StageTimer()
+        timer.timings.update(level=depth, bucket_rows=bucket_rows)
+        error = None
+        try:
+            predicted = predict_from_prompt(
+                overview,
+                overview_prompt(overview, bucket_rows, prompt_template, scenario, options),
+                options.model_name,
+                options.temperature,
+                client,
+                None,
+                llm_options_for(options),
+                timer.timings,
+                options.output_format,
+            )
+        except Exception as e:
+            error = str(e)
+            print(f"⚠️ overview {start}~{end} 실패 — 원래 해상도로 처리: {e}")
+            return [], tile_windows(start, end, window_rows, options.overlap), 0, True
+        finally:
+            if telemetry is not None:
+                telemetry.record_window(file_key, start, end, options.model_name, timer.timings, error)
+
+        # 응답 timestamp → 그 시각을 포함하는 bucket (구간 밖은 무시)
+        query = datetimes_to_ns(predicted)
+        query = query[(query >= row_ns[start]) & (query <= row_ns[end - 1])]
+        flagged = np.searchsorted(row_ns[bucket_starts], query, side="right") - 1
+        children = flagged_spans(bucket_starts, end, flagged, hierarchy.pad_buckets)
+        print(f"🪜 [단계 {depth}] {start}~{end} ({bucket_rows}행/bucket) → bucket {len(np.unique(flagged))}개 표시")
+        if children == [(start, end)]:
+            return [], tile_windows(start, end, window_rows, options.overlap), len(np.unique(flagged)), False
+        return children, [], len(np.unique(flagged)), False
+
+    spans = [(0, len(df))]
+    depth = 0
+    while spans:
+        coarse = []
+        for start, end in spans:
+            if end - start <= window_rows:
+                leaves.append((start, end))
+            elif depth >= hierarchy.max_depth:
+                leaves.extend(tile_windows(start, end, window_rows, options.overlap))
+            else:
+                coarse.append((start, end))
+        if not coarse:
+            break
+        depth += 1
+        with ThreadPoolExecutor(max_workers=max(options.concurrency, 1)) as executor:
+            results = list(executor.map(lambda span: zoom(span, depth), coarse))
+        spans = []
+        for children, windows, flagged, failed in results:
+            spans.extend(children)
+            leaves.extend(windows)
+            stats.flagged_buckets += flagged
+            stats.failed_overviews += int(failed)
+        stats.overview_calls += len(coarse)
+        stats.depth = depth
+
+    stats.leaf_windows = len(leaves)
+    return sorted(leaves), stats
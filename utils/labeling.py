@@ -1,14 +1,24 @@
-import os
-from typing import List, Tuple
-
+#utils/labeling.py
+import csv
+import io
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice, zip_longest
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from utils.chunked import release_chunk
+from utils.dataset import load_timestamps
+from utils.timestamps import parse_timestamp_array
+
+# 라벨 CSV 줄 끝 — 예전 csv.DictWriter 출력(기본 \r\n)과 같은 바이트를 유지
+LINE_TERMINATOR = "\r\n"
 
-import csv
-from pathlib import Path
-from typing import List, Dict, Union
-from datetime import datetime
 
 def compare_label_accuracy(csv_path1: str, csv_path2: str) -> Union[float, None]:
     """
@@ -18,63 +28,181 @@ def compare_label_accuracy(csv_path1: str, csv_path2: str) -> Union[float, None]
     :param csv_path2: 두 번째 CSV 경로
     :return: 0~1 사이 float (일치 비율), 행 개수가 다르면 None 반환
     """
+    # 두 파일을 한 줄씩 나란히 읽음 (행 dict 목록을 만들지 않으므로 메모리는 파일 크기와 무관)
+    missing = object()
+    match_count = total_count = 0
     with open(csv_path1, encoding="utf-8") as f1, open(csv_path2, encoding="utf-8") as f2:
-        reader1 = list(csv.DictReader(f1))
-        reader2 = list(csv.DictReader(f2))
+        for row1, row2 in zip_longest(csv.DictReader(f1), csv.DictReader(f2), fillvalue=missing):
+            if row1 is missing or row2 is missing:
+                print("행 개수가 다릅니다.")
+                return None
+            total_count += 1
+            if row1.get("label") == row2.get("label"):
+                match_count += 1
 
-    if len(reader1) != len(reader2):
-        print("행 개수가 다릅니다.")
+    if total_count == 0:
         return None
+    accuracy = match_count / total_count
+    return accuracy
 
-    match_count = 0
-    total_count = len(reader1)
+def build_interval_index(abnormal_ranges: List[List[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    이상 구간 목록 → 시작 시각 기준으로 정렬/병합된 (starts, ends) int64 배열.
+    겹치는 구간은 병합해서 searchsorted 한 번으로 소속 여부를 판단할 수 있게 한다.
+    """
+    if not abnormal_ranges:
+        empty = np.array([], dtype="int64")
+        return empty, empty
+    starts = parse_timestamp_array([start for start, _ in abnormal_ranges])
+    ends = parse_timestamp_array([end for _, end in abnormal_ranges])
+    order = np.argsort(starts, kind="stable")
+    starts, ends = starts[order], ends[order]
 
-    for row1, row2 in zip(reader1, reader2):
-        if row1.get("label") == row2.get("label"):
-            match_count += 1
+    merged_starts, merged_ends = [starts[0]], [ends[0]]
+    for start, end in zip(starts[1:], ends[1:]):
+        if start <= merged_ends[-1]:
+            merged_ends[-1] = max(merged_ends[-1], end)
+        else:
+            merged_starts.append(start)
+            merged_ends.append(end)
+    return np.array(merged_starts, dtype="int64"), np.array(merged_ends, dtype="int64")
 
-    accuracy = match_count / total_count
-    return accuracy
 
-def simple_mark_anormal_flexible(input_csv: str, output_csv: str, abnormal_ranges: List[List[str]]):
-    def parse_timestamp(ts: str) -> datetime:
-        try:
-            return datetime.fromisoformat(ts)
-        except ValueError:
-            # iso 포맷 아닌 경우 fallback
-            formats = ["%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S"]
-            for fmt in formats:
-                try:
-                    return datetime.strptime(ts, fmt)
-                except ValueError:
-                    continue
-            raise ValueError(f"지원하지 않는 timestamp 포맷: {ts}")
-
-    abnormal_periods = [
-        (parse_timestamp(start), parse_timestamp(end))
-        for start, end in abnormal_ranges
-    ]
-
-    with open(input_csv, encoding="utf-8") as f:
-        reader = list(csv.DictReader(f))
-
-    for row in reader:
-        ts = parse_timestamp(row["timestamp"])
-        row["label"] = "normal"
-        for start, end in abnormal_periods:
-            if start <= ts <= end:
-                row["label"] = "anomaly"
-                break
+def mark_in_intervals(timestamps: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """각 timestamp가 [start, end] 구간 안에 있는지 bool 배열로 반환 — O(rows × log windows)"""
+    if len(starts) == 0:
+        return np.zeros(len(timestamps), dtype=bool)
+    idx = np.searchsorted(starts, timestamps, side="right") - 1
+    inside = idx >= 0
+    inside[inside] = timestamps[inside] <= ends[idx[inside]]
+    return inside
+
+
+def write_labeled_csv(input_csv: Union[str, Path], output_csv: Union[str, Path], anomaly_mask: np.ndarray):
+    """
+    원본 CSV 각 줄 끝에 label(anomaly/normal)만 덧붙여 저장 — 원본 값 문자열을 다시 파싱/포맷하지 않는다.
+    anomaly_mask는 원본 행 순서의 bool 배열. 줄 수가 맞지 않으면(따옴표 안 줄바꿈 등) pandas로 대체.
+    """
+    with open(input_csv, encoding="utf-8", newline="") as f:
+        lines = [line.rstrip("\r\n") for line in f if line.strip()]
+    if len(lines) == len(anomaly_mask) + 1:
+        labels = np.where(anomaly_mask, ",anomaly", ",normal")
+        body = [line + label for line, label in zip(lines[1:], labels)]
+        with open(output_csv, "w", encoding="utf-8", newline="") as f:
+            f.write(LINE_TERMINATOR.join([lines[0] + ",label"] + body) + LINE_TERMINATOR)
+        return
+
+    df = pd.read_csv(input_csv, dtype=str, keep_default_na=False, encoding="utf-8")
+    df["label"] = np.where(anomaly_mask, "anomaly", "normal")
+    df.to_csv(output_csv, index=False, encoding="utf-8", lineterminator=LINE_TERMINATOR)
 
-    fieldnames = reader[0].keys()
 
-    with open(output_csv, "w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(reader)
+def write_labeled_csv_chunked(
+    input_csv: Union[str, Path],
+    output_csv: Union[str, Path],
+    label_rows: Callable[[np.ndarray], np.ndarray],
+    chunk_rows: int,
+):
+    """
+    write_labeled_csv의 청크 버전: 원본 줄을 chunk_rows줄씩 읽어 timestamp(int64 ns)만 파싱하고,
+    label_rows(timestamps) → bool 마스크로 label을 덧붙여 바로 기록한다 (메모리는 청크 하나 분량).
+    따옴표 안 줄바꿈처럼 줄 수와 행 수가 맞지 않는 CSV는 ValueError.
+    """
+    with open(input_csv, encoding="utf-8", newline="") as src, open(output_csv, "w", encoding="utf-8", newline="") as dst:
+        header = src.readline().rstrip("\r\n")
+        dst.write(header + ",label" + LINE_TERMINATOR)
+        lines = (line.rstrip("\r\n") for line in src if line.strip())
+        while True:
+            block = list(islice(lines, max(chunk_rows, 1)))
+            if not block:
+                break
+            frame = pd.read_csv(io.StringIO("\n".join([header] + block)), usecols=["timestamp"], dtype=str)
+            if len(frame) != len(block):
+                raise ValueError(f"줄 수와 행 수가 다른 CSV는 청크 처리할 수 없습니다: {input_csv}")
+            labels = np.where(label_rows(parse_timestamp_array(frame["timestamp"])), ",anomaly", ",normal")
+            dst.write("".join(line + label + LINE_TERMINATOR for line, label in zip(block, labels)))
+            release_chunk()
 
+
+def simple_mark_anormal_flexible(
+    input_csv: str,
+    output_csv: str,
+    abnormal_ranges: List[List[str]],
+    cache_root: Optional[Union[str, Path]] = None,
+    chunk_rows: Optional[int] = None,
+):
+    """
+    원본 CSV에 label 컬럼(anomaly/normal)을 붙여 저장.
+    timestamp는 int64 배열로 일괄 파싱하고(cache_root가 있으면 utils.dataset 캐시 사용),
+    구간 소속 여부는 정렬된 구간에 대한 searchsorted로 계산한다. 원본 값 문자열은 그대로 유지한다.
+    chunk_rows가 있으면 캐시 없이 청크 단위로 읽고 쓴다 (write_labeled_csv_chunked).
+    """
+    starts, ends = build_interval_index(abnormal_ranges)
+    if chunk_rows:
+        write_labeled_csv_chunked(input_csv, output_csv, lambda ts: mark_in_intervals(ts, starts, ends), chunk_rows)
+    else:
+        inside = mark_in_intervals(load_timestamps(input_csv, cache_root), starts, ends)
+        write_labeled_csv(input_csv, output_csv, inside)
     print(f"{output_csv} 저장 완료.")
 
+
+def _label_job(
+    job: Tuple[str, str, List[List[str]]],
+    cache_root: Optional[Union[str, Path]] = None,
+    chunk_rows: Optional[int] = None,
+) -> Tuple[str, Optional[str]]:
+    """프로세스 풀 작업 단위: (입력 CSV, 출력 CSV, 이상 구간) → (출력 경로, 오류 메시지)"""
+    input_csv, output_csv, abnormal_ranges = job
+    try:
+        Path(output_csv).parent.mkdir(parents=True, exist_ok=True)
+        simple_mark_anormal_flexible(input_csv, output_csv, abnormal_ranges, cache_root, chunk_rows)
+        return output_csv, None
+    except Exception as e:
+        return output_csv, str(e)
+
+
+def build_label_jobs(
+    base_path: Union[str, Path],
+    label_data: Dict[str, List[List[str]]],
+    label_subdir: Optional[str] = "label",
+    folder: Optional[str] = None,
+) -> List[Tuple[str, str, List[List[str]]]]:
+    """
+    combined_windows.json 항목 → 라벨링 작업 목록.
+    label_subdir가 있으면 <folder>/<label_subdir>/<stem>_label.csv, 없으면 원본 옆에 <stem>_label.csv.
+    folder가 주어지면 해당 폴더 항목만 포함.
+    """
+    base_path = Path(base_path)
+    jobs = []
+    for relative_key, abnormal_ranges in label_data.items():
+        full_path = base_path / relative_key
+        if folder is not None and Path(relative_key).parts[0] != folder:
+            continue
+        if not full_path.exists():
+            print(f"⚠️ 데이터 파일 없음: {full_path}")
+            continue
+        out_dir = full_path.parent / label_subdir if label_subdir else full_path.parent
+        output_path = out_dir / f"{full_path.stem}_label.csv"
+        jobs.append((str(full_path), str(output_path), abnormal_ranges))
+    return jobs
+
+
+def label_corpus(
+    jobs: List[Tuple[str, str, List[List[str]]]],
+    workers: Optional[int] = None,
+    cache_root: Optional[Union[str, Path]] = None,
+    chunk_rows: Optional[int] = None,
+) -> int:
+    """라벨링 작업들을 프로세스 풀에서 병렬 처리. 성공한 파일 수 반환 (cache_root/chunk_rows는 simple_mark_anormal_flexible 참고)."""
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for output_csv, error in executor.map(partial(_label_job, cache_root=cache_root, chunk_rows=chunk_rows), jobs):
+            if error:
+                print(f"❌ 라벨링 실패: {output_csv} - {error}")
+            else:
+                done += 1
+    return done
+
 def load_json_file(file_path: Union[str, Path]) -> Any:
     """
     주어진 JSON 파일 경로를 받아 내용을 반환합니다.
@@ -111,8 +239,7 @@ def lstrip_one_space(s: str) -> str:
 # 사용 예시:
 if __name__ == "__main__":
     base_path = Path("/Users/seongha/Documents/ollama_anomaly/NAB/data")
-    file_structure = get_all_files_with_dirs(str(base_path))
-    
+
     label_json_path = Path("/Users/seongha/Documents/ollama_anomaly/NAB/labels/combined_windows.json")
     label_data = load_json_file(label_json_path)
 
@@ -125,29 +252,8 @@ if __name__ == "__main__":
 
     # 비교하는 함수.
     # print(compare_label_accuracy(a, b) * 100)
-    for folder_path, file_list in file_structure:
-        for file_name in file_list:
-            if file_name == "README.md":
-                continue
-
-            full_path = Path(folder_path) / file_name  # ✅ 수정됨: Path 객체로 통합
-
-            try:
-                relative_path = full_path.relative_to(DELETE_PATH)  # ✅ 수정됨: 안전한 상대 경로 추출
-            except ValueError:
-                print(f"⚠️ 경고: 기준 경로 밖 파일 무시 → {full_path}")
-                continue
-
-            relative_key = str(relative_path)  # 예: 'realTweets/Twitter_volume_AAPL.csv'
-
-            if relative_key not in label_data:
-                print(f"❌ 레이블 정보 없음: {relative_key}")
-                continue
-
-            output_path = full_path.with_name(full_path.stem + "_label.csv")  # ✅ 수정됨: _label.csv 저장 경로
 
-            simple_mark_anormal_flexible(
-                str(full_path),
-                str(output_path),
-                label_data[relative_key]
-            )
\ No newline at end of file
+    # 전체 코퍼스 라벨링 (원본 CSV 옆에 _label.csv 저장, 프로세스 풀 병렬 처리)
+    jobs = build_label_jobs(base_path, label_data, label_subdir=None)
+    done = label_corpus(jobs)
+    print(f"✅ 라벨링 완료: {done}/{len(jobs)}개 파일")
@@ -0,0 +1,377 @@
+#utils/live.py
+import json
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, TextIO, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from models.backend import ModelBackend
+from utils.predict import PredictOptions, predict_window
+from utils.prefilter import screen_windows
+from utils.telemetry import Telemetry
+from utils.timestamps import NS_PER_SEC, TimestampIndex, datetimes_to_ns, format_timestamp, parse_timestamp
+
+# LLM이 밀릴 때 새 윈도우 처리 방식
+#   coalesce : 대기 중인 윈도우를 가장 최신 것 하나로 합침 (밀린 중간 윈도우는 버리고 개수만 셈)
+#   drop     : 처리 중 슬롯이 없으면 새 윈도우를 바로 버림
+BACKPRESSURE_POLICIES = ("coalesce", "drop")
+
+# 리더 스레드 → 메인 루프 신호
+_BACKFILL_DONE = object()   # 기존 내용을 다 읽음 (이후 행부터 stride 계산)
+_EOF = object()             # 입력 스트림 종료
+# 그 밖에 큐에 들어온 Exception은 리더 스레드의 읽기 실패 (메인 루프가 LiveSourceError로 다시 발생)
+
+# 읽어 둔 줄 큐 상한 — 메인 루프가 느려도 메모리가 늘지 않고 리더가 대기한다
+LINE_QUEUE_SIZE = 10000
+
+
+class LiveSourceError(Exception):
+    """입력(tail 중인 파일/stdin) 읽기 실패 — 리더 스레드가 죽어 큐가 영원히 비는 일이 없도록 메인 루프로 전달"""
+
+
+class RingBuffer:
+    """최근 capacity개 점만 보관하는 고정 크기 버퍼 (timestamp int64 ns, 값 float64, 도착 시각)"""
+
+    def __init__(self, capacity: int, value_names: List[str]):
+        self.capacity = capacity
+        self.value_names = list(value_names)
+        self.timestamps = np.zeros(capacity, dtype="int64")
+        self.values = np.zeros((capacity, len(value_names)), dtype="float64")
+        self.arrivals = np.zeros(capacity, dtype="float64")
+        self.count = 0   # 지금까지 들어온 전체 점 수
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def append(self, timestamp_ns: int, values: List[float], arrival: float):
+        i = self.count % self.capacity
+        self.timestamps[i] = timestamp_ns
+        self.values[i] = values
+        self.arrivals[i] = arrival
+        self.count += 1
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """시간 순서로 정렬된 복사본 (timestamps, values, arrivals)"""
+        n = len(self)
+        order = (np.arange(self.count - n, self.count)) % self.capacity
+        return self.timestamps[order], self.values[order], self.arrivals[order]
+
+    def to_frame(self, timestamps: np.ndarray, values: np.ndarray) -> pd.DataFrame:
+        columns = {"timestamp": timestamps.view("datetime64[ns]")}
+        for i, name in enumerate(self.value_names):
+            columns[name] = values[:, i]
+        return pd.DataFrame(columns)
+
+
+def parse_line(line: str, header: Optional[List[str]]) -> Tuple[Optional[Tuple[str, List[float]]], Optional[List[str]]]:
+    """
+    CSV 줄("timestamp,value") 또는 NDJSON 줄({"timestamp": ..., "value": ...}) 하나 파싱.
+    반환: ((timestamp 문자열, 값 목록) 또는 None, 갱신된 header). 값이 header보다 적으면 ValueError.
+    """
+    line = line.strip()
+    if not line:
+        return None, header
+    if line.startswith("{"):
+        record = json.loads(line)
+        names = header or [key for key in record if key != "timestamp"]
+        if not names:
+            raise ValueError("값 필드가 없습니다")
+        return (str(record["timestamp"]), [float(record[name]) for name in names]), names
+    fields = [field.strip() for field in line.split(",")]
+    if fields[0] == "timestamp":
+        return None, fields[1:]
+    names = header or [f"value{i}" if i else "value" for i in range(len(fields) - 1)]
+    need = max(len(names), 1)
+    if len(fields) - 1 < need:
+        # 값이 빠진 줄 (덜 기록된 줄 등) — 링 버퍼 열 수와 맞지 않으므로 건너뛰게 함
+        raise ValueError(f"값 {need}개가 필요한데 {len(fields) - 1}개뿐입니다")
+    return (fields[0], [float(field) for field in fields[1:len(names) + 1]]), names
+
+
+def tail_file(path: Union[str, Path], lines: queue.Queue, stop: threading.Event, from_start: bool = False, poll_interval: float = 0.2):
+    """
+    늘어나는 파일을 tail -f처럼 읽어 줄 단위로 큐에 넣는다.
+    기존 내용은 링 버퍼를 채우는 용도로 먼저 넣고 _BACKFILL_DONE을 보낸다 (from_start면 기존 줄도 윈도우 대상).
+    파일이 잘리면(로테이션) 처음부터 다시 읽는다. 읽다가 실패하면(파일 삭제 등) 예외를 큐에 넣고 끝낸다.
+    """
+    try:
+        _tail_file(path, lines, stop, from_start, poll_interval)
+    except Exception as e:
+        lines.put(e)
+
+
+def _tail_file(path: Union[str, Path], lines: queue.Queue, stop: threading.Event, from_start: bool, poll_interval: float):
+    with open(path, encoding="utf-8") as f:
+        if from_start:
+            lines.put(_BACKFILL_DONE)
+        partial = ""
+        backfilling = not from_start
+        while not stop.is_set():
+            chunk = f.readline()
+            if chunk:
+                partial += chunk
+                if partial.endswith("\n"):
+                    lines.put(partial)
+                    partial = ""
+                continue
+            if backfilling:
+                lines.put(_BACKFILL_DONE)
+                backfilling = False
+            if Path(path).stat().st_size < f.tell():
+                f.seek(0)
+                partial = ""
+            time.sleep(poll_interval)
+
+
+def read_stream(stream: TextIO, lines: queue.Queue, stop: threading.Event):
+    """stdin 등 스트림을 끝까지 읽어 큐에 넣고 _EOF 전송 (읽기 실패면 예외를 대신 넣음)"""
+    lines.put(_BACKFILL_DONE)
+    try:
+        for line in stream:
+            if stop.is_set():
+                break
+            lines.put(line)
+    except Exception as e:
+        lines.put(e)
+        return
+    lines.put(_EOF)
+
+
+class JsonlEventSink:
+    """탐지 이벤트를 JSONL 파일에 한 줄씩 즉시 기록 (flush)"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, "a", encoding="utf-8")
+
+    def __call__(self, event: dict):
+        self.file.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self.file.flush()
+        print(f"🚨 이상 탐지: {event['timestamp']} (지연 {event['lag_sec']:.1f}s)")
+
+    def close(self):
+        self.file.close()
+
+
+class RecentSet:
+    """최근 capacity개만 기억하는 집합 (겹치는 윈도우에서 같은 이벤트를 다시 내보내지 않기 위함)"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.items: Dict[int, None] = {}
+
+    def add(self, item: int) -> bool:
+        """새 항목이면 True"""
+        if item in self.items:
+            return False
+        self.items[item] = None
+        if len(self.items) > self.capacity:
+            del self.items[next(iter(self.items))]
+        return True
+
+
+@dataclass
+class LiveStats:
+    rows: int = 0
+    windows_fired: int = 0
+    windows_done: int = 0
+    windows_failed: int = 0
+    windows_skipped: int = 0     # 사전 필터로 LLM 호출 없이 넘긴 윈도우
+    coalesced: int = 0           # 최신 윈도우로 합쳐져 버려진 대기 윈도우
+    dropped: int = 0             # 슬롯이 없어 바로 버린 윈도우
+    events: int = 0
+
+    def summary(self) -> str:
+        return " | ".join(f"{key} {value}" for key, value in asdict(self).items())
+
+
+@dataclass
+class LiveWindow:
+    timestamps: np.ndarray
+    values: np.ndarray
+    arrivals: np.ndarray
+    fired_at: float
+    end_row: int          # 발사 시점까지 들어온 전체 점 수 (텔레메트리 기록용 위치)
+
+
+class LiveDetector:
+    """
+    링 버퍼(최근 options.num_rows개 점)를 유지하면서 stride개 행마다 또는 interval초마다
+    윈도우 하나를 LLM으로 보내고, 결과 timestamp를 이벤트로 내보낸다.
+    동시에 처리 중인 윈도우는 options.concurrency개까지, 그 이상은 backpressure 정책으로 합치거나 버린다.
+    메모리: 링 버퍼 + 처리 중/대기 윈도우(최대 concurrency + 1개) + 최근 이벤트 집합 — 스트림 길이와 무관.
+    """
+
+    def __init__(
+        self,
+        prompt_template: str,
+        scenario: str,
+        options: PredictOptions,
+        client: Optional[ModelBackend],
+        emit: Callable[[dict], None],
+        stride: Optional[int] = None,
+        interval: Optional[float] = None,
+        backpressure: str = "coalesce",
+        telemetry: Optional[Telemetry] = None,
+    ):
+        self.prompt_template = prompt_template
+        self.scenario = scenario
+        self.options = options
+        self.client = client
+        self.emit = emit
+        self.stride = stride or max(options.num_rows // 2, 1)
+        self.interval = interval
+        self.backpressure = backpressure
+        self.telemetry = telemetry
+        self.stats = LiveStats()
+        self.buffer: Optional[RingBuffer] = None
+        self.header: Optional[List[str]] = None
+        self.pending: Optional[LiveWindow] = None
+        self.in_flight: Dict[Future, LiveWindow] = {}
+        self.seen = RecentSet(options.num_rows * 4)
+        self.executor = ThreadPoolExecutor(max_workers=max(options.concurrency, 1))
+        # 투표 모드: 윈도우마다 샘플 요청 여러 개 — 동시 요청 수도 concurrency개로 제한
+        self.request_slots = threading.BoundedSemaphore(max(options.concurrency, 1))
+
+    def _append(self, line: str) -> bool:
+        """줄 하나를 링 버퍼에 추가 (파싱 실패/헤더 줄이면 False)"""
+        try:
+            record, self.header = parse_line(line, self.header)
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"⚠️ 입력 줄 파싱 실패: {line.strip()[:80]} ({e})")
+            return False
+        if record is None:
+            return False
+        timestamp, values = record
+        if self.buffer is None:
+            self.buffer = RingBuffer(self.options.num_rows, self.header)
+        try:
+            timestamp_ns = int(datetimes_to_ns([parse_timestamp(timestamp)])[0])
+        except ValueError:
+            print(f"⚠️ timestamp 파싱 실패: {timestamp}")
+            return False
+        self.buffer.append(timestamp_ns, values, time.time())
+        self.stats.rows += 1
+        return True
+
+    def _fire(self):
+        """현재 링 버퍼로 윈도우 생성 → 빈 슬롯이 있으면 바로 제출, 없으면 backpressure 정책 적용"""
+        timestamps, values, arrivals = self.buffer.snapshot()
+        window = LiveWindow(timestamps, values, arrivals, time.time(), self.buffer.count)
+        self.stats.windows_fired += 1
+        if len(self.in_flight) < self.options.concurrency:
+            self._submit(window)
+        elif self.backpressure == "coalesce":
+            if self.pending is not None:
+                self.stats.coalesced += 1
+            self.pending = window
+        else:
+            self.stats.dropped += 1
+
+    def _submit(self, window: LiveWindow):
+        df = self.buffer.to_frame(window.timestamps, window.values)
+        if self.options.prefilter:
+            send, _ = screen_windows(df, [(0, len(df))], self.options.prefilter, self.scenario, self.options.prefilter_threshold)
+            if not send:
+                self.stats.windows_skipped += 1
+                return
+        future = self.executor.submit(self._predict, df, window.end_row)
+        self.in_flight[future] = window
+
+    def _predict(self, df: pd.DataFrame, end_row: int) -> List[datetime]:
+        timings = {}
+        error = None
+        try:
+            return predict_window(
+                df, self.prompt_template, self.scenario, self.options, self.client, timings, lambda: self.request_slots
+            )
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            if self.telemetry is not None:
+                self.telemetry.record_window("live", end_row - len(df), end_row, self.options.model_name, timings, error)
+
+    def _collect(self, futures):
+        """끝난 윈도우 결과를 행 timestamp에 맞춰 이벤트로 내보냄"""
+        for future in futures:
+            window = self.in_flight.pop(future)
+            try:
+                predicted = future.result()
+            except Exception as e:
+                self.stats.windows_failed += 1
+                print(f"⚠️ 윈도우 예측 실패: {e}")
+                continue
+            self.stats.windows_done += 1
+            rows = TimestampIndex(window.timestamps).snap(
+                datetimes_to_ns(predicted), int(self.options.snap_tolerance * NS_PER_SEC)
+            )
+            now = time.time()
+            for row in sorted(set(rows[rows >= 0].tolist())):
+                timestamp_ns = int(window.timestamps[row])
+                if not self.seen.add(timestamp_ns):
+                    continue
+                self.stats.events += 1
+                self.emit({
+                    "type": "anomaly",
+                    "timestamp": format_timestamp(pd.Timestamp(timestamp_ns).to_pydatetime()),
+                    "values": dict(zip(self.buffer.value_names, window.values[row].tolist())),
+                    "window_start": format_timestamp(pd.Timestamp(int(window.timestamps[0])).to_pydatetime()),
+                    "window_end": format_timestamp(pd.Timestamp(int(window.timestamps[-1])).to_pydatetime()),
+                    "detected_at": datetime.now().isoformat(timespec="seconds"),
+                    "lag_sec": round(now - float(window.arrivals[row]), 3),
+                })
+
+    def _poll(self, timeout: float = 0.0):
+        if self.in_flight:
+            done, _ = wait(list(self.in_flight), timeout=timeout, return_when=FIRST_COMPLETED)
+            self._collect(done)
+        if self.pending is not None and len(self.in_flight) < self.options.concurrency:
+            window, self.pending = self.pending, None
+            self._submit(window)
+
+    def run(self, lines: queue.Queue, stop: threading.Event):
+        """
+        큐의 줄을 소비하며 윈도우를 발사. _EOF를 받거나 stop이 설정되면 남은 윈도우를 마무리하고 종료.
+        리더 스레드가 실패를 보내면 LiveSourceError.
+        """
+        live = False
+        since_fire = 0
+        last_fire = time.time()
+        try:
+            while not stop.is_set():
+                try:
+                    item = lines.get(timeout=0.1)
+                except queue.Empty:
+                    item = None
+                if item is _EOF:
+                    break
+                if isinstance(item, Exception):
+                    raise LiveSourceError(f"입력 읽기 실패: {item}") from item
+                if item is _BACKFILL_DONE:
+                    live = True
+                elif item is not None and self._append(item) and live:
+                    since_fire += 1
+
+                now = time.time()
+                timer_due = self.interval is not None and now - last_fire >= self.interval
+                if since_fire and (since_fire >= self.stride or timer_due):
+                    self._fire()
+                    since_fire, last_fire = 0, now
+                self._poll()
+
+            # 마무리: 남은 행으로 마지막 윈도우 발사 후 처리 중/대기 윈도우 완료 대기
+            if since_fire and not stop.is_set():
+                self._fire()
+            while self.in_flight or self.pending is not None:
+                self._poll(timeout=1.0)
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
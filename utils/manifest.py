@@ -0,0 +1,86 @@
+#utils/manifest.py
+import fcntl
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+from utils.timestamps import format_timestamp, parse_timestamp
+
+
+def append_jsonl(path: Union[str, Path], record: dict, fsync: bool = True):
+    """JSONL 파일에 레코드 한 줄 추가 — 여러 프로세스가 동시에 써도 줄이 섞이지 않도록 flock으로 잠근다"""
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    with open(path, "a", encoding="utf-8") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.write(line)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class RunManifest:
+    """
+    배치 실행 진행 상황을 기록하는 append-only JSONL 파일.
+    레코드 종류:
+      {"type": "config", "options": {...}}
+      {"type": "window", "file": "<folder>/<file>", "start": 0, "end": 1000, "timestamps": [...]}
+      {"type": "file", "file": "<folder>/<file>", "status": "done" | "failed", ...}
+    여러 프로세스가 동시에 append해도 되도록 레코드마다 flock으로 잠그고 한 번에 기록한다.
+    중단된 실행은 같은 manifest로 다시 실행하면 끝난 파일/윈도우를 건너뛴다.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def append(self, record: dict):
+        append_jsonl(self.path, record)
+
+    def record_config(self, options: dict):
+        self.append({"type": "config", "options": options})
+
+    def record_window(self, file_key: str, start: int, end: int, timestamps: List[datetime]):
+        self.append({
+            "type": "window",
+            "file": file_key,
+            "start": start,
+            "end": end,
+            "timestamps": [format_timestamp(ts) for ts in timestamps],
+        })
+
+    def record_file(self, file_key: str, status: str, **extra):
+        self.append({"type": "file", "file": file_key, "status": status, **extra})
+
+    def load(self) -> Tuple[dict, Dict[str, dict], Dict[str, Dict[int, List[datetime]]]]:
+        """
+        manifest 읽기 → (config, 완료된 파일 {file: record}, 완료된 윈도우 {file: {start: timestamps}}).
+        크래시로 마지막 줄이 잘린 경우 그 줄은 무시한다.
+        """
+        config, done_files, done_windows = {}, {}, {}
+        if not self.path.exists():
+            return config, done_files, done_windows
+
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                kind = record.get("type")
+                if kind == "config":
+                    config = record["options"]
+                elif kind == "window":
+                    done_windows.setdefault(record["file"], {})[record["start"]] = [
+                        parse_timestamp(ts) for ts in record["timestamps"]
+                    ]
+                elif kind == "file":
+                    if record["status"] == "done":
+                        done_files[record["file"]] = record
+                    else:
+                        done_files.pop(record["file"], None)
+        return config, done_files, done_windows
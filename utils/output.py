@@ -0,0 +1,108 @@
+#utils/output.py
+import json
+import math
+import re
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from utils.timestamps import TimestampIndex, datetimes_to_ns
+
+# 모델 출력 형식
+#   text : 한 줄에 timestamp 하나 (자유 텍스트, 정규식으로 추출)
+#   json : Ollama format(JSON schema)으로 출력 구조를 강제 + 윈도우 크기 기반 num_predict 상한
+OUTPUT_FORMATS = ("text", "json")
+TIMESTAMP_REGEX = r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$"
+
+ANOMALY_ITEM_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "timestamp": {"type": "string", "pattern": TIMESTAMP_REGEX},
+        "score": {"type": "number"},
+    },
+    "required": ["timestamp"],
+}
+# 윈도우 예측용: {"anomalies": [{"timestamp": "...", "score": 0.9}, ...]}
+ANOMALY_SCHEMA = {
+    "type": "object",
+    "properties": {"anomalies": {"type": "array", "items": ANOMALY_ITEM_SCHEMA}},
+    "required": ["anomalies"],
+}
+# 정상/비정상 판정용 (main2.py, serve 모드 check 작업)
+VERDICT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "result": {"type": "string", "enum": ["normal", "abnormal"]},
+        "anomalies": {"type": "array", "items": ANOMALY_ITEM_SCHEMA},
+    },
+    "required": ["result"],
+}
+
+# num_predict 상한 계산: 항목 하나 ≈ {"timestamp": "2014-04-01 00:35:00", "score": 0.93} 약 24 토큰
+JSON_BASE_TOKENS = 32
+JSON_TOKENS_PER_ITEM = 24
+# 윈도우 행 중 이 비율까지만 이상으로 보고할 수 있게 상한을 잡는다 (최소 JSON_MIN_ITEMS개)
+JSON_MAX_ANOMALY_FRACTION = 0.1
+JSON_MIN_ITEMS = 8
+
+
+def json_num_predict(rows: int) -> int:
+    """윈도우 행 수 → JSON 출력 num_predict 상한"""
+    items = max(math.ceil(rows * JSON_MAX_ANOMALY_FRACTION), JSON_MIN_ITEMS)
+    return JSON_BASE_TOKENS + JSON_TOKENS_PER_ITEM * items
+
+
+def _load_json(text: str) -> Optional[dict]:
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def parse_anomaly_json(text: str) -> Tuple[List[datetime], bool]:
+    """
+    ANOMALY_SCHEMA 응답 → (timestamp 목록, JSON으로 파싱됐는지).
+    num_predict 상한에 걸려 JSON이 잘린 경우에는 지금까지 나온 timestamp를 정규식으로 살린다.
+    """
+    data = _load_json(text)
+    if data is None:
+        found = re.findall(TIMESTAMP_REGEX[1:-1], text)
+        return [datetime.strptime(ts, "%Y-%m-%d %H:%M:%S") for ts in found], False
+
+    timestamps = []
+    for item in data.get("anomalies") or []:
+        value = item.get("timestamp") if isinstance(item, dict) else item
+        try:
+            timestamps.append(datetime.strptime(str(value).strip(), "%Y-%m-%d %H:%M:%S"))
+        except ValueError:
+            continue
+    return timestamps, True
+
+
+def parse_verdict_json(text: str) -> str:
+    """
+    VERDICT_SCHEMA 응답 → "Normal" / "Abnormal".
+    result가 schema의 첫 필드라 anomalies 목록에서 잘린 응답도 정규식으로 판정을 살린다 (그래도 없으면 "Unknown").
+    """
+    data = _load_json(text)
+    if data is not None:
+        result = str(data.get("result", "")).lower()
+    else:
+        match = re.search(r'"result"\s*:\s*"(normal|abnormal)"', text.lower())
+        result = match.group(1) if match else ""
+    return result.capitalize() if result in ("normal", "abnormal") else "Unknown"
+
+
+def validate_in_window(
+    timestamps: List[datetime],
+    row_ns: np.ndarray,
+    tolerance_ns: int = 0,
+) -> Tuple[List[datetime], int]:
+    """윈도우 행 timestamp(int64 ns)에 tolerance 이내로 맞는 것만 남김 → (남은 목록, 버린 개수)"""
+    if not timestamps:
+        return [], 0
+    keep = TimestampIndex(row_ns).snap(datetimes_to_ns(timestamps), tolerance_ns) >= 0
+    kept = [ts for ts, ok in zip(timestamps, keep) if ok]
+    return kept, len(timestamps) - len(kept)
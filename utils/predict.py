@@ -1,32 +1,35 @@
 import re
 import pandas as pd
+from dataclasses import dataclass, replace
 from datetime import datetime
-from typing import List
+from typing import Callable, ContextManager, Iterator, List, Optional, Tuple
 
 from utils.file import read_csv_file
-from utils.prompt import load_template, build_prompt
-from models.model_client import query_ollama  # ✅ Ollama 인터페이스 함수
+from utils.output import ANOMALY_SCHEMA, json_num_predict, parse_anomaly_json, validate_in_window
+from utils.prompt import load_template, build_prompt, build_messages, read_text_cached, split_template
+from utils.serialize import serialize_df
+from utils.telemetry import StageTimer
+from utils.timestamps import NS_PER_SEC, frame_timestamps_ns
+from utils.voting import vote_temperature, vote_window
+from utils.windowing import estimate_tokens
+from models.model_client import GenerateResult, ModelBackend, get_default_client  # ✅ 모델 백엔드 인터페이스
+
+# LLM 응답에서 찾는 timestamp 형식 (YYYY-MM-DD HH:MM:SS)
+TIMESTAMP_PATTERN = r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}"
 
 # 경로 설정
 SCENARIO_DIR = "/Users/seongha/Documents/ollama_anomaly/prompts/scenarios"
 PROMPT_PATH = "/Users/seongha/Documents/ollama_anomaly/prompts/base_prompt.txt"
+JSON_PROMPT_PATH = "/Users/seongha/Documents/ollama_anomaly/prompts/base_prompt_json.txt"  # output_format="json"
 
-def convert_csv_to_text(df: pd.DataFrame) -> str:
-    """CSV → 프롬프트용 텍스트 변환"""
-    lines = []
-    for _, row in df.iterrows():
-        lines.append(f"Time: {row['timestamp']}")
-        for col in row.index:
-            if col != 'timestamp':
-                lines.append(f"{col}: {row[col]}")
-        lines.append("")  # 행 구분 공백
-    return "\n".join(lines)
+def convert_csv_to_text(df: pd.DataFrame, data_format: str = "verbose", precision: Optional[int] = None) -> str:
+    """CSV → 프롬프트용 텍스트 변환 (utils.serialize.serialize_df 사용)"""
+    return serialize_df(df, data_format, precision)
 
 # 이전 'extract_abnormal_timestamps' 제거
 def extract_iso_timestamps(response: str) -> List[datetime]:
     """LLM 응답에서 YYYY-MM-DD HH:MM:SS 형식의 timestamp만 추출"""
-    pattern = r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}"
-    matches = re.findall(pattern, response)
+    matches = re.findall(TIMESTAMP_PATTERN, response)
     timestamps = []
     for ts in matches:
         try:
@@ -39,6 +42,117 @@ def extract_iso_timestamps(response: str) -> List[datetime]:
     return timestamps
 
 
+
+@dataclass
+class StreamStopRules:
+    """
+    스트리밍 응답 조기 중단 조건.
+    window_start/window_end는 윈도우별로 채워진다 (predict_timestamps_from_df 참고).
+    """
+    max_timestamps: Optional[int] = None   # timestamp를 이만큼 받으면 중단
+    max_tokens: Optional[int] = None       # 생성 토큰 상한 (서버 num_predict로도 전달)
+    stop_on_out_of_window: bool = True     # 윈도우 범위 밖 timestamp가 나오면 중단
+    stop_on_repeat: bool = True            # 이미 나온 timestamp가 반복되면 중단
+    stop_on_trailing_text: bool = True     # 목록 뒤에 timestamp 없는 텍스트가 나오면 중단
+    window_start: Optional[datetime] = None
+    window_end: Optional[datetime] = None
+
+
+def stream_timestamps(
+    chunks: Iterator[str],
+    rules: StreamStopRules,
+    stats: Optional[dict] = None,
+) -> Iterator[datetime]:
+    """
+    스트리밍 응답 조각(chunks)을 줄 단위로 파싱하며 timestamp를 즉시 yield.
+    중단 조건을 만나면 chunks 제너레이터를 닫아 서버 측 생성을 취소한다.
+    stats가 주어지면 {"tokens", "stop_reason"}을 기록한다.
+    """
+    stats = stats if stats is not None else {}
+    stats.update(tokens=0, stop_reason="done")
+    seen = set()
+    buffer = ""
+
+    def handle_line(line: str):
+        """한 줄 처리 → (yield할 timestamp 목록, 중단 사유 또는 None)"""
+        found = []
+        matches = re.findall(TIMESTAMP_PATTERN, line)
+        if not matches:
+            if rules.stop_on_trailing_text and line.strip() and seen:
+                return found, "trailing_text"
+            return found, None
+        for ts in matches:
+            try:
+                dt = datetime.strptime(ts, "%Y-%m-%d %H:%M:%S")
+            except ValueError:
+                print(f"⚠️ 파싱 실패: {ts}")
+                continue
+            if rules.stop_on_out_of_window and (
+                (rules.window_start is not None and dt < rules.window_start)
+                or (rules.window_end is not None and dt > rules.window_end)
+            ):
+                return found, "out_of_window"
+            if dt in seen:
+                if rules.stop_on_repeat:
+                    return found, "repeat"
+                continue
+            seen.add(dt)
+            found.append(dt)
+            if rules.max_timestamps is not None and len(seen) >= rules.max_timestamps:
+                return found, "max_timestamps"
+        return found, None
+
+    try:
+        for chunk in chunks:
+            stats["tokens"] += 1
+            buffer += chunk
+            while "\n" in buffer:
+                line, buffer = buffer.split("\n", 1)
+                found, reason = handle_line(line)
+                yield from found
+                if reason:
+                    stats["stop_reason"] = reason
+                    return
+            if rules.max_tokens is not None and stats["tokens"] >= rules.max_tokens:
+                stats["stop_reason"] = "max_tokens"
+                break
+        found, reason = handle_line(buffer)
+        yield from found
+        if reason:
+            stats["stop_reason"] = reason
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+@dataclass
+class PredictOptions:
+    """
+    predict 파이프라인 설정.
+    배치 모드에서 워커 프로세스로 그대로 넘길 수 있도록 단순 값만 담는다 (클라이언트/캐시는 별도).
+    """
+    model_name: str = "llama3.1:8b"
+    temperature: float = 0.0
+    num_rows: int = 1000
+    concurrency: int = 1                           # 파일 하나에서 동시에 처리할 윈도우 수
+    data_format: str = "verbose"                   # utils.serialize.DATA_FORMATS
+    precision: Optional[int] = None
+    stream_rules: Optional[StreamStopRules] = None  # None이면 비스트리밍 호출
+    prefilter: Optional[str] = None                # utils.prefilter.PREFILTER_METHODS (None이면 모든 윈도우를 LLM으로)
+    prefilter_threshold: Optional[float] = None    # None이면 방법별 기본값
+    token_budget: Optional[int] = None             # 모델 컨텍스트 크기 (윈도우 크기 계산 + num_ctx로 전달)
+    overlap: float = 0.5                           # 윈도우 겹침 비율 (0이면 겹침 없음)
+    adaptive_windows: bool = False                 # 이상 의심 구간 주변에서만 윈도우 축소/겹침
+    prompt_layout: str = "flat"                    # utils.prompt.PROMPT_LAYOUTS (chat이면 /api/chat 사용)
+    snap_tolerance: float = 0.0                    # 예측 timestamp를 가장 가까운 행에 맞출 허용 오차 (초)
+    output_format: str = "text"                    # utils.output.OUTPUT_FORMATS (json이면 schema 강제 + num_predict 상한)
+    vote_samples: int = 1                          # 윈도우당 샘플 수 (1보다 크면 self-consistency 투표, utils.voting)
+    vote_quorum: float = 0.5                       # 채택에 필요한 표 (1 이하: 샘플 대비 비율, 초과: 표 수)
+    vote_parallel: Optional[int] = None            # 윈도우 하나에서 동시에 보낼 샘플 수 (None이면 전부)
+    vote_temperature: Optional[float] = None       # 투표 샘플 temperature (None이면 temperature, 그것도 0이면 DEFAULT_VOTE_TEMPERATURE)
+
+
 # def load_scenario_by_filename(file_path: str) -> str:
 #     """CSV와 동일한 이름의 시나리오 텍스트 로드"""
 #     import os
@@ -65,7 +179,7 @@ def load_scenario_by_filename(file_path: str, original_file_name: str = None) ->
     scenario_path = Path(SCENARIO_DIR) / filename
     if not scenario_path.exists():
         raise FileNotFoundError(f"❌ 시나리오 파일 없음: {scenario_path}")
-    return scenario_path.read_text(encoding="utf-8")
+    return read_text_cached(scenario_path)
 
 
 # def query_ollama_and_extract_timestamps(
@@ -94,6 +208,221 @@ def load_scenario_by_filename(file_path: str, original_file_name: str = None) ->
 
 #     # 응답에서 timestamp만 추출하는 함수로 교체
 #     return extract_iso_timestamps(response)
+def load_prompt_parts(file_name: str, output_format: str = "text") -> Tuple[str, str]:
+    """
+    파일 단위로 한 번만 호출: (프롬프트 템플릿, 시나리오) 로드.
+    윈도우마다 디스크에서 다시 읽지 않도록 호출 측에서 재사용한다 (상주 프로세스에서는 파일 내용도 캐시됨).
+    output_format="json"이면 JSON 출력을 요구하는 템플릿(JSON_PROMPT_PATH)을 쓴다.
+    """
+    prompt_template = read_text_cached(JSON_PROMPT_PATH if output_format == "json" else PROMPT_PATH)
+    scenario = load_scenario_by_filename(file_name)
+    return prompt_template, scenario
+
+
+@dataclass
+class WindowPrompt:
+    """윈도우 하나의 프롬프트 (같은 설정으로 여러 번 호출할 때 재사용)"""
+    prompt: str
+    messages: Optional[List[dict]]   # prompt_layout="chat"일 때만
+    prefix: str                      # 지시문 + 시나리오 (report_prefill 참고)
+
+
+def build_window_prompt(
+    df: pd.DataFrame,
+    prompt_template: str,
+    scenario: str,
+    data_format: str = "verbose",
+    precision: Optional[int] = None,
+    prompt_layout: str = "flat",
+    timings: Optional[dict] = None,
+) -> WindowPrompt:
+    """DataFrame 슬라이스 → 직렬화 + 프롬프트 조립 (timings에 serialize/prompt 단계 시간 기록)"""
+    timer = StageTimer(timings)
+    with timer.stage("serialize"):
+        text_block = convert_csv_to_text(df, data_format, precision)
+    with timer.stage("prompt"):
+        prompt = build_prompt(prompt_template, scenario, text_block)
+        messages = build_messages(prompt_template, scenario, text_block) if prompt_layout == "chat" else None
+        prefix = split_template(prompt_template, scenario)[0]
+    return WindowPrompt(prompt, messages, prefix)
+
+
+def predict_timestamps_from_df(
+    df: pd.DataFrame,
+    prompt_template: str,
+    scenario: str,
+    model_name: str = "llama3.1:8b",
+    temperature: float = 0.0,
+    data_format: str = "verbose",
+    precision: Optional[int] = None,
+    client: Optional[ModelBackend] = None,
+    stream_rules: Optional[StreamStopRules] = None,
+    llm_options: Optional[dict] = None,
+    prompt_layout: str = "flat",
+    timings: Optional[dict] = None,
+    output_format: str = "text",
+    snap_tolerance: float = 0.0,
+) -> List[datetime]:
+    """
+    이미 로드된 DataFrame 슬라이스 → 프롬프트 → Ollama → 이상 시점 추출.
+    임시 파일/CSV 재파싱 없이 메모리에서 바로 처리 (df.iloc 슬라이스 그대로 전달 가능).
+    data_format/precision은 utils.serialize.serialize_df, client는 models.backend.ModelBackend 참고 (기본: Ollama).
+    모델 호출 실패 시 BackendError 계열 예외 발생 (빈 결과로 취급하지 않음).
+    stream_rules가 주어지면 스트리밍 모드로 호출하고 조건에 따라 생성을 조기 중단한다.
+    llm_options는 Ollama options에 추가로 전달된다 (예: num_ctx).
+    prompt_layout="chat"이면 지시문 + 시나리오를 system 메시지로 고정하고 /api/chat으로 호출한다.
+    timings가 주어지면 단계별 소요 시간(serialize/prompt/http/parse, ms)과 Ollama 지표("ollama")를 기록한다.
+    output_format="json"이면 predict_from_prompt 참고 (snap_tolerance는 그때 윈도우 행 확인에 쓰는 허용 오차).
+    """
+    window_prompt = build_window_prompt(df, prompt_template, scenario, data_format, precision, prompt_layout, timings)
+    return predict_from_prompt(
+        df, window_prompt, model_name, temperature, client, stream_rules, llm_options, timings, output_format,
+        snap_tolerance,
+    )
+
+
+def predict_from_prompt(
+    df: pd.DataFrame,
+    window_prompt: WindowPrompt,
+    model_name: str = "llama3.1:8b",
+    temperature: float = 0.0,
+    client: Optional[ModelBackend] = None,
+    stream_rules: Optional[StreamStopRules] = None,
+    llm_options: Optional[dict] = None,
+    timings: Optional[dict] = None,
+    output_format: str = "text",
+    snap_tolerance: float = 0.0,
+) -> List[datetime]:
+    """
+    미리 만든 WindowPrompt로 Ollama 호출 → 이상 시점 추출 (df는 윈도우 범위/행 확인용).
+    output_format="json"이면 ANOMALY_SCHEMA를 Ollama format으로 강제하고 num_predict를 윈도우 크기로 제한한 뒤,
+    윈도우 행에 snap_tolerance(초) 이내로 맞는 timestamp만 남긴다 (timings에 json_ok, invalid_timestamps 기록).
+    """
+    client = client or get_default_client()
+    timer = StageTimer(timings)
+    prompt, messages = window_prompt.prompt, window_prompt.messages
+    response_format = None
+    if output_format == "json":
+        response_format = ANOMALY_SCHEMA
+        llm_options = {"num_predict": json_num_predict(len(df)), **(llm_options or {})}
+
+    if stream_rules is not None:
+        timestamps = _predict_streaming(
+            df, prompt, messages, model_name, temperature, client, stream_rules, llm_options, timer, response_format
+        )
+        return _validate_window(df, timestamps, timer, snap_tolerance) if response_format is not None else timestamps
+
+    print("🧠 Ollama 모델 호출 중...")
+    with timer.stage("http"):
+        if messages is not None:
+            result = client.chat_result(
+                messages, model=model_name, temperature=temperature, extra_options=llm_options,
+                response_format=response_format,
+            )
+        else:
+            result = client.generate_result(
+                prompt, model=model_name, temperature=temperature, extra_options=llm_options,
+                response_format=response_format,
+            )
+    timer.timings.update(cached=result.cached, ollama=result.metrics())
+
+    print("📤 모델 응답 완료\n" + "-"*80)
+    print(result.text)
+    report_prefill(result, prompt, window_prompt.prefix)
+
+    with timer.stage("parse"):
+        if response_format is None:
+            return extract_iso_timestamps(result.text)
+        timestamps, parsed_ok = parse_anomaly_json(result.text)
+        timer.timings["json_ok"] = parsed_ok
+        if not parsed_ok:
+            print(f"⚠️ JSON 응답이 완전하지 않아 timestamp {len(timestamps)}개만 복구했습니다.")
+        return _validate_window(df, timestamps, timer, snap_tolerance)
+
+
+def _validate_window(
+    df: pd.DataFrame,
+    timestamps: List[datetime],
+    timer: StageTimer,
+    snap_tolerance: float = 0.0,
+) -> List[datetime]:
+    """윈도우 행에 없는 timestamp(환각/범위 밖) 제거 → timings["invalid_timestamps"]"""
+    kept, dropped = validate_in_window(timestamps, frame_timestamps_ns(df), int(snap_tolerance * NS_PER_SEC))
+    timer.timings["invalid_timestamps"] = dropped
+    if dropped:
+        print(f"⚠️ 윈도우에 없는 timestamp {dropped}개 제외")
+    return kept
+
+
+def report_prefill(result: GenerateResult, prompt: str, prefix: str) -> Optional[int]:
+    """
+    서버가 실제로 prefill한 토큰 수(prompt_eval_count)와 프롬프트 예상 토큰 수를 비교해
+    공통 prefix KV 캐시 재사용으로 아낀 토큰 수를 추정·출력한다 (최대 prefix 예상 토큰 수).
+    캐시 응답이거나 서버가 지표를 주지 않으면 None.
+    """
+    if result.cached or result.prompt_eval_count is None:
+        return None
+    expected = estimate_tokens(prompt)
+    saved = min(max(expected - result.prompt_eval_count, 0), estimate_tokens(prefix))
+    prefill_ms = (result.prompt_eval_duration or 0) / 1e6
+    print(
+        f"♻️ prefill {result.prompt_eval_count:,} 토큰 / 예상 {expected:,} 토큰 "
+        f"(prefix 재사용 ≈{saved:,} 토큰, prefill {prefill_ms:.0f}ms)"
+    )
+    return saved
+
+
+def _predict_streaming(
+    df: pd.DataFrame,
+    prompt: str,
+    messages: Optional[List[dict]],
+    model_name: str,
+    temperature: float,
+    client: ModelBackend,
+    stream_rules: StreamStopRules,
+    llm_options: Optional[dict] = None,
+    timer: Optional[StageTimer] = None,
+    response_format: Optional[dict] = None,
+) -> List[datetime]:
+    """
+    스트리밍 모드: timestamp가 도착하는 대로 출력하고, 중단 조건을 만나면 생성 취소.
+    응답 수신과 파싱이 겹치므로 둘을 합쳐 http 단계로 기록한다 (끝까지 받은 경우에만 Ollama 지표 있음).
+    response_format(JSON schema)이 있으면 JSON 구조 줄(괄호 등)에서 멈추지 않도록 trailing_text 조건을 끈다.
+    """
+    timer = timer or StageTimer()
+    parsed = pd.to_datetime(df["timestamp"], errors="coerce")
+    rules = replace(
+        stream_rules,
+        window_start=parsed.min().to_pydatetime() if parsed.notna().any() else None,
+        window_end=parsed.max().to_pydatetime() if parsed.notna().any() else None,
+    )
+    if response_format is not None:
+        rules = replace(rules, stop_on_trailing_text=False)
+
+    print("🧠 Ollama 모델 호출 중 (stream)...")
+    server_stats = {}
+    if messages is not None:
+        chunks = client.chat_stream(
+            messages, model=model_name, temperature=temperature, num_predict=rules.max_tokens,
+            extra_options=llm_options, stats=server_stats, response_format=response_format,
+        )
+    else:
+        chunks = client.generate_stream(
+            prompt, model=model_name, temperature=temperature, num_predict=rules.max_tokens,
+            extra_options=llm_options, stats=server_stats, response_format=response_format,
+        )
+    stats = {}
+    timestamps = []
+    with timer.stage("http"):
+        for ts in stream_timestamps(chunks, rules, stats):
+            print(f"⏱️ {ts}")
+            timestamps.append(ts)
+    timer.timings.update(cached=False, stop_reason=stats["stop_reason"], ollama=server_stats or None)
+
+    print(f"📤 스트리밍 종료: {stats['stop_reason']} (토큰 {stats['tokens']}개, timestamp {len(timestamps)}개)")
+    return timestamps
+
+
 def query_ollama_and_extract_timestamps(
     file_path: str,
     model_name: str = "llama3.1:8b",
@@ -104,24 +433,84 @@ def query_ollama_and_extract_timestamps(
     """
     CSV + 시나리오 → 프롬프트 → Ollama → 이상 시점 추출.
     original_file_name이 있으면 시나리오 로딩에 사용.
+    (파일 경로 기반 호환용 래퍼 — 내부적으로 predict_timestamps_from_df 사용)
     """
     df = read_csv_file(file_path)
     if df is None:
         raise RuntimeError(f"❌ CSV 파일 로드 실패: {file_path}")
-    
-    sliced_df = df.head(num_rows)
-    text_block = convert_csv_to_text(sliced_df)
 
-    # 시나리오 로드
-    scenario = load_scenario_by_filename(file_path, original_file_name)
-    prompt_template = load_template(PROMPT_PATH)
-    prompt = build_prompt(prompt_template, scenario, text_block)
+    prompt_template, scenario = load_prompt_parts(original_file_name or file_path)
+    return predict_timestamps_from_df(df.head(num_rows), prompt_template, scenario, model_name, temperature)
 
-    print("🧠 Ollama 모델 호출 중...")
-    response = query_ollama(prompt, model=model_name, temperature=temperature)
 
-    print("📤 모델 응답 완료\n" + "-"*80)
-    print(response)
+def predict_window(
+    df: pd.DataFrame,
+    prompt_template: str,
+    scenario: str,
+    options: PredictOptions,
+    client: Optional[ModelBackend] = None,
+    timings: Optional[dict] = None,
+    slot: Optional[Callable[[], ContextManager]] = None,
+) -> List[datetime]:
+    """
+    PredictOptions 기반 윈도우 하나 예측 (predict_timestamps_from_df 래퍼, vote_samples > 1이면 vote_window_prompt).
+    slot은 투표 모드에서 샘플 요청마다 잡는 동시 호출 제한 (일반 모드는 호출하는 쪽이 윈도우 단위로 제한).
+    """
+    if options.vote_samples > 1:
+        return vote_window_prompt(df, prompt_template, scenario, options, client, timings, slot)
+    return predict_timestamps_from_df(
+        df,
+        prompt_template,
+        scenario,
+        options.model_name,
+        options.temperature,
+        options.data_format,
+        options.precision,
+        client,
+        options.stream_rules,
+        llm_options_for(options),
+        options.prompt_layout,
+        timings,
+        options.output_format,
+        options.snap_tolerance,
+    )
+
+
+def vote_window_prompt(
+    df: pd.DataFrame,
+    prompt_template: str,
+    scenario: str,
+    options: PredictOptions,
+    client: Optional[ModelBackend] = None,
+    timings: Optional[dict] = None,
+    slot: Optional[Callable[[], ContextManager]] = None,
+) -> List[datetime]:
+    """
+    윈도우 하나를 vote_samples번 샘플링해 quorum 이상 나온 timestamp만 채택 (utils.voting.vote_window).
+    프롬프트는 한 번만 만들고, 샘플마다 seed만 바꿔(0, 1, ...) utils.voting.vote_temperature로 호출한다.
+    """
+    client = client or get_default_client()
+    timer = StageTimer(timings)
+    window_prompt = build_window_prompt(
+        df, prompt_template, scenario, options.data_format, options.precision, options.prompt_layout, timer.timings
+    )
+    temperature = vote_temperature(options.temperature, options.vote_temperature)
+    base_options = llm_options_for(options) or {}
+
+    def predict_sample(seed: int, sample_timings: dict) -> List[datetime]:
+        return predict_from_prompt(
+            df, window_prompt, options.model_name, temperature, client, options.stream_rules,
+            {**base_options, "seed": seed}, sample_timings, options.output_format, options.snap_tolerance,
+        )
+
+    return vote_window(
+        predict_sample, options.vote_samples, options.vote_quorum, options.vote_parallel, timer.timings, slot
+    )
 
-    return extract_iso_timestamps(response)
 
+def llm_options_for(options: PredictOptions) -> Optional[dict]:
+    """PredictOptions → Ollama에 추가로 보낼 options (컨텍스트 크기를 명시해 프롬프트가 잘리지 않게)"""
+    llm_options = {}
+    if options.token_budget is not None:
+        llm_options["num_ctx"] = options.token_budget
+    return llm_options or None
@@ -0,0 +1,160 @@
+#utils/prefilter.py
+import re
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# LLM 호출 전에 윈도우를 걸러내는 값싼 통계 탐지기
+#   zscore   : 직전 구간 대비 rolling z-score
+#   mad      : 1차 차분의 robust z-score (median / MAD)
+#   seasonal : 한 주기 전 값과의 차이(계절 잔차)의 robust z-score
+#   rule     : 시나리오 문장에서 추출한 임계값 규칙 (점수 >= 1이면 규칙 위반)
+PREFILTER_METHODS = ("zscore", "mad", "seasonal", "rule")
+DEFAULT_THRESHOLDS = {"zscore": 4.0, "mad": 5.0, "seasonal": 5.0, "rule": 1.0}
+
+_NUMBER = r"(-?\d+(?:\.\d+)?)"
+_EPS = 1e-9
+
+
+def _robust_z(values: np.ndarray) -> np.ndarray:
+    """|x - median| / (1.4826 * MAD), NaN은 0으로"""
+    finite = values[np.isfinite(values)]
+    if len(finite) == 0:
+        return np.zeros(len(values))
+    median = np.median(finite)
+    mad = 1.4826 * np.median(np.abs(finite - median))
+    scores = np.abs(values - median) / max(mad, _EPS)
+    return np.nan_to_num(scores, nan=0.0, posinf=np.finfo(float).max)
+
+
+def zscore_scores(values: np.ndarray, window: int = 48) -> np.ndarray:
+    """직전 window개 점의 평균/표준편차 기준 z-score (자기 자신은 통계에서 제외)"""
+    series = pd.Series(values)
+    mean = series.rolling(window, min_periods=2).mean().shift(1)
+    std = series.rolling(window, min_periods=2).std().shift(1)
+    scores = (series - mean).abs() / std.clip(lower=_EPS)
+    return np.nan_to_num(scores.to_numpy(), nan=0.0, posinf=np.finfo(float).max)
+
+
+def mad_scores(values: np.ndarray) -> np.ndarray:
+    """1차 차분의 robust z-score — 급격한 점프/하강에 반응"""
+    diffs = np.diff(values, prepend=values[0] if len(values) else 0.0)
+    return _robust_z(diffs)
+
+
+def seasonal_scores(values: np.ndarray, period: Optional[int]) -> np.ndarray:
+    """한 주기 전 값과의 차이의 robust z-score (첫 주기 구간은 차분 점수로 대체)"""
+    if not period or period >= len(values):
+        return mad_scores(values)
+    residual = np.full(len(values), np.nan)
+    residual[period:] = values[period:] - values[:-period]
+    scores = _robust_z(residual)
+    scores[:period] = mad_scores(values)[:period]
+    return scores
+
+
+def parse_scenario_rules(scenario: str) -> List[Tuple[str, Tuple[float, ...]]]:
+    """
+    시나리오 문장에서 단순 임계값 규칙 추출 (보수적으로: 애매하면 더 많이 LLM으로 보냄).
+      ("change", (limit, lag))  : lag 스텝 안에서 limit 단위 넘게 변하면 위반
+      ("above", (limit,))       : limit 초과 값이 있으면 위반
+      ("range", (low, high))    : [low, high] 범위를 벗어나면 위반
+    """
+    rules = []
+    text = scenario.lower()
+    for sentence in re.split(r"[\n.](?!\d)", text):
+        change = re.search(
+            rf"(?:jump|drop|change|increase|decrease)\D*?(?:over|more than|greater than)\s*{_NUMBER}\s*units?",
+            sentence,
+        )
+        if change:
+            lag = re.search(r"(?:less than|within)\s*(\d+)\s*timestamps", sentence)
+            rules.append(("change", (float(change.group(1)), int(lag.group(1)) if lag else 1)))
+            continue
+        above = re.search(rf"(?:exceed(?:s|ing)?|above)\s*{_NUMBER}", sentence)
+        if above:
+            rules.append(("above", (float(above.group(1)),)))
+        value_range = re.search(rf"between\s*{_NUMBER}\s*and\s*{_NUMBER}", sentence)
+        if value_range and "value" in sentence:
+            low, high = sorted((float(value_range.group(1)), float(value_range.group(2))))
+            if high > low:
+                rules.append(("range", (low, high)))
+    return rules
+
+
+def rule_scores(values: np.ndarray, scenario: str) -> Optional[np.ndarray]:
+    """시나리오 규칙 기준 점수 (>= 1이면 위반). 추출된 규칙이 없으면 None."""
+    rules = parse_scenario_rules(scenario)
+    if not rules:
+        return None
+    series = pd.Series(values)
+    scores = np.zeros(len(values))
+    for kind, params in rules:
+        if kind == "change":
+            limit, lag = params
+            # lag 스텝 안의 최대 변화량 ≈ (lag+1)개 구간의 max - min
+            spread = series.rolling(lag + 1, min_periods=2).max() - series.rolling(lag + 1, min_periods=2).min()
+            scores = np.maximum(scores, np.nan_to_num(spread.to_numpy()) / max(abs(limit), _EPS))
+        elif kind == "above":
+            (limit,) = params
+            scores = np.maximum(scores, np.where(values > limit, 1.0 + (values - limit) / max(abs(limit), 1.0), 0.0))
+        elif kind == "range":
+            low, high = params
+            mid, half = (low + high) / 2, (high - low) / 2
+            scores = np.maximum(scores, np.abs(values - mid) / half)
+    return scores
+
+
+def infer_period(timestamps: pd.Series) -> Optional[int]:
+    """timestamp 간격으로 하루 주기의 스텝 수 추정 (불규칙하면 None)"""
+    parsed = pd.to_datetime(timestamps.iloc[:1000], errors="coerce")
+    steps = parsed.diff().dropna()
+    if steps.empty:
+        return None
+    step = steps.median().total_seconds()
+    if step <= 0 or 86400 % step:
+        return None
+    return int(86400 // step)
+
+
+def point_scores(df: pd.DataFrame, method: str, scenario: str = "") -> np.ndarray:
+    """시리즈 전체에 대해 점별 이상 점수를 한 번에 계산"""
+    value_col = next(col for col in df.columns if col != "timestamp")
+    values = pd.to_numeric(df[value_col], errors="coerce").to_numpy(dtype=float)
+    if method == "zscore":
+        return zscore_scores(values)
+    if method == "mad":
+        return mad_scores(values)
+    if method == "seasonal":
+        return seasonal_scores(values, infer_period(df["timestamp"]))
+    if method == "rule":
+        scores = rule_scores(values, scenario)
+        if scores is None:
+            print("⚠️ 시나리오에서 규칙을 찾지 못해 mad 점수로 대체합니다.")
+            return mad_scores(values) / DEFAULT_THRESHOLDS["mad"]
+        return scores
+    raise ValueError(f"지원하지 않는 사전 필터: {method}")
+
+
+def screen_windows(
+    df: pd.DataFrame,
+    windows: List[Tuple[int, int]],
+    method: str,
+    scenario: str = "",
+    threshold: Optional[float] = None,
+) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    """
+    윈도우별 최대 점수로 LLM에 보낼 윈도우와 바로 normal로 처리할 윈도우를 나눔.
+    반환: (LLM으로 보낼 윈도우, 건너뛸 윈도우)
+    """
+    threshold = DEFAULT_THRESHOLDS[method] if threshold is None else threshold
+    scores = point_scores(df, method, scenario)
+    send, skip = [], []
+    for start, end in windows:
+        window = scores[start:end]
+        if len(window) and window.max() >= threshold:
+            send.append((start, end))
+        else:
+            skip.append((start, end))
+    return send, skip
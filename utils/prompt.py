@@ -1,7 +1,50 @@
 #utils/prompt.py
+import os
+from typing import Dict, List, Tuple
+
+# 프롬프트 구성 방식
+#   flat : 템플릿 전체를 한 문자열로 (/api/generate)
+#   chat : 지시문 + 시나리오를 system 메시지, 데이터 이후를 user 메시지로 분리 (/api/chat)
+PROMPT_LAYOUTS = ("flat", "chat")
+
+# 경로 → (mtime_ns, size, 내용). 상주 프로세스(serve 모드)에서 파일마다 다시 읽지 않도록 캐시
+_text_cache: Dict[str, Tuple[int, int, str]] = {}
+
 def load_template(path: str) -> str:
     with open(path, 'r', encoding='utf-8') as f:
         return f.read()
 
+def read_text_cached(path) -> str:
+    """텍스트 파일 읽기 (mtime/크기가 그대로면 캐시된 내용 반환, 없으면 FileNotFoundError)"""
+    path = str(path)
+    stat = os.stat(path)
+    cached = _text_cache.get(path)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    text = load_template(path)
+    _text_cache[path] = (stat.st_mtime_ns, stat.st_size, text)
+    return text
+
 def build_prompt(template: str, rules: str, data: str) -> str:
     return template.format(rules=rules, data=data)
+
+def split_template(template: str, rules: str) -> Tuple[str, str]:
+    """
+    템플릿을 {data} 기준으로 (prefix, suffix)로 나눈다.
+    prefix(지시문 + 시나리오)는 같은 파일의 모든 윈도우에서 바이트 단위로 동일하므로
+    서버가 앞부분 KV 캐시를 재사용할 수 있다.
+    prefix + data + suffix == build_prompt(template, rules, data)
+    """
+    marker = "{data}"
+    if marker not in template:
+        raise ValueError("❌ 프롬프트 템플릿에 {data} 자리표시자가 없습니다.")
+    head, tail = template.split(marker, 1)
+    return head.format(rules=rules), tail.format(rules=rules)
+
+def build_messages(template: str, rules: str, data: str) -> List[dict]:
+    """chat 레이아웃: system = 고정 prefix, user = 윈도우 데이터 + 나머지 템플릿"""
+    prefix, suffix = split_template(template, rules)
+    return [
+        {"role": "system", "content": prefix},
+        {"role": "user", "content": data + suffix},
+    ]
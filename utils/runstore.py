@@ -0,0 +1,132 @@
+#utils/runstore.py
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# 예측 실행 기록 (SQLite)
+#   runs      : 파일별 버전 + 실행 메타데이터 (옵션, 윈도우 계획, 단계별 시간)
+#   anomalies : 실행별 이상 timestamp (원본 행에 맞춘 int64 epoch ns)
+# 원본 시계열 전체를 버전마다 복사하지 않으므로 저장 공간/평가 I/O가 이상 개수에 비례한다.
+# 라벨 CSV(<stem>_v1_N.csv)는 요청할 때만 만든다 (run_model_predict.py --mode materialize).
+
+
+class RunStore:
+    """
+    예측 실행 저장소. 버전 번호는 쓰기 트랜잭션(BEGIN IMMEDIATE) 안에서 할당하므로
+    여러 스레드/프로세스(batch 워커)가 동시에 기록해도 같은 번호가 나오지 않는다.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                file TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                created_at REAL,
+                model TEXT,
+                temperature REAL,
+                anomalies INTEGER,
+                options TEXT,
+                windows TEXT,
+                timings TEXT,
+                UNIQUE (file, version)
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS anomalies (
+                run_id INTEGER NOT NULL,
+                ts INTEGER NOT NULL,
+                PRIMARY KEY (run_id, ts)
+            ) WITHOUT ROWID"""
+        )
+
+    def has_runs(self, file_key: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM runs WHERE file = ? LIMIT 1", (file_key,)).fetchone() is not None
+
+    def add_run(
+        self,
+        file_key: str,
+        anomaly_ns: np.ndarray,
+        options: dict,
+        windows: Optional[List] = None,
+        timings: Optional[dict] = None,
+        version_floor: int = 0,
+    ) -> int:
+        """
+        실행 하나 기록 → 할당된 버전 번호 (파일별 최대 버전 + 1, version_floor보다 크게).
+        version_floor는 저장소 도입 전에 만든 _v1_N.csv 번호와 겹치지 않게 할 때 쓴다.
+        """
+        anomaly_ns = np.unique(np.asarray(anomaly_ns, dtype="int64"))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                current = self._conn.execute(
+                    "SELECT COALESCE(MAX(version), 0) FROM runs WHERE file = ?", (file_key,)
+                ).fetchone()[0]
+                version = max(current, version_floor) + 1
+                cursor = self._conn.execute(
+                    "INSERT INTO runs (file, version, created_at, model, temperature, anomalies, options, windows, timings)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        file_key,
+                        version,
+                        time.time(),
+                        options.get("model_name"),
+                        options.get("temperature"),
+                        len(anomaly_ns),
+                        json.dumps(options, ensure_ascii=False),
+                        json.dumps(windows or []),
+                        json.dumps(timings or {}),
+                    ),
+                )
+                self._conn.executemany(
+                    "INSERT INTO anomalies (run_id, ts) VALUES (?, ?)",
+                    ((cursor.lastrowid, int(ts)) for ts in anomaly_ns),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return version
+
+    def list_runs(self, file_key: str) -> pd.DataFrame:
+        """파일의 실행 목록 (버전 순)"""
+        with self._lock:
+            return pd.read_sql_query(
+                "SELECT version, created_at, model, temperature, anomalies, options, windows, timings"
+                " FROM runs WHERE file = ? ORDER BY version",
+                self._conn,
+                params=(file_key,),
+            )
+
+    def latest_version(self, file_key: str) -> Optional[int]:
+        with self._lock:
+            return self._conn.execute("SELECT MAX(version) FROM runs WHERE file = ?", (file_key,)).fetchone()[0]
+
+    def anomalies(self, file_key: str, version: int) -> np.ndarray:
+        """실행 하나의 이상 timestamp → int64 (epoch ns) 정렬 배열 (해당 실행이 없으면 KeyError)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM runs WHERE file = ? AND version = ?", (file_key, version)
+            ).fetchone()
+            if row is None:
+                raise KeyError(f"{file_key} v{version}")
+            values = self._conn.execute(
+                "SELECT ts FROM anomalies WHERE run_id = ? ORDER BY ts", (row[0],)
+            ).fetchall()
+        return np.array([ts for (ts,) in values], dtype="int64")
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,91 @@
+#utils/serialize.py
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# 지원하는 데이터 직렬화 포맷
+#   verbose : 기존 포맷 (Time: ... / value: ... / 공백줄) — 행당 토큰이 가장 많음
+#   csv     : timestamp,value 형태의 조밀한 CSV
+#   compact : 시작 시각과 간격을 한 번만 적고 값만 나열 (간격이 불규칙하면 csv로 대체)
+DATA_FORMATS = ("verbose", "csv", "compact")
+
+
+def _format_values(series: pd.Series, precision: Optional[int]) -> pd.Series:
+    """숫자 컬럼을 문자열로 일괄 변환 (precision이 있으면 소수점 자리수 고정)"""
+    if precision is not None and pd.api.types.is_float_dtype(series):
+        return pd.Series(np.char.mod(f"%.{precision}f", series.to_numpy()), index=series.index)
+    return series.astype(str)
+
+
+def _infer_step(timestamps: pd.Series) -> Optional[pd.Timedelta]:
+    """timestamp 간격이 일정하면 그 간격을, 아니면 None 반환"""
+    parsed = pd.to_datetime(timestamps, errors="coerce")
+    if parsed.isna().any() or len(parsed) < 2:
+        return None
+    diffs = parsed.diff().iloc[1:]
+    step = diffs.iloc[0]
+    if step <= pd.Timedelta(0) or not (diffs == step).all():
+        return None
+    return step
+
+
+def _format_step(step: pd.Timedelta) -> str:
+    """간격 → 'Ns' (초 단위로 나누어떨어질 때), 아니면 'N.NNNms' (1초 미만 샘플링이 0s로 잘리지 않게)"""
+    nanos = step.value
+    if nanos % 1_000_000_000 == 0:
+        return f"{nanos // 1_000_000_000}s"
+    return f"{nanos / 1_000_000:.6f}".rstrip("0").rstrip(".") + "ms"
+
+
+def to_verbose(df: pd.DataFrame, precision: Optional[int] = None) -> str:
+    """기존 convert_csv_to_text와 동일한 출력 (iterrows 없이 컬럼 단위로 조립)"""
+    if df.empty:
+        return ""
+    block = "Time: " + df["timestamp"].astype(str)
+    for col in df.columns:
+        if col != "timestamp":
+            block = block + f"\n{col}: " + _format_values(df[col], precision)
+    return "\n".join(block + "\n")
+
+
+def to_csv(df: pd.DataFrame, precision: Optional[int] = None) -> str:
+    """timestamp,value 형태의 CSV 텍스트"""
+    float_format = f"%.{precision}f" if precision is not None else None
+    return df.to_csv(index=False, float_format=float_format, lineterminator="\n")
+
+
+def to_compact(df: pd.DataFrame, precision: Optional[int] = None) -> str:
+    """
+    시작 시각 + 간격을 한 번만 명시하고 값만 한 줄씩 나열.
+    i번째 행의 timestamp = start + i * step. 간격이 불규칙하면 csv 포맷으로 대체.
+    """
+    if df.empty:
+        return ""
+    step = _infer_step(df["timestamp"])
+    if step is None:
+        return to_csv(df, precision)
+
+    value_cols = [col for col in df.columns if col != "timestamp"]
+    rows = _format_values(df[value_cols[0]], precision)
+    for col in value_cols[1:]:
+        rows = rows + "," + _format_values(df[col], precision)
+
+    header = [
+        f"start: {df['timestamp'].iloc[0]}",
+        f"step: {_format_step(step)}",
+        "timestamp of row i = start + i * step",
+        f"columns: {','.join(value_cols)}",
+    ]
+    return "\n".join(header + rows.tolist()) + "\n"
+
+
+def serialize_df(df: pd.DataFrame, data_format: str = "verbose", precision: Optional[int] = None) -> str:
+    """DataFrame → 프롬프트용 텍스트 (data_format: verbose / csv / compact)"""
+    if data_format == "verbose":
+        return to_verbose(df, precision)
+    if data_format == "csv":
+        return to_csv(df, precision)
+    if data_format == "compact":
+        return to_compact(df, precision)
+    raise ValueError(f"지원하지 않는 데이터 포맷: {data_format}")
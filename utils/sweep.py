@@ -0,0 +1,68 @@
+#utils/sweep.py
+import itertools
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Sequence
+
+import pandas as pd
+
+# sweep 결과 표의 설정 컬럼 (반복 실행은 이 컬럼 기준으로 묶어서 요약)
+CONFIG_COLUMNS = ["file", "model", "temperature", "num_rows", "data_format"]
+SUMMARY_METRICS = ["f1", "pa_f1", "nab_score", "llm_sec", "prompt_tokens", "generated_tokens"]
+
+
+@dataclass(frozen=True)
+class SweepConfig:
+    """sweep 그리드의 한 점"""
+    model_name: str
+    temperature: float
+    num_rows: int
+    data_format: str
+
+    @property
+    def prompt_key(self):
+        """같은 프롬프트를 쓰는 설정끼리 공유하는 키 (모델/temperature와 무관)"""
+        return (self.num_rows, self.data_format)
+
+
+def parse_list(text: str, cast: Callable = str) -> List:
+    """"a,b,c" → [cast(a), cast(b), cast(c)] (빈 항목 무시, 순서 유지 + 중복 제거)"""
+    values = [cast(item.strip()) for item in text.split(",") if item.strip()]
+    return list(dict.fromkeys(values))
+
+
+def expand_grid(
+    models: Sequence[str],
+    temperatures: Sequence[float],
+    num_rows_list: Sequence[int],
+    data_formats: Sequence[str],
+) -> List[SweepConfig]:
+    """
+    그리드 → 설정 목록. 모델 순서(입력 순서)대로 묶여 있어
+    앞에서부터 실행하면 모델마다 한 번씩만 로드된다.
+    """
+    return [
+        SweepConfig(model, temperature, num_rows, data_format)
+        for model, num_rows, data_format, temperature in itertools.product(
+            models, num_rows_list, data_formats, temperatures
+        )
+    ]
+
+
+def group_by_model(configs: Sequence[SweepConfig]) -> Dict[str, List[SweepConfig]]:
+    """설정 목록 → {모델: 설정 목록} (처음 나온 모델 순서 유지)"""
+    groups: Dict[str, List[SweepConfig]] = {}
+    for config in configs:
+        groups.setdefault(config.model_name, []).append(config)
+    return groups
+
+
+def summarize_sweep(table: pd.DataFrame) -> pd.DataFrame:
+    """반복 실행별 sweep 표 → 설정별 평균/표준편차 (f1 평균 내림차순)"""
+    metrics = [m for m in SUMMARY_METRICS if m in table.columns]
+    grouped = table.groupby(CONFIG_COLUMNS, sort=False)
+    summary = grouped[metrics].mean()
+    if "f1" in metrics:
+        summary["f1_std"] = grouped["f1"].std(ddof=0)
+    summary["repeats"] = grouped.size()
+    summary = summary.reset_index()
+    return summary.sort_values("f1", ascending=False) if "f1" in metrics else summary
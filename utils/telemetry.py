@@ -0,0 +1,198 @@
+#utils/telemetry.py
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from utils.manifest import append_jsonl
+
+# 단계별 소요 시간 키 (레코드에는 <stage>_ms로 기록)
+#   load/plan/overview/total : 파일 단위 (CSV/캐시 로드, 윈도우 계획, 계층 탐지 overview 단계, 전체 윈도우 예측)
+#   wait      : LLM 동시 호출 슬롯 대기
+#   serialize/prompt/http/parse : 윈도우 단위 (http = 요청 ~ 응답 수신, 스트리밍이면 파싱 포함)
+FILE_STAGES = ("load", "plan", "overview", "total")
+WINDOW_STAGES = ("wait", "serialize", "prompt", "http", "parse")
+# Ollama가 보고하는 서버 측 시간 (ms)
+SERVER_STAGES = ("load_ms", "prompt_eval_ms", "eval_ms", "total_ms")
+QUANTILES = (0.5, 0.95, 0.99)
+# 서버 load_duration이 이보다 길면 모델을 새로 올린 것(콜드 로드)으로 센다
+RELOAD_THRESHOLD_MS = 500.0
+
+TELEMETRY_REPORTS = ("summary", "prometheus", "none")
+
+
+class StageTimer:
+    """timings dict에 단계별 소요 시간(ms)을 누적 기록: with timer.stage("http"): ..."""
+
+    def __init__(self, timings: Optional[dict] = None):
+        self.timings = timings if timings is not None else {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            key = f"{name}_ms"
+            self.timings[key] = self.timings.get(key, 0.0) + (time.perf_counter() - start) * 1000
+
+
+class Telemetry:
+    """
+    실행 단위 텔레메트리 JSONL 기록기 (append_jsonl로 기록하므로 배치 워커 프로세스에서 같이 써도 된다).
+    레코드:
+      {"type": "window", "run", "file", "start", "end", "model", "ok", "<stage>_ms", "cached", "ollama": {...}}
+      {"type": "file", "run", "file", "load_ms", "plan_ms", "windows", "total_ms"}
+    """
+
+    def __init__(self, path: Union[str, Path], run_id: Optional[str] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.run_id = run_id or f"{datetime.now():%Y%m%d_%H%M%S}_{os.getpid()}"
+
+    def record(self, kind: str, **fields):
+        append_jsonl(self.path, {"type": kind, "run": self.run_id, "time": time.time(), **fields}, fsync=False)
+
+    def record_window(self, file_key: str, start: int, end: int, model: str, timings: dict, error: Optional[str] = None):
+        fields = {key: round(value, 3) if isinstance(value, float) else value for key, value in timings.items()}
+        self.record("window", file=file_key, start=start, end=end, model=model, ok=error is None, error=error, **fields)
+
+    def load(self) -> List[dict]:
+        """이번 실행(run_id)의 레코드만 읽기"""
+        records = []
+        if not self.path.exists():
+            return records
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("run") == self.run_id:
+                    records.append(record)
+        return records
+
+
+def _quantiles(values: List[float]) -> Dict[str, float]:
+    array = np.asarray(values, dtype=float)
+    stats = {"count": int(len(array)), "sum": float(array.sum())}
+    for q in QUANTILES:
+        stats[f"p{int(q * 100)}"] = float(np.quantile(array, q))
+    return stats
+
+
+def summarize(records: List[dict]) -> dict:
+    """레코드 → 단계별 p50/p95/p99, 토큰 처리량, 모델 재로드 횟수"""
+    windows = [r for r in records if r.get("type") == "window"]
+    files = [r for r in records if r.get("type") == "file"]
+
+    samples: Dict[str, List[float]] = {}
+
+    def add(name: str, value):
+        if value is not None:
+            samples.setdefault(name, []).append(float(value))
+
+    for record in files:
+        for stage in FILE_STAGES:
+            add(stage, record.get(f"{stage}_ms"))
+    prompt_tokens = gen_tokens = 0
+    prompt_eval_ms = eval_ms = 0.0
+    reloads = 0
+    for record in windows:
+        for stage in WINDOW_STAGES:
+            add(stage, record.get(f"{stage}_ms"))
+        server = record.get("ollama") or {}
+        for key in SERVER_STAGES:
+            add(f"server_{key[:-3]}", server.get(key))
+        if server.get("total_ms") is not None and record.get("http_ms") is not None and not record.get("stop_reason"):
+            # 클라이언트에서 잰 왕복 시간 - 서버 처리 시간 = 네트워크/큐 대기/직렬화 오버헤드
+            add("client_overhead", record["http_ms"] - server["total_ms"])
+        prompt_tokens += server.get("prompt_eval_count") or 0
+        gen_tokens += server.get("eval_count") or 0
+        prompt_eval_ms += server.get("prompt_eval_ms") or 0.0
+        eval_ms += server.get("eval_ms") or 0.0
+        if (server.get("load_ms") or 0.0) > RELOAD_THRESHOLD_MS:
+            reloads += 1
+
+    return {
+        "files": len(files),
+        "windows": len(windows),
+        "failed": sum(1 for r in windows if not r.get("ok")),
+        "cached": sum(1 for r in windows if r.get("cached")),
+        "model_reloads": reloads,
+        # 투표 모드 (utils.voting): 받은 표 / 결과가 정해져 보내지 않은 샘플
+        "votes": sum(r.get("votes") or 0 for r in windows),
+        "votes_skipped": sum(r.get("votes_skipped") or 0 for r in windows),
+        "prompt_tokens": prompt_tokens,
+        "generated_tokens": gen_tokens,
+        "prefill_tokens_per_sec": prompt_tokens / (prompt_eval_ms / 1000) if prompt_eval_ms else None,
+        "gen_tokens_per_sec": gen_tokens / (eval_ms / 1000) if eval_ms else None,
+        "stages": {name: _quantiles(values) for name, values in samples.items()},
+    }
+
+
+def format_summary(summary: dict) -> str:
+    """summarize 결과 → 콘솔 출력용 텍스트"""
+    lines = [
+        f"📊 텔레메트리: 파일 {summary['files']}개, 윈도우 {summary['windows']}개 "
+        f"(실패 {summary['failed']}, 캐시 {summary['cached']}), 모델 재로드 {summary['model_reloads']}회",
+        f"🔢 토큰: prompt {summary['prompt_tokens']:,} / 생성 {summary['generated_tokens']:,}"
+        + (f", prefill {summary['prefill_tokens_per_sec']:.1f} tok/s" if summary["prefill_tokens_per_sec"] else "")
+        + (f", 생성 {summary['gen_tokens_per_sec']:.1f} tok/s" if summary["gen_tokens_per_sec"] else ""),
+    ]
+    if summary.get("votes"):
+        lines.append(f"🗳️ 투표: 샘플 {summary['votes']:,}개 사용, {summary['votes_skipped']:,}개 조기 종료로 생략")
+    if summary["stages"]:
+        df = pd.DataFrame.from_dict(summary["stages"], orient="index")
+        df.index.name = "stage (ms)"
+        lines.append(df[["count", "p50", "p95", "p99", "sum"]].to_string(float_format=lambda x: f"{x:.1f}"))
+    return "\n".join(lines)
+
+
+def prometheus_text(summary: dict, prefix: str = "ollama_anomaly") -> str:
+    """summarize 결과 → Prometheus text exposition format (node_exporter textfile collector용)"""
+    lines = [
+        f"# HELP {prefix}_stage_seconds Per-stage latency.",
+        f"# TYPE {prefix}_stage_seconds summary",
+    ]
+    for stage, stats in summary["stages"].items():
+        for q in QUANTILES:
+            value = stats[f"p{int(q * 100)}"] / 1000
+            lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+        lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {stats["sum"] / 1000:.6f}')
+        lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+    counters = {
+        "windows_total": summary["windows"],
+        "windows_failed_total": summary["failed"],
+        "windows_cached_total": summary["cached"],
+        "model_reloads_total": summary["model_reloads"],
+        "prompt_tokens_total": summary["prompt_tokens"],
+        "generated_tokens_total": summary["generated_tokens"],
+    }
+    for name, value in counters.items():
+        lines.append(f"# TYPE {prefix}_{name} counter")
+        lines.append(f"{prefix}_{name} {value}")
+    for name in ("prefill_tokens_per_sec", "gen_tokens_per_sec"):
+        if summary[name] is not None:
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {summary[name]:.3f}")
+    return "\n".join(lines) + "\n"
+
+
+def report(telemetry: Optional[Telemetry], kind: str = "summary"):
+    """실행 종료 시 이번 실행 레코드로 요약 출력 또는 <path>.prom 기록"""
+    if telemetry is None or kind == "none":
+        return
+    summary = summarize(telemetry.load())
+    if kind == "prometheus":
+        prom_path = telemetry.path.with_suffix(".prom")
+        prom_path.write_text(prometheus_text(summary), encoding="utf-8")
+        print(f"📈 Prometheus 지표 저장: {prom_path}")
+    else:
+        print(format_summary(summary))
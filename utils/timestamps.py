@@ -0,0 +1,120 @@
+#utils/timestamps.py
+import re
+from datetime import datetime
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+# 프로젝트 공용 timestamp 처리: 문자열 ↔ int64(epoch ns) 변환과 정렬 인덱스 기반 매칭
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+# 순서대로 시도할 형식 (NAB 원본 / 소수점 초 / ISO 'T' 구분자)
+KNOWN_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y-%m-%d %H:%M",
+)
+NS_PER_SEC = 1_000_000_000
+
+# 문자열 모양(숫자를 0으로 바꾼 것) → 맞는 형식. 파일마다 형식을 다시 추측하지 않도록 캐시한다.
+_format_cache = {}
+
+
+def _shape(value: str) -> str:
+    return re.sub(r"\d", "0", value)
+
+
+def _detect_format(sample: str) -> Optional[str]:
+    """샘플 문자열에 맞는 형식 (모양별로 캐시, 알려진 형식이 없으면 None)"""
+    shape = _shape(sample)
+    if shape not in _format_cache:
+        _format_cache[shape] = None
+        for fmt in KNOWN_FORMATS:
+            try:
+                datetime.strptime(sample, fmt)
+            except ValueError:
+                continue
+            _format_cache[shape] = fmt
+            break
+    return _format_cache[shape]
+
+
+def parse_timestamp_array(values) -> np.ndarray:
+    """
+    문자열 timestamp 배열 → int64 (epoch ns) 배열로 일괄 파싱.
+    첫 값으로 형식을 정해 고정 형식으로 한 번에 파싱하고, 형식이 섞여 있으면 ISO8601 파서로 대체한다.
+    """
+    strings = pd.Series(values, dtype=str).str.strip()
+    if strings.empty:
+        return np.array([], dtype="int64")
+    fmt = _detect_format(strings.iloc[0])
+    parsed = None
+    if fmt is not None:
+        try:
+            parsed = pd.to_datetime(strings, format=fmt)
+        except ValueError:
+            parsed = None
+    if parsed is None:
+        parsed = pd.to_datetime(strings, format="ISO8601")
+    return parsed.to_numpy(dtype="datetime64[ns]").view("int64")
+
+
+def parse_timestamp(ts: str) -> datetime:
+    """문자열 하나 → datetime (parse_timestamp_array와 같은 형식 캐시 사용)"""
+    ts = ts.strip()
+    fmt = _detect_format(ts)
+    if fmt is not None:
+        return datetime.strptime(ts, fmt)
+    return datetime.fromisoformat(ts)
+
+
+def format_timestamp(dt: datetime) -> str:
+    return dt.strftime(TS_FORMAT)
+
+
+def frame_timestamps_ns(df: pd.DataFrame) -> np.ndarray:
+    """DataFrame timestamp 컬럼 → int64 (epoch ns) 배열 (캐시 프레임의 datetime64 컬럼은 파싱 없이)"""
+    column = df["timestamp"]
+    if pd.api.types.is_datetime64_dtype(column):
+        return column.to_numpy(dtype="datetime64[ns]").view("int64")
+    return parse_timestamp_array(column)
+
+
+def datetimes_to_ns(timestamps: Iterable[datetime]) -> np.ndarray:
+    """datetime 목록(LLM 예측 결과 등) → int64 (epoch ns) 배열"""
+    return np.array([np.datetime64(ts, "ns") for ts in timestamps], dtype="datetime64[ns]").view("int64")
+
+
+class TimestampIndex:
+    """
+    행 timestamp(int64 ns)의 정렬 인덱스.
+    예측 timestamp를 이진 탐색으로 가장 가까운 행에 맞춘다 (tolerance 이내일 때만).
+    """
+
+    def __init__(self, row_timestamps: np.ndarray):
+        row_timestamps = np.asarray(row_timestamps, dtype="int64")
+        self.order = np.argsort(row_timestamps, kind="stable")
+        self.sorted = row_timestamps[self.order]
+
+    def __len__(self) -> int:
+        return len(self.sorted)
+
+    def snap(self, query: np.ndarray, tolerance_ns: int = 0) -> np.ndarray:
+        """
+        query 각각에 대해 가장 가까운 행의 위치(원래 행 순서 기준)를 반환, tolerance 밖이면 -1.
+        거리가 같으면 앞쪽 행을 고른다.
+        """
+        query = np.asarray(query, dtype="int64")
+        rows = np.full(len(query), -1, dtype="int64")
+        if len(self.sorted) == 0 or len(query) == 0:
+            return rows
+        right = np.clip(np.searchsorted(self.sorted, query, side="left"), 0, len(self.sorted) - 1)
+        left = np.clip(right - 1, 0, len(self.sorted) - 1)
+        dist_left = np.abs(query - self.sorted[left])
+        dist_right = np.abs(self.sorted[right] - query)
+        nearest = np.where(dist_left <= dist_right, left, right)
+        within = np.minimum(dist_left, dist_right) <= tolerance_ns
+        rows[within] = self.order[nearest[within]]
+        return rows
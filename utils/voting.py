@@ -0,0 +1,164 @@
+#utils/voting.py
+import math
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import ExitStack
+from datetime import datetime
+from typing import Callable, ContextManager, Dict, List, Optional
+
+from utils.telemetry import StageTimer
+
+# 투표 모드에서 --temp 0이면 샘플이 모두 같아지므로 대신 쓰는 temperature
+DEFAULT_VOTE_TEMPERATURE = 0.7
+# 슬롯을 기다리는 사이 결과가 정해져 보내지 않은 샘플
+_SKIPPED = object()
+
+
+def quorum_count(samples: int, quorum: float) -> int:
+    """quorum → 필요한 표 수. 1 이하면 샘플 수 대비 비율(올림), 1보다 크면 표 수 그대로 (1~samples로 제한)"""
+    need = math.ceil(quorum * samples - 1e-9) if quorum <= 1 else int(quorum)
+    return min(max(need, 1), samples)
+
+
+class VoteTally:
+    """
+    윈도우 하나의 timestamp별 득표 집계.
+    남은 표를 모두 받아도 결과(quorum을 넘는 timestamp 집합)가 바뀔 수 없으면 decided().
+    실패한 샘플은 표로 세지 않고 받을 수 있는 표 수(samples)만 줄인다 — 남은 표로 quorum이 불가능하면 impossible().
+    """
+
+    def __init__(self, samples: int, need: int):
+        self.samples = samples
+        self.need = need
+        self.received = 0
+        self.failed = 0
+        self.votes: Dict[datetime, int] = {}
+
+    def add(self, timestamps: List[datetime]):
+        self.received += 1
+        for ts in set(timestamps):
+            self.votes[ts] = self.votes.get(ts, 0) + 1
+
+    def fail(self):
+        self.failed += 1
+        self.samples -= 1
+
+    def impossible(self) -> bool:
+        return self.samples < self.need
+
+    def remaining(self) -> int:
+        return self.samples - self.received
+
+    def decided(self) -> bool:
+        remaining = self.remaining()
+        if remaining == 0:
+            return True
+        # 아직 안 나온 timestamp도 남은 표만으로 quorum에 닿을 수 있으면 미정
+        if remaining >= self.need:
+            return False
+        return all(count >= self.need or count + remaining < self.need for count in self.votes.values())
+
+    def winners(self) -> List[datetime]:
+        return sorted(ts for ts, count in self.votes.items() if count >= self.need)
+
+
+def merge_sample_timings(window_timings: dict, sample_timings: List[dict]):
+    """샘플별 timings → 윈도우 timings (단계 시간/토큰/서버 시간은 합계, cached는 모두 캐시일 때만)"""
+    ollama: Dict[str, float] = {}
+    for timings in sample_timings:
+        for key, value in timings.items():
+            if key.endswith("_ms") and isinstance(value, (int, float)):
+                window_timings[key] = window_timings.get(key, 0.0) + value
+            elif key == "invalid_timestamps":
+                window_timings[key] = window_timings.get(key, 0) + value
+        for key, value in (timings.get("ollama") or {}).items():
+            if value is not None:
+                ollama[key] = ollama.get(key, 0) + value
+    window_timings["cached"] = bool(sample_timings) and all(t.get("cached") for t in sample_timings)
+    window_timings["ollama"] = ollama or None
+
+
+def vote_temperature(temperature: float, vote_temperature: Optional[float] = None) -> float:
+    """투표 샘플 temperature: vote_temperature가 있으면 그대로, 없으면 temperature (0이면 greedy 샘플이 모두 같으므로 DEFAULT_VOTE_TEMPERATURE)"""
+    if vote_temperature is not None:
+        return vote_temperature
+    return temperature if temperature > 0 else DEFAULT_VOTE_TEMPERATURE
+
+
+def vote_window(
+    predict_sample: Callable[[int, dict], List[datetime]],
+    samples: int,
+    quorum: float = 0.5,
+    parallel: Optional[int] = None,
+    timings: Optional[dict] = None,
+    slot: Optional[Callable[[], ContextManager]] = None,
+) -> List[datetime]:
+    """
+    윈도우 하나를 samples번 샘플링해 need(quorum_count)표 이상 받은 timestamp만 반환.
+    predict_sample(i, timings)는 i번째 샘플(시드 구분용) 예측. 샘플을 모두 동시에 보내고(parallel개로 제한 가능),
+    결과가 정해지면 시작하지 않은 샘플은 취소하고 이미 보낸 샘플은 기다리지 않는다 (응답은 결과를 바꿀 수 없으므로 버림).
+    slot()은 샘플 요청 하나를 보내는 동안 잡는 동시 호출 제한 — 윈도우가 아니라 실제 요청 수로 상한을 지키게 한다.
+    슬롯을 기다리는 사이 결과가 정해지면 그 샘플은 보내지 않는다.
+    실패한 샘플은 표로 세지 않는다 (받을 수 있는 표 수만 줄어듦). 실패가 쌓여 남은 샘플로 quorum에 닿을 수 없으면
+    윈도우 실패로 보고 마지막 예외를 다시 발생시킨다.
+    timings에는 집계한 샘플의 합계 지표와 votes(받은 표)/votes_skipped(보내지 않은 샘플)/vote_errors 기록.
+    """
+    need = quorum_count(samples, quorum)
+    tally = VoteTally(samples, need)
+    sample_timings: List[dict] = [{} for _ in range(samples)]
+    counted: List[int] = []
+    errors: List[Exception] = []
+    lock = threading.Lock()
+    decided = threading.Event()
+    sent = 0
+
+    def run_sample(i: int):
+        nonlocal sent
+        with ExitStack() as stack:
+            if slot is not None:
+                with StageTimer(sample_timings[i]).stage("wait"):
+                    stack.enter_context(slot())
+            with lock:
+                if decided.is_set():
+                    return _SKIPPED
+                sent += 1
+            return predict_sample(i, sample_timings[i])
+
+    executor = ThreadPoolExecutor(max_workers=min(max(parallel or samples, 1), samples))
+    futures = {executor.submit(run_sample, i): i for i in range(samples)}
+    pending = set(futures)
+    try:
+        while pending and not tally.decided():
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    tally.fail()
+                    continue
+                if result is _SKIPPED:
+                    continue
+                tally.add(result)
+                counted.append(futures[future])
+            if tally.impossible():
+                break
+    finally:
+        with lock:
+            decided.set()
+            sent_total = sent
+        # 남은 샘플은 취소하고(시작 전), 보낸 샘플의 응답은 기다리지 않음
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if timings is not None:
+        merge_sample_timings(timings, [sample_timings[i] for i in counted])
+        timings.update(votes=tally.received, votes_skipped=samples - sent_total, vote_errors=len(errors))
+    if tally.impossible():
+        print(f"⚠️ 투표 실패: 샘플 {len(errors)}개 실패로 {need}표를 모을 수 없음")
+        raise errors[-1]
+    winners = tally.winners()
+    print(
+        f"🗳️ 투표 {tally.received}/{samples}표 (필요 {need}표, 실패 {len(errors)}개, 생략 {samples - sent_total}개) "
+        f"→ 후보 {len(tally.votes)}개 중 {len(winners)}개 채택"
+    )
+    return winners
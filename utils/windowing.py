@@ -0,0 +1,160 @@
+#utils/windowing.py
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.prompt import build_prompt
+from utils.serialize import serialize_df
+
+# 토큰 수 추정용 평균 글자 수 (숫자/timestamp 위주 텍스트는 일반 문장보다 토큰이 잘게 쪼개짐)
+CHARS_PER_TOKEN = 3.0
+# 행당 토큰 추정에 사용할 샘플 행 수
+SAMPLE_ROWS = 200
+# token_budget(컨텍스트 크기) 중 모델 출력용으로 남겨둘 토큰 수
+OUTPUT_RESERVE_TOKENS = 512
+
+
+def estimate_tokens(text: str) -> int:
+    """글자 수 기반 토큰 수 추정 (토크나이저 없이 보수적으로)"""
+    return int(np.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+@dataclass
+class TokenModel:
+    """프롬프트 토큰 = overhead(템플릿 + 시나리오) + rows × per_row"""
+    overhead: int
+    per_row: float
+
+    def window_tokens(self, rows: int) -> int:
+        return int(np.ceil(self.overhead + rows * self.per_row))
+
+    def rows_for_budget(self, budget: int) -> int:
+        return max(int((budget - self.overhead) // max(self.per_row, 1e-9)), 1)
+
+
+def fit_token_model(
+    df: pd.DataFrame,
+    prompt_template: str,
+    scenario: str,
+    data_format: str = "verbose",
+    precision: Optional[int] = None,
+) -> TokenModel:
+    """샘플 행을 실제 serializer로 직렬화해서 overhead와 행당 토큰 수 추정"""
+    sample = df.iloc[:SAMPLE_ROWS]
+    empty = estimate_tokens(build_prompt(prompt_template, scenario, ""))
+    full = estimate_tokens(build_prompt(prompt_template, scenario, serialize_df(sample, data_format, precision)))
+    per_row = (full - empty) / max(len(sample), 1)
+    return TokenModel(overhead=empty, per_row=per_row)
+
+
+@dataclass
+class WindowPlan:
+    """실행 전에 확인 가능한 윈도우 계획 (경계 + 윈도우별 예상 프롬프트 토큰)"""
+    windows: List[Tuple[int, int]]
+    est_tokens: List[int] = field(default_factory=list)
+    token_budget: Optional[int] = None
+
+    @property
+    def total_tokens(self) -> int:
+        return int(sum(self.est_tokens))
+
+    @property
+    def over_budget(self) -> List[Tuple[int, int]]:
+        if self.token_budget is None:
+            return []
+        return [w for w, t in zip(self.windows, self.est_tokens) if t > self.token_budget]
+
+    def summary(self) -> str:
+        rows = [end - start for start, end in self.windows]
+        lines = [
+            f"🗺️ 윈도우 계획: {len(self.windows)}개, 행 수 {min(rows, default=0)}~{max(rows, default=0)}, "
+            f"예상 프롬프트 토큰 합계 {self.total_tokens:,}"
+            + (f" (윈도우당 예산 {self.token_budget:,})" if self.token_budget else "")
+        ]
+        if self.over_budget:
+            lines.append(f"⚠️ 예산 초과 예상 윈도우 {len(self.over_budget)}개 — 프롬프트가 잘릴 수 있습니다.")
+        return "\n".join(lines)
+
+    def table(self) -> str:
+        df = pd.DataFrame(
+            [(start, end, end - start, tokens) for (start, end), tokens in zip(self.windows, self.est_tokens)],
+            columns=["start", "end", "rows", "est_tokens"],
+        )
+        return df.to_string(index=False)
+
+
+def fixed_windows(total_rows: int, window_rows: int, overlap: float = 0.5) -> List[Tuple[int, int]]:
+    """고정 크기 윈도우: stride = window_rows × (1 - overlap)"""
+    window_rows = max(window_rows, 1)
+    stride = max(int(round(window_rows * (1 - overlap))), 1)
+    return [(start, start + window_rows) for start in range(0, total_rows, stride)]
+
+
+def adaptive_windows(
+    total_rows: int,
+    window_rows: int,
+    hot: np.ndarray,
+    overlap: float = 0.5,
+    min_rows: int = 50,
+) -> List[Tuple[int, int]]:
+    """
+    이상 의심 지점(hot) 주변에서만 윈도우를 줄이고 겹침을 둔다.
+    - 의심 지점이 없는 구간: window_rows 크기, 겹침 없음
+    - 의심 지점이 있는 윈도우: 절반 크기로 축소
+    - 윈도우 끝부분(겹침 구간)에 의심 지점이 걸치면 다음 윈도우를 overlap만큼 앞당겨 시작
+    """
+    windows = []
+    start = 0
+    while start < total_rows:
+        size = window_rows
+        if hot[start:start + size].any():
+            size = max(window_rows // 2, min_rows)
+        end = start + size
+        windows.append((start, end))
+        if end >= total_rows:
+            break
+        overlap_rows = int(round(size * overlap))
+        next_start = end
+        if overlap_rows and hot[end - overlap_rows:end].any():
+            next_start = end - overlap_rows
+        start = max(next_start, start + 1)
+    return windows
+
+
+def plan_window_rows(token_model: TokenModel, num_rows: int, token_budget: Optional[int] = None) -> Tuple[int, Optional[int]]:
+    """윈도우 행 수 + 프롬프트 토큰 예산: token_budget이 있으면 출력용 OUTPUT_RESERVE_TOKENS를 뺀 예산에 맞춤 (num_rows는 상한)"""
+    if token_budget is None:
+        return num_rows, None
+    prompt_budget = max(token_budget - OUTPUT_RESERVE_TOKENS, 1)
+    return min(num_rows, token_model.rows_for_budget(prompt_budget)), prompt_budget
+
+
+def build_window_plan(
+    df: pd.DataFrame,
+    prompt_template: str,
+    scenario: str,
+    num_rows: int,
+    data_format: str = "verbose",
+    precision: Optional[int] = None,
+    token_budget: Optional[int] = None,
+    overlap: float = 0.5,
+    hot: Optional[np.ndarray] = None,
+) -> WindowPlan:
+    """
+    윈도우 계획 생성.
+    token_budget(컨텍스트 크기)이 있으면 출력용 OUTPUT_RESERVE_TOKENS를 뺀 나머지에
+    (템플릿 + 시나리오 + 데이터) 예상 토큰이 맞도록 윈도우 행 수를 정한다 (num_rows는 상한).
+    hot이 주어지면 adaptive_windows로 겹침/크기를 조절한다.
+    """
+    token_model = fit_token_model(df, prompt_template, scenario, data_format, precision)
+    window_rows, prompt_budget = plan_window_rows(token_model, num_rows, token_budget)
+
+    if hot is not None:
+        windows = adaptive_windows(len(df), window_rows, hot, overlap)
+    else:
+        windows = fixed_windows(len(df), window_rows, overlap)
+
+    est_tokens = [token_model.window_tokens(min(end, len(df)) - start) for start, end in windows]
+    return WindowPlan(windows=windows, est_tokens=est_tokens, token_budget=prompt_budget)